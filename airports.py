@@ -0,0 +1,160 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("flytau.airports")
+
+# Match ranks, best first: the typed text is the code, starts the code,
+# starts a word of the city, starts a word of the airport name
+EXACT_CODE, CODE_PREFIX, CITY_PREFIX, NAME_PREFIX = range(4)
+
+
+class Airport:
+    __slots__ = ("code", "city", "name", "routes")
+
+    def __init__(self, code: str, city: Optional[str], name: Optional[str], routes: int):
+        self.code = code
+        self.city = city
+        self.name = name
+        self.routes = routes
+
+    def to_dict(self) -> Dict:
+        return {"code": self.code, "city": self.city, "name": self.name}
+
+
+class _Snapshot:
+    """
+    One immutable build of the index: sorted (key, rank, -routes, code) terms
+    for prefix bisects and the airports by code. Readers take a reference and
+    never lock; a rebuild swaps in a new snapshot.
+    """
+
+    __slots__ = ("terms", "keys", "airports")
+
+    def __init__(self, airports: Dict[str, Airport]):
+        terms = []
+        for airport in airports.values():
+            terms.append((airport.code.lower(), CODE_PREFIX, -airport.routes, airport.code))
+            for rank, text in ((CITY_PREFIX, airport.city), (NAME_PREFIX, airport.name)):
+                for word in (text or "").lower().replace("-", " ").replace("/", " ").split():
+                    terms.append((word, rank, -airport.routes, airport.code))
+                if text and " " in text.strip():
+                    # Also match the start of the full text, e.g. "new y"
+                    terms.append((text.strip().lower(), rank, -airport.routes, airport.code))
+        terms.sort()
+        self.terms = terms
+        self.keys = [term[0] for term in terms]
+        self.airports = airports
+
+
+class AirportIndex:
+    """
+    In-memory prefix index of airports for the search-form autocomplete
+    (/airports) and for rejecting unknown codes before a flight search runs.
+
+    Every code in the path table is an airport; city and name come from the
+    optional Airport table. Each lowercased code, city word and name word is
+    a term in one sorted list, so a lookup is a bisect plus a short scan of
+    the matching terms, with no query. Results are ranked exact code, code
+    prefix, city, name, then by how many routes the airport has.
+
+    Loaded on first use or by start_refresher, which also reloads it
+    periodically; codes of routes added by /manage_flights are added in place.
+
+    The loader is passed in so this module never touches the database:
+        load_airports() -> [(code, city or None, name or None, routes), ...]
+    """
+
+    def __init__(self, load_airports: Callable):
+        self._load_airports = load_airports
+        self._snapshot: Optional[_Snapshot] = None
+        self._lock = threading.Lock()
+
+    def _build(self) -> _Snapshot:
+        return _Snapshot({code.upper(): Airport(code.upper(), city, name, int(routes or 0))
+                          for code, city, name, routes in self._load_airports()})
+
+    def rebuild(self) -> None:
+        snapshot = self._build()
+        with self._lock:
+            self._snapshot = snapshot
+
+    def _loaded(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._build()
+                snapshot = self._snapshot
+        return snapshot
+
+    def add_codes(self, codes: Iterable[str]) -> None:
+        """
+        Make codes of newly added routes known without a reload.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None:
+                return
+            new = [code.upper() for code in codes if code.upper() not in snapshot.airports]
+            if not new:
+                return
+            airports = dict(snapshot.airports)
+            for code in new:
+                airports[code] = Airport(code, None, None, 1)
+            self._snapshot = _Snapshot(airports)
+
+    def search(self, text: str, limit: int = 10) -> List[Dict]:
+        """
+        Airports whose code, city or name starts with `text`, best match first.
+        """
+        text = " ".join(text.lower().split())
+        if not text:
+            return []
+        snapshot = self._loaded()
+        best: Dict[str, Tuple] = {}
+        i = bisect_left(snapshot.keys, text)
+        terms, keys = snapshot.terms, snapshot.keys
+        while i < len(keys) and keys[i].startswith(text):
+            key, rank, neg_routes, code = terms[i]
+            if rank == CODE_PREFIX and key == text:
+                rank = EXACT_CODE
+            order = (rank, neg_routes, code)
+            if code not in best or order < best[code]:
+                best[code] = order
+            i += 1
+        ranked = sorted(best.values())[:limit]
+        return [snapshot.airports[code].to_dict() for _, _, code in ranked]
+
+    def unknown(self, codes: Iterable[str]) -> List[str]:
+        """
+        The codes not in the index. Before the first load (or if it failed)
+        nothing is reported unknown, so search never depends on the index.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return []
+        return [code for code in codes if code.upper() not in snapshot.airports]
+
+    def stats(self) -> Dict:
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"airports": 0, "terms": 0}
+        return {"airports": len(snapshot.airports), "terms": len(snapshot.terms)}
+
+
+def start_refresher(index: AirportIndex, interval: float) -> None:
+    """
+    Background thread loading the index now and every `interval` seconds.
+    """
+    def run():
+        while True:
+            try:
+                index.rebuild()
+            except Exception as e:
+                logger.exception("Airport index refresh error: %s", e)
+            time.sleep(interval)
+
+    threading.Thread(target=run, name="airport-index-refresh", daemon=True).start()
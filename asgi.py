@@ -0,0 +1,153 @@
+"""
+ASGI entry point: the search, seat-map and ticket-lookup endpoints run as
+async handlers on the aiomysql pool (async_db.py); every other route is
+served by the regular Flask app through a WSGI adapter, so the synchronous
+helpers keep working unchanged.
+
+    uvicorn asgi:application --workers 2 --port 8000
+"""
+import asyncio
+import logging
+
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request, Response
+
+from async_db import close_async_pool, get_seat_map_snapshot_async, get_ticket_details_async, search_flights_async
+from main import app, build_seat_map_changes, parse_search_form, start_background_jobs
+
+logger = logging.getLogger("flytau.asgi")
+
+
+flask_asgi = WsgiToAsgi(app)
+
+
+def _json(body, status: int = 200) -> Response:
+    return Response(app.json.dumps(body), status=status, mimetype="application/json")
+
+
+async def _read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _build_request(scope, body: bytes) -> Request:
+    headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]]
+    host = next((v for k, v in headers if k.lower() == "host"), "localhost")
+    builder = EnvironBuilder(
+        path=scope["path"],
+        base_url=f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}",
+        method=scope["method"],
+        headers=headers,
+        data=body,
+        query_string=scope.get("query_string", b"").decode("latin-1"),
+    )
+    return Request(builder.get_environ())
+
+
+async def search_flights_handler(request: Request, session) -> Response:
+    """
+    Same contract as main.search_flights_route.
+    """
+    if session.get("user_type") not in ["customer", "guest"]:
+        return _json({"error": "You must be signed in (as guest or customer) to search flights."}, 401)
+
+    params, errors = parse_search_form(request.form)
+    if params["passengers"] and 1 <= params["passengers"] <= 9:
+        session["passengers"] = params["passengers"]
+        session["search_passengers"] = params["passengers"]
+    if errors:
+        return _json({"error": " ".join(errors)}, 400)
+
+    try:
+        flights = await search_flights_async(**params)
+        return _json({"flights": flights, "count": len(flights)})
+    except Exception as e:
+        logger.exception("Database Error: %s", e)
+        return _json({"error": "An error occurred while searching for flights. Please try again."}, 500)
+
+
+async def seat_map_changes_handler(request: Request, session) -> Response:
+    """
+    Same contract as main.seat_map_changes.
+    """
+    try:
+        flight_id = int(request.args.get("flight_id", ""))
+        since = int(request.args.get("since", "0"))
+    except ValueError:
+        return _json({"error": "flight_id and since must be numbers."}, 400)
+
+    snapshot = await get_seat_map_snapshot_async(flight_id)
+    if not snapshot:
+        return _json({"error": "Flight not found."}, 404)
+    return _json(build_seat_map_changes(snapshot, request.args.get("epoch", ""), since,
+                                        hold_token=session.get("hold_token")))
+
+
+async def ticket_details_handler(request: Request, session) -> Response:
+    """
+    Same contract as main.ticket_details_route.
+    """
+    email = session.get("user_email") or session.get("guest_email")
+    try:
+        order_id = int(request.args.get("order_id", ""))
+    except ValueError:
+        return _json({"error": "Please provide a valid Order ID."}, 400)
+    if not email:
+        return _json({"error": "You must be signed in to view an order."}, 401)
+
+    ticket = await get_ticket_details_async(order_id, email)
+    if not ticket:
+        return _json({"error": f"Order #{order_id} is not associated with your account."}, 404)
+    return _json(ticket)
+
+
+ASYNC_ROUTES = {
+    ("POST", "/search_flights"): search_flights_handler,
+    ("GET", "/seat_map_changes"): seat_map_changes_handler,
+    ("GET", "/ticket_details"): ticket_details_handler,
+}
+
+
+async def _lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            start_background_jobs(app)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await close_async_pool()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+
+    handler = ASYNC_ROUTES.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+    if handler is None:
+        await flask_asgi(scope, receive, send)
+        return
+
+    request = _build_request(scope, await _read_body(receive))
+    # Session stores may do blocking I/O (e.g. Redis), keep it off the event loop
+    session = await asyncio.to_thread(app.session_interface.open_session, app, request)
+    # Same as main.make_session_permanent; a no-op for server-side sessions
+    if not session.permanent:
+        session.permanent = True
+
+    response = await handler(request, session)
+    await asyncio.to_thread(app.session_interface.save_session, app, session, response)
+
+    await send({
+        "type": "http.response.start",
+        "status": response.status_code,
+        "headers": [(k.encode("latin-1"), v.encode("latin-1")) for k, v in response.headers.to_wsgi_list()],
+    })
+    await send({"type": "http.response.body", "body": response.get_data()})
@@ -0,0 +1,132 @@
+"""
+Async versions of the hot read helpers (search, seat map, ticket lookup) on
+an aiomysql pool, for the ASGI serving mode in asgi.py.
+
+They run the same SQL as utils.py and share its in-process caches, so a
+search cached by the sync app is a hit here too and bookings made through
+the sync routes invalidate both.
+"""
+import asyncio
+import logging
+import os
+from typing import Dict, List, Optional
+
+import aiomysql
+
+from seat_map_cache import LOAD_ATTEMPTS, FlightSeatSnapshot, PlaneLayout
+from utils import (
+    FLIGHT_PLANE_SQL,
+    OCCUPIED_SEATS_SQL,
+    PLANE_LAYOUT_SQL,
+    SEARCH_FLIGHTS_SQL,
+    TICKET_DETAILS_SQL,
+    _flight_row_to_dict,
+    _search_params,
+    _ticket_row_to_dict,
+    cache_search_result,
+    search_cache,
+    seat_map_cache,
+)
+
+logger = logging.getLogger("flytau.async_db")
+
+_pool = None
+_pool_lock = asyncio.Lock()
+
+
+async def get_async_pool():
+    """
+    Return the aiomysql pool, creating it on first use (inside the running loop).
+    """
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                _pool = await aiomysql.create_pool(
+                    host=os.getenv("DB_HOST"),
+                    user=os.getenv("DB_USER"),
+                    password=os.getenv("DB_PASSWORD"),
+                    db=os.getenv("DB_NAME"),
+                    minsize=1,
+                    maxsize=int(os.getenv("ASYNC_DB_POOL_SIZE", "20")),
+                    pool_recycle=int(float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))),
+                    autocommit=True,
+                )
+    return _pool
+
+
+async def close_async_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+async def _fetchall(sql: str, params) -> List[tuple]:
+    pool = await get_async_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(sql, params)
+            return await cursor.fetchall()
+
+
+async def search_flights_async(origin_airport: str, destination_airport: str, departure_date: str,
+                               passengers: int) -> List[Dict]:
+    """
+    Async counterpart of utils.search_flights (same cache, same query).
+    """
+    origin_airport = origin_airport.upper()
+    destination_airport = destination_airport.upper()
+    cached = search_cache.get((origin_airport, destination_airport, departure_date, passengers))
+    if cached is not None:
+        return list(cached)
+
+    generation = search_cache.generation
+    rows = await _fetchall(
+        SEARCH_FLIGHTS_SQL,
+        _search_params(origin_airport, destination_airport, departure_date, passengers),
+    )
+    flights = [_flight_row_to_dict(row) for row in rows]
+    cache_search_result(origin_airport, destination_airport, departure_date, passengers, flights, generation)
+    return flights
+
+
+async def get_seat_map_snapshot_async(flight_id: int) -> Optional[FlightSeatSnapshot]:
+    """
+    Async counterpart of utils.get_seat_map_snapshot; fills the shared seat map cache.
+    """
+    snapshot = seat_map_cache.get_fresh(flight_id)
+    if snapshot is not None:
+        return snapshot
+
+    plane_id = seat_map_cache.cached_plane_id(flight_id)
+    if plane_id is None:
+        rows = await _fetchall(FLIGHT_PLANE_SQL, (flight_id,))
+        if not rows:
+            return None
+        plane_id = rows[0][0]
+
+    layout = seat_map_cache.cached_layout(plane_id)
+    if layout is None:
+        layout = PlaneLayout(plane_id, await _fetchall(PLANE_LAYOUT_SQL, (plane_id,)))
+
+    for _ in range(LOAD_ATTEMPTS):
+        generation = seat_map_cache.generation(flight_id)
+        occupied = [row[0] for row in await _fetchall(OCCUPIED_SEATS_SQL, (flight_id,))]
+        snapshot = seat_map_cache.install(flight_id, layout, occupied, generation)
+        if snapshot is not None:
+            return snapshot
+    return seat_map_cache.detached(flight_id, layout, occupied)
+
+
+async def get_ticket_details_async(order_id: int, email: str) -> Optional[Dict]:
+    """
+    Async counterpart of utils.get_ticket_details.
+    """
+    try:
+        rows = await _fetchall(TICKET_DETAILS_SQL, (order_id, email, email))
+    except Exception as e:
+        logger.exception("Database Error: %s", e)
+        return None
+    return _ticket_row_to_dict(rows[0]) if rows else None
@@ -0,0 +1,106 @@
+"""
+Compare concurrent-request capacity of the sync (WSGI) and async (ASGI) modes.
+
+Start both servers on the same database, e.g.
+    DB_NAME=flytau_load gunicorn -w 2 --threads 8 -b :5000 main:app
+    DB_NAME=flytau_load uvicorn asgi:application --workers 2 --port 8000
+then
+    python -m benchmarks.concurrency_benchmark --database flytau_load \
+        --target wsgi=http://127.0.0.1:5000 --target asgi=http://127.0.0.1:8000
+
+For each target and concurrency level, that many clients (each with its own
+guest session) fire /search_flights requests back to back for --duration
+seconds. Set SEARCH_CACHE_TTL=0 on the servers to measure the database path
+rather than the in-process cache.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from pathlib import Path
+
+from benchmarks.load_test import RESULTS_DIR, Stats, VirtualUser, git_commit, percentile, pick_targets
+
+
+def run_level(base_url: str, concurrency: int, duration: float, targets, seed: int) -> dict:
+    stats = Stats()
+    users = []
+    for n in range(concurrency):
+        user = VirtualUser(base_url, stats)
+        user.request("/guest_sign_in", "/guest_sign_in", {"email": f"bench{n}@concurrency.flytau"})
+        users.append(user)
+    stats = Stats()
+    for user in users:
+        user.stats = stats
+
+    deadline = time.monotonic() + duration
+
+    def client(n: int):
+        rng = random.Random(seed + n)
+        user = users[n]
+        while time.monotonic() < deadline:
+            origin, dest, day = rng.choice(targets)
+            try:
+                user.request("search", "/search_flights", {
+                    "origin_airport": origin, "destination_airport": dest,
+                    "departure_date": day, "passengers": rng.randint(1, 4),
+                })
+            except RuntimeError:
+                pass
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    values = sorted(stats.latencies.get("search", []))
+    errors = stats.errors.get("search", 0)
+    return {
+        "concurrency": concurrency,
+        "requests": len(values),
+        "throughput_rps": len(values) / elapsed,
+        "error_rate": errors / len(values) if values else 0.0,
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync vs async concurrent-request capacity.")
+    parser.add_argument("--target", action="append", required=True, help="name=base_url, repeatable.")
+    parser.add_argument("--database", default="flytau_load", help="Database the servers use (for search targets).")
+    parser.add_argument("--levels", default="10,50,100,200", help="Comma-separated concurrency levels.")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per level.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args()
+
+    targets = pick_targets(args.database)
+    if not targets:
+        raise SystemExit(f"No upcoming flights in {args.database}; seed it with benchmarks.load_test --seed.")
+    levels = [int(level) for level in args.levels.split(",")]
+
+    results = {"commit": git_commit(), "config": vars(args), "targets": {}}
+    print(f"{'target':<8}{'conc':>6}{'req/s':>10}{'err%':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for spec in args.target:
+        name, base_url = spec.split("=", 1)
+        results["targets"][name] = []
+        for level in levels:
+            r = run_level(base_url, level, args.duration, targets, args.seed)
+            results["targets"][name].append(r)
+            print(f"{name:<8}{level:>6}{r['throughput_rps']:>10.1f}{r['error_rate'] * 100:>7.1f}%"
+                  f"{r['p50_ms']:>8.1f}ms{r['p95_ms']:>8.1f}ms{r['p99_ms']:>8.1f}ms")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"concurrency_{results['commit']}_{int(time.time())}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
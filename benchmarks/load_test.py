@@ -0,0 +1,310 @@
+"""
+Load test for the booking funnel.
+
+Each virtual user walks the real Flask routes over HTTP:
+    /guest_sign_in -> /search_flights -> /select_seat -> /booking_summary
+    -> /finalize_booking -> (sometimes) /cancel_order
+
+Run the app against a seeded scratch database, then point the harness at it:
+    python -m benchmarks.load_test --seed --database flytau_load   # seed only
+    DB_NAME=flytau_load flask run --port 5000 --with-threads       # in another shell
+    python -m benchmarks.load_test --database flytau_load --users 50 --duration 60
+
+It reports p50/p95/p99 latency per route, throughput, error rate, seat
+conflicts and double-booking violations (checked in the database after the
+run), and writes everything to a JSON file for comparison between commits.
+"""
+import argparse
+import html
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+from http.cookies import SimpleCookie
+from pathlib import Path
+
+from benchmarks.seed import ROOT, connect, create_database, migration_files, seed
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+
+SEAT_INPUT = re.compile(r'name="selected_seats" value="(\d+)"\s+class="seat-input"\s*(disabled)?')
+HIDDEN_INPUT = re.compile(r'<input type="hidden" name="([^"]+)" value="([^"]*)"')
+ORDER_ID = re.compile(r"Order ID: #(\d+)")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class VirtualUser:
+    """
+    One browser session. Cookies are kept by hand because the app sets
+    Secure cookies, which urllib's cookie jar refuses to send over plain http.
+    """
+
+    def __init__(self, base_url: str, stats: "Stats"):
+        self.base_url = base_url.rstrip("/")
+        self.stats = stats
+        self.cookies = {}
+        self.opener = urllib.request.build_opener(_NoRedirect)
+
+    def request(self, route: str, path: str, data=None):
+        body = urllib.parse.urlencode(data, doseq=True).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body)
+        if self.cookies:
+            req.add_header("Cookie", "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+
+        started = time.perf_counter()
+        try:
+            try:
+                resp = self.opener.open(req, timeout=30)
+            except urllib.error.HTTPError as e:
+                resp = e  # 3xx (redirects not followed) and 4xx/5xx land here
+            status = resp.status if hasattr(resp, "status") else resp.code
+            content = resp.read().decode("utf-8", "replace")
+            for header in resp.headers.get_all("Set-Cookie") or []:
+                for name, morsel in SimpleCookie(header).items():
+                    self.cookies[name] = morsel.value
+        except Exception as e:
+            self.stats.record(route, time.perf_counter() - started, error=True)
+            raise RuntimeError(f"{route}: {e}") from e
+
+        self.stats.record(route, time.perf_counter() - started, error=status >= 500)
+        return status, content, resp.headers
+
+    def run_once(self, rng: random.Random, email: str, target, passengers: int, cancel_ratio: float) -> None:
+        origin, dest, day = target
+        status, _, _ = self.request("/guest_sign_in", "/guest_sign_in", {"email": email})
+        if status >= 400:
+            return
+
+        status, content, _ = self.request("/search_flights", "/search_flights", {
+            "origin_airport": origin, "destination_airport": dest,
+            "departure_date": day, "passengers": passengers,
+        })
+        if status != 200:
+            return
+        flights = json.loads(content).get("flights", [])
+        if not flights:
+            self.stats.count("empty_searches")
+            return
+        flight_id = rng.choice(flights)["flight_id"]
+
+        status, content, _ = self.request("/select_seat", f"/select_seat?flight_id={flight_id}")
+        free = [seat for seat, disabled in SEAT_INPUT.findall(content) if not disabled]
+        if len(free) < passengers:
+            self.stats.count("sold_out")
+            return
+        # Prefer the front of the plane so users compete for the same seats
+        chosen = rng.sample(free[:max(passengers * 3, 6)], passengers)
+
+        status, content, _ = self.request("/booking_summary", "/booking_summary", {
+            "flight_id": flight_id, "selected_seats": chosen,
+        })
+        if status != 200:
+            self.stats.count("summary_rejected")
+            return
+        form = defaultdict(list)
+        for name, value in HIDDEN_INPUT.findall(content):
+            form[name].append(html.unescape(value))
+
+        status, content, headers = self.request("/finalize_booking", "/finalize_booking", dict(form))
+        match = ORDER_ID.search(content)
+        if not match:
+            # A seat conflict sends the buyer back to the seat map; anything else is a failure
+            conflict = "select_seat" in (headers.get("Location") or "")
+            self.stats.count("seat_conflicts" if conflict else "booking_failures")
+            return
+        self.stats.count("bookings")
+
+        if rng.random() < cancel_ratio:
+            status, _, _ = self.request("/cancel_order", "/cancel_order", {"order_id": match.group(1)})
+            if status in (302, 303):
+                self.stats.count("cancellations")
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.counters = defaultdict(int)
+
+    def record(self, route: str, seconds: float, error: bool = False) -> None:
+        with self.lock:
+            self.latencies[route].append(seconds * 1000)
+            if error:
+                self.errors[route] += 1
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.counters[name] += 1
+
+
+def percentile(sorted_values, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def pick_targets(database: str, limit: int = 200):
+    """
+    (origin, destination, date) of upcoming flights; searches always hit something.
+    """
+    conn = connect(database)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT DISTINCT Path_Origin_Airport, Path_Dest_Airport, DATE(Departure_DateTime)
+        FROM Flight
+        WHERE Departure_DateTime > NOW() + INTERVAL 2 DAY
+        ORDER BY DATE(Departure_DateTime)
+        LIMIT %s
+        """,
+        (limit,),
+    )
+    targets = [(o, d, day.strftime("%Y-%m-%d")) for o, d, day in cursor.fetchall()]
+    cursor.close()
+    conn.close()
+    return targets
+
+
+def check_integrity(database: str) -> dict:
+    conn = connect(database)
+    cursor = conn.cursor()
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM (
+            SELECT o.Flight_ID, a.Class_ID
+            FROM Assigned a JOIN `Order` o ON a.Order_ID = o.Order_ID
+            WHERE o.Status = 'Active'
+            GROUP BY o.Flight_ID, a.Class_ID
+            HAVING COUNT(*) > 1
+        ) dup
+        """
+    )
+    double_booked = cursor.fetchone()[0]
+    cursor.execute(
+        """
+        SELECT COUNT(*) FROM `Order` o
+        WHERE o.Status = 'Active'
+          AND NOT EXISTS (SELECT 1 FROM Assigned a WHERE a.Order_ID = o.Order_ID)
+        """
+    )
+    partial_orders = cursor.fetchone()[0]
+    cursor.close()
+    conn.close()
+    return {"double_booked_seats": double_booked, "orders_without_seats": partial_orders}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive the FLYTAU booking funnel under load.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--database", default="flytau_load", help="Database the app under test is using.")
+    parser.add_argument("--seed", action="store_true", help="Recreate and seed --database, then exit.")
+    parser.add_argument("--flights", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=20, help="Concurrent virtual users.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run.")
+    parser.add_argument("--hot-targets", type=int, default=5,
+                        help="Searches are drawn from this many route/days to create seat contention.")
+    parser.add_argument("--cancel-ratio", type=float, default=0.2)
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--output", default=None, help="JSON results path (default benchmarks/results/).")
+    args = parser.parse_args()
+
+    if args.seed:
+        create_database(args.database, migration_files())
+        summary = seed(args.database, flights=args.flights, orders=args.orders, seed_value=args.random_seed)
+        print(f"Seeded {args.database}: {len(summary['flights'])} flights, {summary['orders']} orders.")
+        return
+
+    targets = pick_targets(args.database)[:args.hot_targets]
+    if not targets:
+        raise SystemExit(f"No upcoming flights in {args.database}; run with --seed first.")
+
+    stats = Stats()
+    deadline = time.monotonic() + args.duration
+
+    def worker(n: int):
+        rng = random.Random(args.random_seed * 1000 + n)
+        iteration = 0
+        while time.monotonic() < deadline:
+            iteration += 1
+            user = VirtualUser(args.base_url, stats)
+            try:
+                user.run_once(rng, f"load{n}.{iteration}@load.flytau", rng.choice(targets),
+                              rng.randint(1, 3), args.cancel_ratio)
+            except RuntimeError:
+                stats.count("aborted_flows")
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(args.users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    routes = {}
+    total_requests = total_errors = 0
+    for route, values in sorted(stats.latencies.items()):
+        values.sort()
+        errors = stats.errors.get(route, 0)
+        total_requests += len(values)
+        total_errors += errors
+        routes[route] = {
+            "requests": len(values),
+            "errors": errors,
+            "error_rate": errors / len(values),
+            "p50_ms": percentile(values, 50),
+            "p95_ms": percentile(values, 95),
+            "p99_ms": percentile(values, 99),
+            "throughput_rps": len(values) / elapsed,
+        }
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args),
+        "elapsed_s": elapsed,
+        "requests": total_requests,
+        "throughput_rps": total_requests / elapsed,
+        "error_rate": total_errors / total_requests if total_requests else 0.0,
+        "counters": dict(stats.counters),
+        "routes": routes,
+        "integrity": check_integrity(args.database),
+    }
+
+    print(f"{'route':<20}{'reqs':>8}{'err%':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for route, r in routes.items():
+        print(f"{route:<20}{r['requests']:>8}{r['error_rate'] * 100:>7.1f}%"
+              f"{r['p50_ms']:>9.1f}ms{r['p95_ms']:>8.1f}ms{r['p99_ms']:>8.1f}ms")
+    print(f"\n{total_requests} requests in {elapsed:.1f}s = {results['throughput_rps']:.1f} req/s, "
+          f"error rate {results['error_rate'] * 100:.2f}%")
+    print("counters:", results["counters"])
+    print("integrity:", results["integrity"])
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"load_{results['commit']}_{int(time.time())}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, default=str))
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
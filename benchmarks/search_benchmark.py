@@ -0,0 +1,205 @@
+"""
+Before/after benchmark for the search, seat-map and order-lookup queries.
+
+Seeds a synthetic dataset into a scratch database on the local MySQL, then
+measures each access path twice:
+  before - original queries (DATE(...) predicate, correlated seat EXISTS,
+           GROUP BY over all active orders) without the 002 indexes
+  after  - current queries with sql/migrations/002_search_indexes.sql applied
+
+Usage (from the repo root):
+    python -m benchmarks.search_benchmark --flights 200000 --orders 1000000
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from benchmarks.seed import MIGRATIONS_DIR, connect, create_database, migration_files, run_sql_file, seed
+
+BEFORE_QUERIES = {
+    "search": """
+        SELECT f.ID, f.Departure_DateTime, f.Arrival_DateTime, f.Path_Origin_Airport, f.Path_Dest_Airport,
+               f.Business_Seat_Price, f.Economy_Seat_Price, f.Plane_ID
+        FROM Flight f
+        JOIN Plane p ON f.Plane_ID = p.ID
+        LEFT JOIN (
+            SELECT o.Flight_ID, COUNT(a.Class_ID) AS booked_seats
+            FROM Assigned a
+            JOIN `Order` o ON a.Order_ID = o.Order_ID
+            WHERE o.Status = 'Active'
+            GROUP BY o.Flight_ID
+        ) seat_counts ON f.ID = seat_counts.Flight_ID
+        WHERE f.Path_Origin_Airport = %(origin)s
+          AND f.Path_Dest_Airport = %(dest)s
+          AND DATE(f.Departure_DateTime) = %(date)s
+          AND (p.Total_Capacity - COALESCE(seat_counts.booked_seats, 0)) >= %(passengers)s
+        ORDER BY f.Departure_DateTime ASC
+    """,
+    "seat_map": """
+        SELECT c.ID, c.Row_Num, c.Column_Letter, c.Type,
+               IF(EXISTS(
+                   SELECT 1 FROM Assigned a JOIN `Order` o ON a.Order_ID = o.Order_ID
+                   WHERE a.Class_ID = c.ID AND o.Flight_ID = %(flight_id)s
+               ), 1, 0)
+        FROM class c
+        JOIN Flight f ON f.Plane_ID = c.Plane_ID
+        WHERE f.ID = %(flight_id)s
+        ORDER BY c.Row_Num, c.Column_Letter
+    """,
+    "order_seats": """
+        SELECT a.Class_ID, c.Type
+        FROM Assigned a JOIN class c ON a.Class_ID = c.ID
+        WHERE a.Order_ID = %(order_id)s
+    """,
+}
+
+AFTER_QUERIES = {
+    "search": """
+        SELECT f.ID, f.Departure_DateTime, f.Arrival_DateTime, f.Path_Origin_Airport, f.Path_Dest_Airport,
+               f.Business_Seat_Price, f.Economy_Seat_Price, f.Plane_ID
+        FROM Flight f
+        JOIN Plane p ON f.Plane_ID = p.ID
+        LEFT JOIN Flight_Seat_Counts sc ON sc.Flight_ID = f.ID
+        WHERE f.Path_Origin_Airport = %(origin)s
+          AND f.Path_Dest_Airport = %(dest)s
+          AND f.Departure_DateTime >= %(day_start)s
+          AND f.Departure_DateTime < %(day_end)s
+          AND COALESCE(sc.Seats_Remaining, p.Total_Capacity) >= %(passengers)s
+        ORDER BY f.Departure_DateTime ASC
+    """,
+    "seat_map_layout": """
+        SELECT ID, Row_Num, Column_Letter, Type
+        FROM class WHERE Plane_ID = %(plane_id)s
+        ORDER BY Row_Num, Column_Letter
+    """,
+    "seat_map_occupied": """
+        SELECT a.Class_ID
+        FROM `Order` o JOIN Assigned a ON a.Order_ID = o.Order_ID
+        WHERE o.Flight_ID = %(flight_id)s AND o.Status = 'Active'
+    """,
+    "order_seats": BEFORE_QUERIES["order_seats"],
+}
+
+
+def make_params(flights, orders: int, rng: random.Random, n: int):
+    params = []
+    for _ in range(n):
+        flight = rng.choice(flights)
+        day_start = flight[1].replace(hour=0, minute=0, second=0, microsecond=0)
+        params.append({
+            "origin": flight[3],
+            "dest": flight[4],
+            "date": day_start.strftime("%Y-%m-%d"),
+            "day_start": day_start,
+            "day_end": day_start + timedelta(days=1),
+            "passengers": rng.randint(1, 4),
+            "flight_id": flight[0],
+            "plane_id": flight[7],
+            "order_id": rng.randint(1, max(orders, 1)),
+        })
+    return params
+
+
+def time_query(cursor, sql: str, params_list) -> dict:
+    timings = []
+    for params in params_list:
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "runs": len(timings),
+        "mean_ms": statistics.fmean(timings),
+        "p50_ms": timings[len(timings) // 2],
+        "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def explain(cursor, sql: str, params) -> list:
+    cursor.execute("EXPLAIN " + sql, params)
+    columns = [c[0] for c in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def drop_indexes(cursor, database: str) -> None:
+    """
+    Remove the indexes created by migration 002 (if present) for the 'before' run.
+    """
+    cursor.execute(
+        """
+        SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.statistics
+        WHERE TABLE_SCHEMA = %s AND INDEX_NAME IN
+              ('idx_flight_route_departure', 'idx_class_plane_layout', 'idx_order_flight_status', 'idx_assigned_order')
+        """,
+        (database,),
+    )
+    for table, index in cursor.fetchall():
+        cursor.execute(f"DROP INDEX {index} ON `{table}`")
+
+
+def run_phase(cursor, name: str, queries: dict, params_list) -> dict:
+    print(f"\n=== {name} ===")
+    results = {}
+    for query_name, sql in queries.items():
+        stats = time_query(cursor, sql, params_list)
+        plan = explain(cursor, sql, params_list[0])
+        results[query_name] = {"latency": stats, "explain": plan}
+        print(f"{query_name:<20} mean {stats['mean_ms']:8.2f} ms   p50 {stats['p50_ms']:8.2f} ms   "
+              f"p95 {stats['p95_ms']:8.2f} ms")
+        for step in plan:
+            print(f"    {step.get('table')!s:<12} type={step.get('type')!s:<7} key={step.get('key')!s:<28} "
+                  f"rows={step.get('rows')!s:<8} {step.get('Extra') or ''}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FLYTAU read paths before/after the search indexes.")
+    parser.add_argument("--database", default="flytau_bench", help="Scratch database (dropped and recreated).")
+    parser.add_argument("--flights", type=int, default=50000)
+    parser.add_argument("--orders", type=int, default=250000)
+    parser.add_argument("--runs", type=int, default=200, help="Executions per query and phase.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse an already seeded database.")
+    args = parser.parse_args()
+
+    if args.skip_seed:
+        conn = connect(args.database)
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT ID, Departure_DateTime, Arrival_DateTime, Path_Origin_Airport, Path_Dest_Airport, "
+            "Business_Seat_Price, Economy_Seat_Price, Plane_ID FROM Flight"
+        )
+        flights = cursor.fetchall()
+        cursor.execute("SELECT COUNT(*) FROM `Order`")
+        orders = cursor.fetchone()[0]
+    else:
+        print(f"Seeding {args.flights} flights / {args.orders} orders into {args.database} ...")
+        started = time.perf_counter()
+        create_database(args.database, migration_files(upto="001"))
+        summary = seed(args.database, flights=args.flights, orders=args.orders, seed_value=args.seed)
+        print(f"Seeded in {time.perf_counter() - started:.1f}s ({summary['assigned']} assigned seats)")
+        flights, orders = summary["flights"], summary["orders"]
+        conn = connect(args.database)
+        cursor = conn.cursor()
+
+    params_list = make_params(flights, orders, random.Random(args.seed), args.runs)
+
+    drop_indexes(cursor, args.database)
+    cursor.execute("ANALYZE TABLE Flight, class, `Order`, Assigned")
+    cursor.fetchall()
+    run_phase(cursor, "before (original queries, no 002 indexes)", BEFORE_QUERIES, params_list)
+
+    run_sql_file(cursor, MIGRATIONS_DIR / "002_search_indexes.sql")
+    cursor.execute("ANALYZE TABLE Flight, class, `Order`, Assigned")
+    cursor.fetchall()
+    run_phase(cursor, "after (current queries, 002 indexes)", AFTER_QUERIES, params_list)
+
+    cursor.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Synthetic FLYTAU data for benchmarks and load tests.
+
+Creates a throwaway database from sql/schema.sql (+ migrations) and fills it
+with planes, seat layouts, routes, flights, guests, orders and Assigned seats.
+Everything is generated from a seed, so two runs produce the same rows.
+
+Connection settings come from the same .env as the app (DB_HOST, DB_USER,
+DB_PASSWORD); the database name is always passed explicitly so a benchmark
+never writes into the real DB_NAME.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import mysql.connector
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ROOT = Path(__file__).resolve().parent.parent
+SCHEMA_FILE = ROOT / "sql" / "schema.sql"
+MIGRATIONS_DIR = ROOT / "sql" / "migrations"
+
+AIRPORTS = [
+    "TLV", "JFK", "LHR", "CDG", "FRA", "AMS", "MAD", "FCO", "ATH", "IST",
+    "DXB", "BKK", "NRT", "LAX", "SFO", "ORD", "YYZ", "BCN", "VIE", "ZRH",
+]
+BUSINESS_ROWS = 5
+BUSINESS_LETTERS = "ABCD"
+ECONOMY_ROWS = 25
+ECONOMY_LETTERS = "ABCDEF"
+
+
+def connect(database: str = None, **overrides):
+    params = dict(
+        host=os.getenv("DB_HOST"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        autocommit=True,
+    )
+    if database:
+        params["database"] = database
+    params.update(overrides)
+    return mysql.connector.connect(**params)
+
+
+def split_sql(text: str) -> List[str]:
+    """
+    Split a .sql file into statements (drops full-line `--` comments).
+    """
+    lines = [line for line in text.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def run_sql_file(cursor, path: Path) -> None:
+    for statement in split_sql(path.read_text()):
+        cursor.execute(statement)
+
+
+def migration_files(upto: str = None) -> List[Path]:
+    """
+    Migration files in order, optionally stopping after the one whose name starts with `upto`.
+    """
+    files = []
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        files.append(path)
+        if upto and path.name.startswith(upto):
+            break
+    return files
+
+
+def create_database(name: str, migrations: Iterable[Path] = ()) -> None:
+    """
+    Drop and recreate `name` with the base schema plus the given migrations.
+    """
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{name}`")
+    cursor.execute(f"CREATE DATABASE `{name}`")
+    cursor.execute(f"USE `{name}`")
+    run_sql_file(cursor, SCHEMA_FILE)
+    for path in migrations:
+        run_sql_file(cursor, path)
+    cursor.close()
+    conn.close()
+
+
+def _insert_batches(cursor, sql: str, rows: List[tuple], batch_size: int) -> None:
+    for start in range(0, len(rows), batch_size):
+        cursor.executemany(sql, rows[start:start + batch_size])
+
+
+def plane_layout(plane_id: int) -> List[tuple]:
+    """
+    (class_id, plane_id, type, row, letter, seat_type) for one plane.
+    Class IDs are derived from the plane ID so they are stable across runs.
+    """
+    seats = []
+    seat_no = 0
+    for row in range(1, BUSINESS_ROWS + ECONOMY_ROWS + 1):
+        business = row <= BUSINESS_ROWS
+        letters = BUSINESS_LETTERS if business else ECONOMY_LETTERS
+        for i, letter in enumerate(letters):
+            seat_no += 1
+            if i in (0, len(letters) - 1):
+                seat_type = "Window"
+            elif i in (len(letters) // 2 - 1, len(letters) // 2):
+                seat_type = "Aisle"
+            else:
+                seat_type = "Middle"
+            seats.append((plane_id * 1000 + seat_no, plane_id, "Business" if business else "Economy",
+                          row, letter, seat_type))
+    return seats
+
+
+def seed(database: str, flights: int = 10000, orders: int = 50000, planes: int = 20, guests: int = 2000,
+         seed_value: int = 42, days: int = 90, batch_size: int = 5000) -> Dict:
+    """
+    Fill `database` with synthetic rows. Returns a summary with the generated
+    flight rows so callers can pick realistic search parameters.
+    """
+    rng = random.Random(seed_value)
+    conn = connect(database)
+    cursor = conn.cursor()
+
+    routes = [(o, d) for o in AIRPORTS for d in AIRPORTS if o != d]
+    _insert_batches(cursor, "INSERT INTO path (Origin_Airport, Dest_Airport) VALUES (%s, %s)", routes, batch_size)
+
+    layouts = {plane_id: plane_layout(plane_id) for plane_id in range(1, planes + 1)}
+    _insert_batches(cursor, "INSERT INTO Plane (ID, Total_Capacity) VALUES (%s, %s)",
+                    [(plane_id, len(seats)) for plane_id, seats in layouts.items()], batch_size)
+    _insert_batches(
+        cursor,
+        "INSERT INTO class (ID, Plane_ID, Type, Row_Num, Column_Letter, Seat_Type) VALUES (%s, %s, %s, %s, %s, %s)",
+        [seat for seats in layouts.values() for seat in seats],
+        batch_size,
+    )
+
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=2)
+    flight_rows = []
+    for flight_id in range(1, flights + 1):
+        origin, dest = rng.choice(routes)
+        departure = start + timedelta(hours=rng.randrange(days * 24), minutes=rng.choice((0, 15, 30, 45)))
+        arrival = departure + timedelta(minutes=rng.randrange(60, 14 * 60, 5))
+        economy = rng.randrange(80, 900)
+        flight_rows.append((flight_id, departure, arrival, origin, dest, economy * 3, economy,
+                            rng.randrange(1, planes + 1)))
+    _insert_batches(
+        cursor,
+        """
+        INSERT INTO Flight (ID, Departure_DateTime, Arrival_DateTime, Path_Origin_Airport, Path_Dest_Airport,
+                            Business_Seat_Price, Economy_Seat_Price, Plane_ID)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        """,
+        flight_rows,
+        batch_size,
+    )
+
+    guest_mails = [f"guest{i}@bench.flytau" for i in range(1, guests + 1)]
+    _insert_batches(cursor, "INSERT INTO Guest (Mail) VALUES (%s)", [(m,) for m in guest_mails], batch_size)
+
+    # Seats are handed out in layout order per flight, so no seat is sold twice
+    next_seat = {}
+    order_rows, assigned_rows = [], []
+    for order_id in range(1, orders + 1):
+        flight = rng.choice(flight_rows)
+        flight_id, plane_id = flight[0], flight[7]
+        seats = layouts[plane_id]
+        used = next_seat.get(flight_id, 0)
+        count = min(rng.randint(1, 4), len(seats) - used)
+        if count <= 0:
+            continue
+        chosen = seats[used:used + count]
+        cancelled = rng.random() < 0.1
+        total = sum(float(flight[5] if seat[2] == "Business" else flight[6]) for seat in chosen)
+        order_rows.append((
+            order_id,
+            "Costumer Cancelation" if cancelled else "Active",
+            flight[1] - timedelta(days=rng.randrange(1, 60)),
+            round(total * 0.05, 2) if cancelled else total,
+            flight_id,
+            rng.choice(guest_mails),
+        ))
+        if not cancelled:
+            next_seat[flight_id] = used + count
+            assigned_rows.extend((seat[0], order_id, plane_id) for seat in chosen)
+
+    _insert_batches(
+        cursor,
+        """
+        INSERT INTO `Order` (Order_ID, Status, Order_Date, Total_Price, Flight_ID, Guest_Mail)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """,
+        order_rows,
+        batch_size,
+    )
+    _insert_batches(cursor, "INSERT INTO Assigned (Class_ID, Order_ID, Plane_ID) VALUES (%s, %s, %s)",
+                    assigned_rows, batch_size)
+
+    cursor.execute("SHOW TABLES LIKE 'Flight_Seat_Counts'")
+    if cursor.fetchone():
+        run_sql_file(cursor, MIGRATIONS_DIR / "001_flight_seat_counts.sql")
+    cursor.execute("SHOW TABLES LIKE 'Report_Flight_Stats'")
+    if cursor.fetchone():
+        run_sql_file(cursor, MIGRATIONS_DIR / "003_report_summaries.sql")
+
+    cursor.close()
+    conn.close()
+    return {
+        "flights": flight_rows,
+        "orders": len(order_rows),
+        "assigned": len(assigned_rows),
+        "guests": guest_mails,
+        "layouts": layouts,
+    }
@@ -0,0 +1,59 @@
+"""
+Write precompressed .gz (and .br, if brotli is installed) variants next to
+the static files, at maximum compression, for static_assets.py to serve.
+Run after changing anything in static/ (variants older than their source
+are ignored, so a stale one is never served):
+    python compress_static.py
+"""
+import argparse
+import gzip
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from static_assets import COMPRESSIBLE_TYPES
+
+STATIC_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+
+def compress_folder(folder: str, min_size: int = 500) -> int:
+    written = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            if name.endswith((".gz", ".br")) or mimetypes.guess_type(name)[0] not in COMPRESSIBLE_TYPES:
+                continue
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                data = f.read()
+            if len(data) < min_size:
+                continue
+
+            variants = [(".gz", gzip.compress(data, compresslevel=9))]
+            if brotli is not None:
+                variants.append((".br", brotli.compress(data, quality=11)))
+            for suffix, compressed in variants:
+                with open(path + suffix, "wb") as f:
+                    f.write(compressed)
+                written += 1
+                print(f"{os.path.relpath(path, folder)}{suffix}: {len(data)} -> {len(compressed)} bytes")
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompress static assets (gzip, and brotli if installed).")
+    parser.add_argument("--folder", default=STATIC_FOLDER, help="Static folder to compress.")
+    parser.add_argument("--min-size", type=int, default=500, help="Skip files smaller than this many bytes.")
+    args = parser.parse_args()
+
+    if brotli is None:
+        print("brotli is not installed, writing .gz variants only (pip install brotli).")
+    written = compress_folder(args.folder, min_size=args.min_size)
+    print(f"Wrote {written} precompressed file(s).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,435 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import mysql.connector
+
+logger = logging.getLogger("flytau.db_pool")
+
+# Errors after which a connection is lost or out of sync with the server
+# (dropped socket, packets out of order) and must not be reused
+BROKEN_CONNECTION_ERRORS = (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError)
+
+
+class PoolTimeoutError(Exception):
+    """
+    Raised when no connection becomes available within the pool timeout.
+    """
+
+
+class PooledConnection:
+    """
+    A raw mysql.connector connection plus the bookkeeping the pool needs
+    to decide when it is too old or too idle to hand out again.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+
+class ConnectionPool:
+    """
+    Bounded pool of MySQL connections.
+
+    - At most `size` connections are open at once; callers beyond that wait
+      up to `timeout` seconds and then get a PoolTimeoutError.
+    - Idle connections are reused LIFO so the hot ones stay warm.
+    - Before checkout a connection is recycled if it has been idle longer than
+      `max_idle` or open longer than `max_lifetime`, and pinged if it has been
+      idle longer than `ping_after` (a failed ping replaces it with a new one).
+    - Wait time and checkout counts are kept in `stats()`.
+    """
+
+    def __init__(self, size: int = 10, timeout: float = 10.0, max_idle: float = 300.0,
+                 max_lifetime: float = 3600.0, ping_after: float = 5.0, **connect_kwargs):
+        self.size = size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.ping_after = ping_after
+        self.connect_kwargs = connect_kwargs
+
+        self._idle = deque()
+        self._open = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "connections_created": 0,
+            "connections_recycled": 0,
+            "health_check_failures": 0,
+        }
+
+    def _connect(self) -> PooledConnection:
+        conn = mysql.connector.connect(**self.connect_kwargs)
+        with self._cond:
+            self._stats["connections_created"] += 1
+        return PooledConnection(conn)
+
+    def _close(self, pooled: PooledConnection) -> None:
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
+
+    def _is_usable(self, pooled: PooledConnection) -> bool:
+        """
+        Decide whether an idle connection can be handed out again.
+        """
+        now = time.monotonic()
+        if now - pooled.created_at > self.max_lifetime or now - pooled.last_used > self.max_idle:
+            with self._cond:
+                self._stats["connections_recycled"] += 1
+            return False
+
+        if now - pooled.last_used > self.ping_after:
+            try:
+                pooled.conn.ping(reconnect=False)
+            except Exception:
+                with self._cond:
+                    self._stats["health_check_failures"] += 1
+                return False
+        return True
+
+    def acquire(self) -> PooledConnection:
+        started = time.monotonic()
+        deadline = started + self.timeout
+
+        while True:
+            with self._cond:
+                while not self._idle and self._open >= self.size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available after {self.timeout:.1f}s (pool size {self.size})."
+                        )
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    pooled = self._idle.pop()
+                else:
+                    # Reserve the slot before connecting outside the lock
+                    self._open += 1
+                    pooled = None
+
+            if pooled is None:
+                try:
+                    pooled = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_usable(pooled):
+                self._discard(pooled)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._stats["checkouts"] += 1
+                self._stats["wait_seconds_total"] += waited
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+            return pooled
+
+    def _discard(self, pooled: PooledConnection) -> None:
+        self._close(pooled)
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def release(self, pooled: PooledConnection, discard: bool = False) -> None:
+        """
+        Return a connection to the pool, rolling back anything left open.
+        """
+        if not discard:
+            try:
+                if pooled.conn.in_transaction:
+                    pooled.conn.rollback()
+                if not pooled.conn.autocommit:
+                    pooled.conn.autocommit = True
+            except Exception:
+                discard = True
+
+        if discard:
+            self._discard(pooled)
+            return
+
+        pooled.last_used = time.monotonic()
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """
+        Check out a raw connection for the duration of the block.
+        """
+        pooled = self.acquire()
+        broken = False
+        try:
+            yield pooled.conn
+        except BROKEN_CONNECTION_ERRORS:
+            # Lost/closed connections must not go back to the idle list
+            broken = True
+            raise
+        finally:
+            self.release(pooled, discard=broken)
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close(pooled)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self.size
+            stats["open"] = self._open
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = self._open - len(self._idle)
+        checkouts = stats["checkouts"]
+        stats["wait_seconds_avg"] = stats["wait_seconds_total"] / checkouts if checkouts else 0.0
+        return stats
+
+
+class Replica:
+    """
+    One read replica: its pool plus the health the router last saw.
+    """
+
+    def __init__(self, name: str, pool: ConnectionPool):
+        self.name = name
+        self.pool = pool
+        self.lag: Optional[float] = None  # seconds behind the primary, None if unknown / not replicating
+        self.down_until = 0.0
+        self.checked_at = 0.0
+
+
+class ReplicaRouter:
+    """
+    Picks a read replica for read-only helpers, or None to use the primary.
+
+    Replicas are used round-robin while they are reachable and at most
+    `max_lag` seconds behind the primary. Lag (Seconds_Behind_Source from
+    SHOW REPLICA STATUS) is re-checked at most every `check_interval` seconds
+    per replica, by whichever request picks it first; a replica that fails to
+    connect or to report replication is skipped for `retry_after` seconds.
+    With no usable replica, pick() returns None and the caller reads from the
+    primary, so a lagging or stopped replica only costs primary load.
+    """
+
+    def __init__(self, replicas: List[Replica], max_lag: float = 2.0, check_interval: float = 2.0,
+                 retry_after: float = 10.0):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.retry_after = retry_after
+        self._next = itertools.cycle(range(len(replicas)))
+        self._lock = threading.Lock()
+        self._checking = set()
+        self._stats = {"reads": 0, "fallbacks": 0, "lag_checks": 0, "failures": 0}
+
+    def _check_lag(self, replica: Replica) -> None:
+        with replica.pool.connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            try:
+                try:
+                    cursor.execute("SHOW REPLICA STATUS")
+                except mysql.connector.errors.ProgrammingError:
+                    cursor.execute("SHOW SLAVE STATUS")  # MySQL < 8.0.22
+                status = cursor.fetchone()
+            finally:
+                cursor.close()
+        if status is None:
+            lag = None
+        else:
+            lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+        with self._lock:
+            replica.lag = None if lag is None else float(lag)
+            replica.checked_at = time.monotonic()
+            self._stats["lag_checks"] += 1
+        if lag is None:
+            logger.warning("Replica %s is not replicating; reading from the primary.", replica.name)
+
+    def _refresh(self, replica: Replica, now: float) -> None:
+        """
+        Re-check a replica's lag if it is due, unless another thread already is.
+        """
+        with self._lock:
+            if now - replica.checked_at < self.check_interval or replica in self._checking:
+                return
+            self._checking.add(replica)
+        try:
+            self._check_lag(replica)
+        except Exception as e:
+            self.mark_down(replica, e)
+        finally:
+            with self._lock:
+                self._checking.discard(replica)
+
+    def _usable(self, replica: Replica, now: float) -> bool:
+        return replica.down_until <= now and replica.lag is not None and replica.lag <= self.max_lag
+
+    def pick(self) -> Optional[Replica]:
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                replica = self.replicas[next(self._next)]
+            if replica.down_until > now:
+                continue
+            self._refresh(replica, now)
+            if self._usable(replica, time.monotonic()):
+                with self._lock:
+                    self._stats["reads"] += 1
+                return replica
+        with self._lock:
+            self._stats["fallbacks"] += 1
+        return None
+
+    def mark_down(self, replica: Replica, error: Exception) -> None:
+        logger.warning("Replica %s unavailable for %.0fs: %s", replica.name, self.retry_after, error)
+        with self._lock:
+            replica.down_until = time.monotonic() + self.retry_after
+            # Re-check lag as soon as it is retried
+            replica.checked_at = 0.0
+            self._stats["failures"] += 1
+
+    @contextmanager
+    def connection(self):
+        """
+        Yield a raw connection on a usable replica, or None when the caller
+        should use the primary (no usable replica, or checkout failed).
+        """
+        replica = self.pick()
+        pooled = None
+        if replica is not None:
+            try:
+                pooled = replica.pool.acquire()
+            except Exception as e:
+                self.mark_down(replica, e)
+                with self._lock:
+                    self._stats["fallbacks"] += 1
+        if pooled is None:
+            yield None
+            return
+
+        broken = False
+        try:
+            yield pooled.conn
+        except BROKEN_CONNECTION_ERRORS as e:
+            broken = True
+            if isinstance(e, mysql.connector.errors.OperationalError):
+                self.mark_down(replica, e)
+            raise
+        finally:
+            replica.pool.release(pooled, discard=broken)
+
+    def stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            stats = {f"replica_{key}": value for key, value in self._stats.items()}
+            stats["replicas"] = len(self.replicas)
+            stats["replicas_usable"] = sum(self._usable(replica, now) for replica in self.replicas)
+            lags = [replica.lag for replica in self.replicas if replica.lag is not None]
+        stats["replica_lag_seconds_max"] = max(lags) if lags else -1
+        return stats
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+_router: Optional[ReplicaRouter] = None
+_router_pid: Optional[int] = None
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Return the process-wide pool, creating it from the .env settings on first use.
+
+    Connections are never shared across a fork: a child process that inherits
+    the pool object builds its own.
+    """
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = ConnectionPool(
+                size=int(os.getenv("DB_POOL_SIZE", "10")),
+                timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+                ping_after=float(os.getenv("DB_POOL_PING_AFTER", "5")),
+                host=os.getenv("DB_HOST"),
+                user=os.getenv("DB_USER"),
+                password=os.getenv("DB_PASSWORD"),
+                database=os.getenv("DB_NAME"),
+                autocommit=True,
+                # Drop any rows a helper did not read before the connection is reused
+                consume_results=True,
+            )
+            _pool_pid = os.getpid()
+    return _pool
+
+
+def get_replica_router() -> Optional[ReplicaRouter]:
+    """
+    The process-wide replica router built from DB_REPLICA_HOSTS
+    ("host[:port],..."), or None when no replica is configured.
+    """
+    global _router, _router_pid
+    if _router_pid == os.getpid():
+        return _router
+
+    with _pool_lock:
+        if _router_pid != os.getpid():
+            replicas = []
+            for endpoint in filter(None, (item.strip() for item in os.getenv("DB_REPLICA_HOSTS", "").split(","))):
+                host, _, port = endpoint.partition(":")
+                replicas.append(Replica(endpoint, ConnectionPool(
+                    size=int(os.getenv("DB_REPLICA_POOL_SIZE", os.getenv("DB_POOL_SIZE", "10"))),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                    max_idle=float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+                    max_lifetime=float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+                    ping_after=float(os.getenv("DB_POOL_PING_AFTER", "5")),
+                    host=host,
+                    port=int(port or 3306),
+                    user=os.getenv("DB_REPLICA_USER", os.getenv("DB_USER")),
+                    password=os.getenv("DB_REPLICA_PASSWORD", os.getenv("DB_PASSWORD")),
+                    database=os.getenv("DB_NAME"),
+                    autocommit=True,
+                    consume_results=True,
+                    # A dead replica must fail fast: the request falls back to the primary
+                    connection_timeout=int(os.getenv("DB_REPLICA_CONNECT_TIMEOUT", "2")),
+                )))
+            _router = ReplicaRouter(
+                replicas,
+                max_lag=float(os.getenv("DB_REPLICA_MAX_LAG", "2")),
+                check_interval=float(os.getenv("DB_REPLICA_CHECK_SECONDS", "2")),
+                retry_after=float(os.getenv("DB_REPLICA_RETRY_SECONDS", "10")),
+            ) if replicas else None
+            _router_pid = os.getpid()
+    return _router
+
+
+def get_pool_stats() -> Dict:
+    stats = get_pool().stats()
+    router = get_replica_router()
+    if router is not None:
+        stats.update(router.stats())
+    return stats
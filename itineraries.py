@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger("flytau.itineraries")
+
+
+class Leg:
+    """
+    One bookable flight in the route graph.
+    """
+
+    __slots__ = ("flight_id", "origin", "destination", "departure", "arrival",
+                 "economy_price", "business_price", "seats_remaining")
+
+    def __init__(self, flight_id: int, origin: str, destination: str, departure: datetime, arrival: datetime,
+                 economy_price, business_price, seats_remaining: int):
+        self.flight_id = flight_id
+        self.origin = origin
+        self.destination = destination
+        self.departure = departure
+        self.arrival = arrival
+        self.economy_price = float(economy_price)
+        self.business_price = float(business_price)
+        self.seats_remaining = int(seats_remaining)
+
+    def sort_key(self):
+        return self.departure, self.flight_id
+
+    def __lt__(self, other: "Leg"):
+        return self.sort_key() < other.sort_key()
+
+    def to_dict(self) -> Dict:
+        return {
+            "flight_id": self.flight_id,
+            "origin_airport": self.origin,
+            "destination_airport": self.destination,
+            "departure_datetime": self.departure.strftime("%Y-%m-%d %H:%M:%S"),
+            "arrival_datetime": self.arrival.strftime("%Y-%m-%d %H:%M:%S"),
+            "economy_seat_price": self.economy_price,
+            "business_seat_price": self.business_price,
+            "seats_remaining": self.seats_remaining,
+        }
+
+
+class RouteGraph:
+    """
+    In-memory graph of upcoming flights for connecting-flight search.
+
+    Airports are nodes; each upcoming Flight is a timed edge kept in a per-origin
+    list sorted by departure, so "flights leaving X between t1 and t2" is a
+    bisect. The path table gives the static airport graph, used to skip
+    connections through airports that cannot reach the destination in the
+    remaining number of hops.
+
+    The graph is updated in place when flights are added/cancelled or seats
+    change, and fully reloaded in the background every `refresh_interval`
+    seconds to pick up writes made by other processes.
+
+    Loaders are passed in so this module never touches the database:
+        load_legs() -> [(flight_id, origin, dest, departure, arrival, economy, business, seats_remaining), ...]
+        load_paths() -> [(origin, dest), ...]
+    """
+
+    def __init__(self, load_legs: Callable, load_paths: Callable, refresh_interval: float = 300.0):
+        self._load_legs = load_legs
+        self._load_paths = load_paths
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._by_origin: Dict[str, List[Leg]] = defaultdict(list)
+        self._by_id: Dict[int, Leg] = {}
+        self._reverse_paths: Dict[str, Set[str]] = defaultdict(set)
+        self._loaded_at: Optional[float] = None
+        self._refreshing = False
+
+    # -- loading -----------------------------------------------------------
+
+    def rebuild(self) -> None:
+        legs = [Leg(*row) for row in self._load_legs()]
+        reverse_paths = defaultdict(set)
+        for origin, dest in self._load_paths():
+            reverse_paths[dest].add(origin)
+
+        by_origin = defaultdict(list)
+        for leg in legs:
+            by_origin[leg.origin].append(leg)
+        for origin_legs in by_origin.values():
+            origin_legs.sort()
+
+        with self._lock:
+            self._by_origin = by_origin
+            self._by_id = {leg.flight_id: leg for leg in legs}
+            self._reverse_paths = reverse_paths
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self) -> None:
+        if self._loaded_at is None:
+            self.rebuild()
+            return
+        if time.monotonic() - self._loaded_at < self.refresh_interval or self._refreshing:
+            return
+
+        # Serve the current graph while a new one is loaded
+        self._refreshing = True
+
+        def refresh():
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.exception("Route graph refresh error: %s", e)
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, name="route-graph-refresh", daemon=True).start()
+
+    # -- incremental updates ----------------------------------------------
+
+    def add_flight(self, flight_id: int, origin: str, destination: str, departure: datetime, arrival: datetime,
+                   economy_price, business_price, seats_remaining: int) -> None:
+        leg = Leg(flight_id, origin, destination, departure, arrival, economy_price, business_price, seats_remaining)
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._remove(flight_id)
+            insort(self._by_origin[origin], leg)
+            self._by_id[flight_id] = leg
+            self._reverse_paths[destination].add(origin)
+
+    def remove_flight(self, flight_id: int) -> None:
+        with self._lock:
+            self._remove(flight_id)
+
+    def _remove(self, flight_id: int) -> None:
+        leg = self._by_id.pop(flight_id, None)
+        if leg is None:
+            return
+        origin_legs = self._by_origin[leg.origin]
+        idx = bisect_left(origin_legs, leg)
+        if idx < len(origin_legs) and origin_legs[idx] is leg:
+            del origin_legs[idx]
+
+    def adjust_seats(self, flight_id: int, delta: int) -> None:
+        with self._lock:
+            leg = self._by_id.get(flight_id)
+            if leg is not None:
+                leg.seats_remaining += delta
+
+    # -- search -------------------------------------------------------------
+
+    def _reachable_within(self, destination: str, hops: int) -> Dict[str, int]:
+        """
+        Airports from which `destination` can be reached, with the minimum number of hops.
+        """
+        distance = {destination: 0}
+        queue = deque([destination])
+        while queue:
+            airport = queue.popleft()
+            if distance[airport] == hops:
+                continue
+            for previous in self._reverse_paths.get(airport, ()):
+                if previous not in distance:
+                    distance[previous] = distance[airport] + 1
+                    queue.append(previous)
+        return distance
+
+    def _departures(self, airport: str, earliest: datetime, latest: datetime) -> List[Leg]:
+        legs = self._by_origin.get(airport, [])
+        start = bisect_left(legs, (earliest,), key=Leg.sort_key)
+        result = []
+        for leg in legs[start:]:
+            if leg.departure > latest:
+                break
+            result.append(leg)
+        return result
+
+    def find_itineraries(self, origin: str, destination: str, departure_date: str, passengers: int = 1,
+                         max_stops: int = 2, min_layover: timedelta = timedelta(minutes=45),
+                         max_layover: timedelta = timedelta(hours=6), sort_by: str = "duration",
+                         seat_class: str = "economy", limit: int = 20) -> List[Dict]:
+        """
+        Itineraries from origin to destination leaving on departure_date with
+        up to `max_stops` connections, every leg having `passengers` free seats
+        and every layover within [min_layover, max_layover].
+        Ranked by total travel time ("duration") or total price ("price").
+        """
+        self._ensure_fresh()
+        origin, destination = origin.upper(), destination.upper()
+        day_start = datetime.strptime(departure_date, "%Y-%m-%d")
+        price_attr = "business_price" if seat_class == "business" else "economy_price"
+
+        results = []
+        with self._lock:
+            reachable = self._reachable_within(destination, max_stops + 1)
+            if origin not in reachable:
+                return []
+
+            def extend(path: List[Leg], visited: Set[str]):
+                last = path[-1]
+                if last.destination == destination:
+                    results.append(list(path))
+                    return
+                stops_left = max_stops - (len(path) - 1)
+                # The next leg plus any further ones must still reach the destination
+                if stops_left <= 0 or reachable.get(last.destination, stops_left + 2) > stops_left:
+                    return
+                for leg in self._departures(last.destination, last.arrival + min_layover, last.arrival + max_layover):
+                    if leg.seats_remaining >= passengers and leg.destination not in visited:
+                        path.append(leg)
+                        visited.add(leg.destination)
+                        extend(path, visited)
+                        visited.discard(leg.destination)
+                        path.pop()
+
+            for first in self._departures(origin, day_start, day_start + timedelta(days=1) - timedelta(microseconds=1)):
+                if first.seats_remaining >= passengers and reachable.get(first.destination, max_stops + 2) <= max_stops:
+                    extend([first], {origin, first.destination})
+
+            itineraries = []
+            for legs in results:
+                total_price = sum(getattr(leg, price_attr) for leg in legs) * passengers
+                itineraries.append({
+                    "stops": len(legs) - 1,
+                    "departure_datetime": legs[0].departure.strftime("%Y-%m-%d %H:%M:%S"),
+                    "arrival_datetime": legs[-1].arrival.strftime("%Y-%m-%d %H:%M:%S"),
+                    "total_minutes": int((legs[-1].arrival - legs[0].departure).total_seconds() // 60),
+                    "total_price": round(total_price, 2),
+                    "legs": [leg.to_dict() for leg in legs],
+                })
+
+        if sort_by == "price":
+            itineraries.sort(key=lambda it: (it["total_price"], it["total_minutes"]))
+        else:
+            itineraries.sort(key=lambda it: (it["total_minutes"], it["total_price"]))
+        return itineraries[:limit]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "flights": len(self._by_id),
+                "airports": len(self._by_origin),
+                "age_seconds": time.monotonic() - self._loaded_at if self._loaded_at else None,
+            }
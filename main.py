@@ -1,19 +1,100 @@
-from flask import Flask, render_template, request, redirect, session, jsonify, url_for, flash
-from flask_session import Session
+import csv
+import io
+import json
+import logging
+import os
+import secrets
+import time
+
+from flask import Flask, render_template, request, redirect, session, jsonify, url_for, flash, Response, stream_with_context
 from datetime import timedelta, datetime
 from utils import *
+from scheduling import WEEKDAYS, expand_recurrence, parse_schedule_csv
+from seat_holds import start_sweeper
+from airports import start_refresher as start_airport_refresher
+from metrics import init_metrics
+from pricing import QuoteSigner, parse_seat_ids
+from session_store import init_session
+from static_assets import init_static_assets
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger("flytau")
 
 app = Flask(__name__)
 
 app.config.update(
-    SESSION_TYPE="filesystem",
-    SESSION_FILE_DIR="sessions",
-    SESSION_PERMANENT=True,
     PERMANENT_SESSION_LIFETIME=timedelta(minutes=30),
     SESSION_REFRESH_EACH_REQUEST=True,
     SESSION_COOKIE_SECURE=True,
 )
-Session(app)
+# Backend is chosen by SESSION_BACKEND (cookie / memory / redis), see session_store.py
+init_session(app)
+# Signs the seat price quote shown on /booking_summary; /finalize_booking charges the signed total
+quote_signer = QuoteSigner(app.secret_key, max_age=int(os.getenv("PRICE_QUOTE_SECONDS", "900")))
+# Request/DB timers on /metrics; registered first so its timer also covers compression
+init_metrics(app, pool_stats=get_pool_stats)
+# Fingerprinted, long-cached static files; compressed responses and ETag/304 for pages
+init_static_assets(app)
+
+# Folds booking/cancellation events into the report summary tables (0 disables; use rebuild_reports.py)
+REPORTS_REFRESH_SECONDS = float(os.getenv("REPORTS_REFRESH_SECONDS", "30"))
+# Completes the orders of departed flights and cancels orders left on cancelled flights (0 disables)
+ORDER_LIFECYCLE_SECONDS = float(os.getenv("ORDER_LIFECYCLE_SECONDS", "60"))
+# Reloads the airport autocomplete index (new Airport rows / routes from other workers; 0: load on first use only)
+AIRPORTS_REFRESH_SECONDS = float(os.getenv("AIRPORTS_REFRESH_SECONDS", "600"))
+# Whether this process runs the database-wide jobs; with several workers or
+# nodes set it to 1 in one of them and 0 in the rest
+RUN_SCHEDULERS = os.getenv("RUN_SCHEDULERS", "1") == "1"
+_background_jobs_started = False
+
+
+def start_background_jobs(app) -> None:
+    """
+    Start the background threads. Called by the server entrypoints (python
+    main.py, the ASGI lifespan), not on import, so tools importing the app
+    start nothing. Safe to call more than once.
+    """
+    global _background_jobs_started
+    if _background_jobs_started:
+        return
+    _background_jobs_started = True
+
+    if RUN_SCHEDULERS and REPORTS_REFRESH_SECONDS > 0:
+        start_report_aggregator(REPORTS_REFRESH_SECONDS)
+    if RUN_SCHEDULERS and ORDER_LIFECYCLE_SECONDS > 0:
+        start_order_lifecycle(ORDER_LIFECYCLE_SECONDS)
+
+    # Per-process: loads the airport index now and reloads it
+    if AIRPORTS_REFRESH_SECONDS > 0:
+        start_airport_refresher(airport_index, AIRPORTS_REFRESH_SECONDS)
+    # Per-process: drops expired checkout seat holds (expired holds are ignored on read in any case)
+    start_sweeper(seat_holds, float(os.getenv("SEAT_HOLD_SWEEP_SECONDS", "15")))
+
+
+@app.before_request
+def make_session_permanent():
+    # Cookie backend only: server-side sessions are always permanent and keep
+    # the flag out of the store. Only set once, assigning marks the session modified
+    if not session.permanent:
+        session.permanent = True
+
+
+# After a booking/cancellation the session reads from the primary for this long,
+# so it sees its own write even on a lagging replica (only with DB_REPLICA_HOSTS)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+
+
+@app.before_request
+def route_reads():
+    begin_read_routing(pin_primary=session.get("read_primary_until", 0) > time.time())
+
+
+@app.after_request
+def remember_writes(response):
+    if wrote_in_request() and get_replica_router() is not None:
+        session["read_primary_until"] = time.time() + READ_YOUR_WRITES_SECONDS
+    return response
 
 
 @app.errorhandler(404)
@@ -258,25 +339,16 @@ def logout():
     return redirect("/")
 
 
-@app.route("/search_flights", methods=["POST", "GET"])
-def search_flights_route():
+def parse_search_form(form) -> Tuple[Dict, List[str]]:
     """
-    Handle flight search requests via AJAX.
-    Validates user is logged in, validates inputs, and filters results
-    based on the plane's remaining capacity for all requested passengers.
+    Read and validate the flight search form.
+    Returns (search params, list of error messages). Shared with the ASGI mode.
     """
-    # 1. Check if user is logged in as customer or guest
-    user_type = session.get("user_type")
-    if user_type not in ["customer", "guest"]:
-        return jsonify({"error": "You must be signed in (as guest or customer) to search flights."}), 401
+    origin_airport = form.get("origin_airport", "").strip().upper()
+    destination_airport = form.get("destination_airport", "").strip().upper()
+    departure_date = form.get("departure_date", "").strip()
+    passengers = form.get("passengers", "1").strip()
 
-    # 2. Extract form data
-    origin_airport = request.form.get("origin_airport", "").strip().upper()
-    destination_airport = request.form.get("destination_airport", "").strip().upper()
-    departure_date = request.form.get("departure_date", "").strip()
-    passengers = request.form.get("passengers", "1").strip()
-
-    # 3. Server-side validation
     errors = []
 
     if not origin_airport or len(origin_airport) != 3:
@@ -288,6 +360,11 @@ def search_flights_route():
     if origin_airport and destination_airport and origin_airport == destination_airport:
         errors.append("Origin and destination airports must be different.")
 
+    # Unknown codes never reach the database (checked in memory, see utils.airport_index)
+    unknown = airport_index.unknown([code for code in (origin_airport, destination_airport) if len(code) == 3])
+    if unknown:
+        errors.append(f"Unknown airport code: {', '.join(unknown)}.")
+
     if not departure_date:
         errors.append("Departure date is required.")
     else:
@@ -298,34 +375,267 @@ def search_flights_route():
         except ValueError:
             errors.append("Invalid date format. Please use YYYY-MM-DD.")
 
-    # 4. Handle passenger count and session storage
+    passengers_int = None
     try:
         passengers_int = int(passengers)
         if passengers_int < 1 or passengers_int > 9:
             errors.append("Number of passengers must be between 1 and 9.")
-        else:
-            # Store passenger count in session for the seat selection logic
-            session['passengers'] = passengers_int
-            session["search_passengers"] = passengers_int
     except ValueError:
         errors.append("Number of passengers must be a valid number.")
 
+    params = {
+        "origin_airport": origin_airport,
+        "destination_airport": destination_airport,
+        "departure_date": departure_date,
+        "passengers": passengers_int,
+    }
+    return params, errors
+
+
+@app.route("/search_flights", methods=["POST", "GET"])
+def search_flights_route():
+    """
+    Handle flight search requests via AJAX.
+    Validates user is logged in, validates inputs, and filters results
+    based on the plane's remaining capacity for all requested passengers.
+    """
+    # 1. Check if user is logged in as customer or guest
+    user_type = session.get("user_type")
+    if user_type not in ["customer", "guest"]:
+        return jsonify({"error": "You must be signed in (as guest or customer) to search flights."}), 401
+
+    # 2. Extract and validate form data
+    params, errors = parse_search_form(request.form)
+
+    # 3. Store passenger count in session for the seat selection logic
+    if params["passengers"] and 1 <= params["passengers"] <= 9:
+        session['passengers'] = params["passengers"]
+        session["search_passengers"] = params["passengers"]
+
     if errors:
         return jsonify({"error": " ".join(errors)}), 400
 
-    # 5. Execute search using the updated schema (direct Flight_ID in Order table)
+    # 4. Execute search using the updated schema (direct Flight_ID in Order table)
     try:
-        # Pass passengers_int to ensure the flight has enough free seats
-        flights = search_flights(origin_airport, destination_airport, departure_date, passengers_int)
+        # Pass passengers to ensure the flight has enough free seats
+        flights = search_flights(**params)
 
         # Return results to be rendered on the client side
         return jsonify({"flights": flights, "count": len(flights)})
 
     except Exception as e:
         # Log the internal error and return a generic user-friendly message
-        print(f"Database Error: {e}")
+        logger.exception("Database Error: %s", e)
+        return jsonify({"error": "An error occurred while searching for flights. Please try again."}), 500
+
+
+AIRPORT_SUGGESTIONS = 8
+
+
+@app.route("/airports")
+def airports_route():
+    """
+    Airport autocomplete for the search forms: ?q=<code, city or name prefix>.
+    Answered from the in-memory index, never from MySQL per request.
+    """
+    query = request.args.get("q", "").strip()[:50]
+    try:
+        limit = min(max(int(request.args.get("limit", AIRPORT_SUGGESTIONS)), 1), 20)
+    except ValueError:
+        limit = AIRPORT_SUGGESTIONS
+    try:
+        airports = airport_index.search(query, limit)
+    except Exception as e:
+        logger.exception("Database Error: %s", e)
+        return jsonify({"error": "Airport suggestions are unavailable."}), 503
+    response = jsonify({"airports": airports})
+    # Suggestions only change on reload; let the browser reuse them while typing
+    response.headers["Cache-Control"] = "private, max-age=300"
+    return response
+
+
+FLEXIBLE_SEARCH_MAX_DAYS = 31
+FLEXIBLE_SEARCH_MAX_AIRPORTS = 5
+
+
+def _airport_codes(form, field: str) -> List[str]:
+    # Accept repeated fields and/or comma-separated codes
+    codes = []
+    for value in form.getlist(field):
+        codes.extend(code.strip().upper() for code in value.split(",") if code.strip())
+    return codes
+
+
+@app.route("/search_flights_flexible", methods=["POST"])
+def search_flights_flexible_route():
+    """
+    Flexible-date search via AJAX: a date range and one or more origin /
+    destination airports, answered by a single query grouped by day with
+    the cheapest economy and business price of each day.
+    """
+    # 1. Check if user is logged in as customer or guest
+    if session.get("user_type") not in ["customer", "guest"]:
+        return jsonify({"error": "You must be signed in (as guest or customer) to search flights."}), 401
+
+    # 2. Extract form data
+    origins = _airport_codes(request.form, "origin_airport")
+    destinations = _airport_codes(request.form, "destination_airport")
+    start_date = request.form.get("start_date", "").strip()
+    end_date = request.form.get("end_date", "").strip()
+    passengers = request.form.get("passengers", "1").strip()
+
+    # 3. Server-side validation
+    errors = []
+    if not origins or not destinations:
+        errors.append("At least one origin and one destination airport are required.")
+    elif len(origins) > FLEXIBLE_SEARCH_MAX_AIRPORTS or len(destinations) > FLEXIBLE_SEARCH_MAX_AIRPORTS:
+        errors.append(f"Up to {FLEXIBLE_SEARCH_MAX_AIRPORTS} origin and destination airports are allowed.")
+    elif any(len(code) != 3 for code in origins + destinations):
+        errors.append("Airports must be valid 3-letter codes.")
+    elif set(origins) == set(destinations) and len(origins) == 1:
+        errors.append("Origin and destination airports must be different.")
+    else:
+        unknown = airport_index.unknown(origins + destinations)
+        if unknown:
+            errors.append(f"Unknown airport code: {', '.join(unknown)}.")
+
+    try:
+        start = datetime.strptime(start_date, "%Y-%m-%d").date()
+        end = datetime.strptime(end_date, "%Y-%m-%d").date()
+        # Days already in the past are simply skipped
+        start = max(start, datetime.now().date())
+        if end < start:
+            errors.append("The date range must end on or after today and after its start.")
+        elif (end - start).days + 1 > FLEXIBLE_SEARCH_MAX_DAYS:
+            errors.append(f"The date range can cover at most {FLEXIBLE_SEARCH_MAX_DAYS} days.")
+    except ValueError:
+        errors.append("Invalid date format. Please use YYYY-MM-DD.")
+
+    try:
+        passengers_int = int(passengers)
+        if passengers_int < 1 or passengers_int > 9:
+            errors.append("Number of passengers must be between 1 and 9.")
+        else:
+            session['passengers'] = passengers_int
+            session["search_passengers"] = passengers_int
+    except ValueError:
+        errors.append("Number of passengers must be a valid number.")
+
+    if errors:
+        return jsonify({"error": " ".join(errors)}), 400
+
+    # 4. Execute the batched search
+    try:
+        days = search_flights_flexible(origins, destinations, start.isoformat(), end.isoformat(), passengers_int)
+        return jsonify({"days": days, "count": sum(len(day["flights"]) for day in days)})
+    except Exception as e:
+        logger.exception("Database Error: %s", e)
+        return jsonify({"error": "An error occurred while searching for flights. Please try again."}), 500
+
+
+@app.route("/search_itineraries", methods=["POST"])
+def search_itineraries_route():
+    """
+    Connecting-flight search via AJAX.
+    Takes the regular search form plus optional max_stops (0-2),
+    min_layover / max_layover (minutes) and sort ("duration" or "price").
+    """
+    if session.get("user_type") not in ["customer", "guest"]:
+        return jsonify({"error": "You must be signed in (as guest or customer) to search flights."}), 401
+
+    params, errors = parse_search_form(request.form)
+    try:
+        max_stops = int(request.form.get("max_stops", "2"))
+        min_layover = int(request.form.get("min_layover", "45"))
+        max_layover = int(request.form.get("max_layover", "360"))
+        if not 0 <= max_stops <= 2:
+            errors.append("Number of stops must be between 0 and 2.")
+        if min_layover < 0 or max_layover < min_layover:
+            errors.append("Layover limits are invalid.")
+    except ValueError:
+        errors.append("Stops and layover limits must be numbers.")
+    sort_by = request.form.get("sort", "duration")
+    if sort_by not in ("duration", "price"):
+        errors.append("Sort must be 'duration' or 'price'.")
+
+    if errors:
+        return jsonify({"error": " ".join(errors)}), 400
+
+    try:
+        itineraries = search_itineraries(
+            **params,
+            max_stops=max_stops,
+            min_layover_minutes=min_layover,
+            max_layover_minutes=max_layover,
+            sort_by=sort_by,
+        )
+        return jsonify({"itineraries": itineraries, "count": len(itineraries)})
+    except Exception as e:
+        logger.exception("Database Error: %s", e)
         return jsonify({"error": "An error occurred while searching for flights. Please try again."}), 500
 
+
+@app.route("/ticket_details")
+def ticket_details_route():
+    """
+    JSON ticket lookup for the signed-in guest or customer.
+    """
+    email = session.get('user_email') or session.get('guest_email')
+    try:
+        order_id = int(request.args.get('order_id', ''))
+    except ValueError:
+        return jsonify({"error": "Please provide a valid Order ID."}), 400
+    if not email:
+        return jsonify({"error": "You must be signed in to view an order."}), 401
+
+    ticket = get_ticket_details(order_id, email)
+    if not ticket:
+        return jsonify({"error": f"Order #{order_id} is not associated with your account."}), 404
+    return jsonify(ticket)
+
+@app.route("/purchase_history")
+def purchase_history():
+    """
+    JSON purchase history of the signed-in customer, newest first:
+        ?status=<one of ORDER_STATUSES>&cursor=<next_cursor of the previous page>&limit=20
+    The page is streamed as it is read from the database.
+    """
+    if session.get("user_type") != "customer":
+        return jsonify({"error": "Purchase history is available to registered customers."}), 401
+
+    status = request.args.get("status") or None
+    if status and status not in ORDER_STATUSES:
+        return jsonify({"error": f"Unknown status '{status}'."}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", "20")), 1), 100)
+        after = decode_history_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+    except ValueError:
+        return jsonify({"error": "Invalid page parameters."}), 400
+
+    # One extra row tells whether another page follows
+    orders = iter_purchase_history(session.get("user_email"), status=status, after=after, limit=limit + 1)
+    try:
+        first = next(orders, None)  # run the query now, so errors still get a proper status code
+    except Exception as e:
+        logger.exception("Database Error: %s", e)
+        return jsonify({"error": "Could not load your purchase history. Please try again."}), 500
+
+    def generate():
+        yield '{"orders": ['
+        pending, last, count = first, None, 0
+        try:
+            while pending is not None and count < limit:
+                yield ("," if count else "") + json.dumps(pending)
+                last, count = pending, count + 1
+                pending = next(orders, None)
+        finally:
+            orders.close()  # returns the connection even if the client disconnects
+        next_cursor = encode_history_cursor(last) if pending is not None else None
+        yield f'], "next_cursor": {json.dumps(next_cursor)}}}'
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
 @app.route("/manage_reservations")
 def manage_reservations():
     order_id = request.args.get('order_id')
@@ -376,12 +686,75 @@ def select_seat():
     flight_id = int(fid_raw)  # המרה קריטית!
     max_seats = int(session.get('passengers', 1))
 
-    seats_data = get_flight_seat_map(flight_id)
+    snapshot = get_seat_map_snapshot(flight_id)
+    seats_data = snapshot.to_seat_list() if snapshot else []
+    # Seats in someone else's checkout are shown as held; our own stay selectable
+    held = set(seat_holds.held_seats(flight_id, exclude_holder=session.get("hold_token")))
+    for seat in seats_data:
+        seat["is_held"] = seat["seat_id"] in held
+    availability = get_flight_availability(flight_id)
 
     return render_template("select_seat.html",
                            seats=seats_data,
                            flight_id=flight_id,
-                           max_seats=max_seats)
+                           max_seats=max_seats,
+                           availability=availability,
+                           seat_map_epoch=snapshot.epoch if snapshot else "",
+                           seat_map_version=snapshot.version if snapshot else 0)
+
+
+@app.route("/seat_map_changes")
+def seat_map_changes():
+    """
+    JSON delta for the seat map page.
+    Returns the seats whose occupancy changed since (epoch, version); if the
+    server cannot answer from its change log it returns the full occupied list.
+    """
+    try:
+        flight_id = int(request.args.get("flight_id", ""))
+        since = int(request.args.get("since", "0"))
+    except ValueError:
+        return jsonify({"error": "flight_id and since must be numbers."}), 400
+    epoch = request.args.get("epoch", "")
+
+    snapshot = get_seat_map_snapshot(flight_id)
+    if not snapshot:
+        return jsonify({"error": "Flight not found."}), 404
+
+    return jsonify(build_seat_map_changes(snapshot, epoch, since, hold_token=session.get("hold_token")))
+
+
+def build_seat_map_changes(snapshot, epoch: str, since: int, hold_token: Optional[str] = None) -> Dict:
+    """
+    Body of the /seat_map_changes response (shared with the ASGI mode).
+    `held` always lists every seat currently held by another passenger's checkout.
+    """
+    held = seat_holds.held_seats(snapshot.flight_id, exclude_holder=hold_token)
+    changes = snapshot.changes_since(epoch, since)
+    if changes is None:
+        return {
+            "epoch": snapshot.epoch,
+            "version": snapshot.version,
+            "full": True,
+            "occupied": snapshot.occupied_seat_ids(),
+            "held": held,
+        }
+    return {
+        "epoch": snapshot.epoch,
+        "version": snapshot.version,
+        "full": False,
+        "changes": changes,
+        "held": held,
+    }
+
+
+def _hold_token() -> str:
+    """
+    Identifies this browser session as a seat holder (kept in the session).
+    """
+    if "hold_token" not in session:
+        session["hold_token"] = secrets.token_urlsafe(16)
+    return session["hold_token"]
 
 
 @app.route("/booking_summary", methods=["POST"])
@@ -391,41 +764,38 @@ def booking_summary():
     NOTE: We still fetch Passport/DOB from the 'Costumer' table to pre-fill the form
     for UI/UX purposes, even though we won't save this info in the 'Order' table.
     """
-    selected_seats = request.form.getlist('selected_seats')
     flight_id = request.form.get('flight_id')
     max_seats = session.get('passengers', 1)
 
-    # 1. Validation
+    # 1. Validation: numeric, distinct seat IDs, one per passenger
+    if not flight_id or not flight_id.isdigit():
+        flash("Error: Flight details could not be retrieved.")
+        return redirect(url_for('home'))
+    try:
+        selected_seats = parse_seat_ids(request.form.getlist('selected_seats'))
+    except PricingError as e:
+        flash(f"Error: {e}")
+        return redirect(url_for('select_seat', flight_id=flight_id))
     if not selected_seats or len(selected_seats) != int(max_seats):
         flash(f"Error: You must select exactly {max_seats} seats.")
         return redirect(url_for('select_seat', flight_id=flight_id))
 
-    # 2. Get flight details
-    flight = get_flight_by_id(int(flight_id))
+    # 2. Get flight details and price the seats (both cached in memory)
+    flight = pricing_cache.get_flight(int(flight_id))
     if not flight:
         flash("Error: Flight details could not be retrieved.")
         return redirect(url_for('search_flights_route'))
-
-    # 3. Dynamic Price Calculation
-    total_price = 0
-    seat_details = []
     try:
-        with get_db_connection() as cursor:
-            format_strings = ','.join(['%s'] * len(selected_seats))
-            query = f"SELECT ID, Type, Row_Num, Column_Letter, Seat_Type FROM class WHERE ID IN ({format_strings})"
-            cursor.execute(query, tuple(selected_seats))
-            seats_from_db = cursor.fetchall()
-
-            for row in seats_from_db:
-                seat_id, class_type, row_num, col_letter, seat_location = row
-                price = float(flight['business_price']) if class_type.lower() == 'business' else float(flight['economy_price'])
-                total_price += price
-                seat_details.append({
-                    "id": seat_id, "type": class_type, "row": row_num,
-                    "letter": col_letter, "location": seat_location, "price": price
-                })
-    except Exception as e:
-        print(f"Database Error: {e}")
+        seat_details, total_price = pricing_cache.quote(int(flight_id), selected_seats)
+    except PricingError as e:
+        flash(f"Error: {e}")
+        return redirect(url_for('select_seat', flight_id=flight_id))
+
+    # 3. Hold the seats for this checkout; fail now rather than at payment if
+    # another passenger is already checking out with one of them
+    taken = seat_holds.hold(int(flight_id), selected_seats, _hold_token())
+    if taken:
+        flash("Sorry, some of these seats are being booked by another passenger. Please choose again.")
         return redirect(url_for('select_seat', flight_id=flight_id))
 
     # 4. PRE-FILL LOGIC: Fetch from 'Costumer' table to show on screen
@@ -441,8 +811,10 @@ def booking_summary():
                            seats=seat_details,
                            flight=flight,
                            total_price=total_price,
+                           price_quote=quote_signer.sign(int(flight_id), selected_seats, total_price),
                            user_data=user_data,
-                           is_guest=(session.get("user_type") == "guest"))
+                           is_guest=(session.get("user_type") == "guest"),
+                           hold_seconds=int(seat_holds.seconds_left(_hold_token()) or 0))
 
 
 @app.route("/finalize_booking", methods=["POST"])
@@ -454,7 +826,6 @@ def finalize_booking():
     """
     flight_id = request.form.get('flight_id')
     selected_seats = request.form.getlist('seats')
-    total_price = request.form.get('total_price')
 
     user_type = session.get('user_type')
     customer_mail = session.get('user_email') if user_type == 'customer' else None
@@ -465,13 +836,26 @@ def finalize_booking():
         flash("Booking data is missing.")
         return redirect(url_for('home'))
 
+    # The total comes from the signed quote, never from the form
+    try:
+        total_price = quote_signer.verify(request.form.get('price_quote'), int(flight_id), selected_seats)
+    except PricingError as e:
+        flash(f"{e} Please choose your seats again.")
+        return redirect(url_for('select_seat', flight_id=flight_id))
+
+    # Our hold may have expired and the seats gone to another checkout
+    hold_token = session.get("hold_token")
+    if seat_holds.conflicts(int(flight_id), [int(seat_id) for seat_id in selected_seats], hold_token):
+        flash("Your seat hold expired and some seats are now being booked by another passenger. Please choose again.")
+        return redirect(url_for('select_seat', flight_id=flight_id))
+
     try:
         # NOTICE: We do NOT pass passport/dob here anymore.
         # We only pass the fields that exist in your original 'Order' table.
         new_order_id = create_order_with_seats(
             flight_id=int(flight_id),
             selected_seats=selected_seats,
-            total_price=float(total_price),
+            total_price=total_price,
             customer_mail=customer_mail,
             guest_mail=guest_mail
         )
@@ -481,22 +865,221 @@ def finalize_booking():
                                order_id=new_order_id,
                                target_dashboard=target_dashboard)
 
+    except SeatTakenError as e:
+        # Another passenger booked one of these seats first - nothing was saved
+        flash(f"Sorry, seat(s) {', '.join(e.seats)} were just booked by another passenger. Please choose again.")
+        return redirect(url_for('select_seat', flight_id=flight_id))
+
     except Exception as e:
-        print(f"DATABASE TRANSACTION ERROR: {e}")
+        logger.exception("DATABASE TRANSACTION ERROR: %s", e)
         flash("We could not process your booking. Please try again.")
         return redirect(url_for('home'))
 
+    finally:
+        # The order is saved or failed either way, so the hold has done its job
+        if hold_token:
+            seat_holds.release(hold_token)
+
 @app.route('/manage_orders')
 def manage_orders():
     return "Manage Orders Page - Coming Soon"
 
 @app.route('/manage_flights')
 def manage_flights():
-    return "Manage Flights Page - Coming Soon"
+    if session.get("user_type") != "manager":
+        return redirect("/login")
+    return _render_manage_flights()
+
+
+def _render_manage_flights(**context):
+    try:
+        flights = get_upcoming_flights(limit=100)
+    except Exception as e:
+        logger.exception("Database Error: %s", e)
+        flights = []
+    return render_template("manage_flights.html", flights=flights, weekdays=WEEKDAYS, **context)
+
+
+def _schedule_plans_from_request() -> Tuple[List, List[str], bool]:
+    """
+    (plans, parse errors, dry_run) from a JSON body (a recurrence spec, or
+    {"csv": "..."}) or from the manage_flights form (recurrence fields or a CSV upload).
+    """
+    if request.is_json:
+        body = request.get_json(silent=True) or {}
+        dry_run = bool(body.get("dry_run"))
+        if "csv" in body:
+            plans, errors = parse_schedule_csv(str(body["csv"]))
+            return plans, errors, dry_run
+        spec = body
+    else:
+        dry_run = bool(request.form.get("dry_run"))
+        upload = request.files.get("schedule_csv")
+        if upload and upload.filename:
+            plans, errors = parse_schedule_csv(upload.read().decode("utf-8", "replace"))
+            return plans, errors, dry_run
+        spec = request.form.to_dict()
+        spec["weekdays"] = request.form.getlist("weekdays")
+
+    try:
+        return expand_recurrence(spec), [], dry_run
+    except (KeyError, TypeError, ValueError) as e:
+        detail = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+        return [], [f"Invalid recurrence: {detail}"], dry_run
+
+
+@app.route('/manage_flights/schedule', methods=['POST'])
+def schedule_flights_route():
+    """
+    Bulk-schedule flights from a weekly recurrence or a CSV (see scheduling.py).
+    JSON in, JSON out for API use; the form posts render the page again.
+    """
+    if session.get("user_type") != "manager":
+        if request.is_json:
+            return jsonify({"error": "Managers only."}), 403
+        return redirect("/login")
+
+    plans, errors, dry_run = _schedule_plans_from_request()
+    if errors:
+        result = {"created": 0, "flight_ids": [], "errors": errors}
+    else:
+        try:
+            result = schedule_flights(plans, dry_run=dry_run)
+        except Exception as e:
+            logger.exception("Database Error: %s", e)
+            result = {"created": 0, "flight_ids": [], "errors": ["Scheduling failed. Please try again."]}
+    result["requested"] = len(plans)
+    result["dry_run"] = dry_run
+
+    if request.is_json:
+        return jsonify(result), 400 if result["errors"] and not result["created"] else 200
+    return _render_manage_flights(schedule_result=result)
+
+
+@app.route('/manage_flights/cancel', methods=['POST'])
+def cancel_flights_route():
+    """
+    Cancel several flights at once; their active orders become 'system cancel'.
+    Takes {"flight_ids": [...]} as JSON or the flight_ids checkboxes / text field of the form.
+    """
+    if session.get("user_type") != "manager":
+        if request.is_json:
+            return jsonify({"error": "Managers only."}), 403
+        return redirect("/login")
+
+    if request.is_json:
+        raw_ids = (request.get_json(silent=True) or {}).get("flight_ids", [])
+    else:
+        raw_ids = request.form.getlist("flight_ids") + request.form.get("flight_ids_text", "").replace(",", " ").split()
+    try:
+        flight_ids = [int(flight_id) for flight_id in raw_ids]
+    except (TypeError, ValueError):
+        flight_ids = None
+    if not flight_ids:
+        result = {"cancelled_flights": [], "cancelled_orders": 0, "released_seats": 0,
+                  "errors": ["Please choose the flights to cancel."]}
+    else:
+        try:
+            result = cancel_flights(flight_ids)
+        except Exception as e:
+            logger.exception("Database Error: %s", e)
+            result = {"cancelled_flights": [], "cancelled_orders": 0, "released_seats": 0,
+                      "errors": ["Cancellation failed. Please try again."]}
+
+    if request.is_json:
+        return jsonify(result), 400 if result["errors"] and not result["cancelled_flights"] else 200
+    return _render_manage_flights(cancel_result=result)
+
+@app.route('/manage_flights/availability')
+def flight_availability_route():
+    """
+    Planes and crew free for a new flight, from the in-memory availability index.
+    Query: departure, arrival (YYYY-MM-DDTHH:MM), optional origin, destination,
+    pilots (default 2) and attendants (default 3) for the suggested crew.
+    """
+    if session.get("user_type") != "manager":
+        return jsonify({"error": "Managers only."}), 403
+
+    try:
+        departure = datetime.fromisoformat(request.args.get("departure", ""))
+        arrival = datetime.fromisoformat(request.args.get("arrival", ""))
+        pilots = int(request.args.get("pilots", "2"))
+        attendants = int(request.args.get("attendants", "3"))
+    except ValueError:
+        return jsonify({"error": "departure and arrival must be YYYY-MM-DDTHH:MM."}), 400
+    if arrival <= departure:
+        return jsonify({"error": "Arrival must be after departure."}), 400
+
+    try:
+        result = find_available_resources(departure, arrival, request.args.get("origin"),
+                                          request.args.get("destination"), pilots=pilots, attendants=attendants)
+    except Exception as e:
+        logger.exception("Database Error: %s", e)
+        return jsonify({"error": "Availability is unavailable right now."}), 500
+    return jsonify(result)
 
 @app.route('/view_reports')
 def view_reports():
-    return "Management Reports - Coming Soon"
+    """
+    Management reports, read from the precomputed summary tables.
+    Pending booking events are left to the report aggregator; the page says
+    how far behind the figures are.
+    """
+    if session.get("user_type") != "manager":
+        return redirect("/login")
+
+    pending_events, pending_since = 0, None
+    try:
+        pending_events, pending_since = get_report_backlog()
+    except Exception as e:
+        logger.exception("Database Error: %s", e)
+
+    page_rows = int(os.getenv("REPORTS_PAGE_ROWS", "50"))
+    reports = []
+    try:
+        for name, report in REPORTS.items():
+            reports.append({
+                "name": name,
+                "title": report["title"],
+                "columns": report["columns"],
+                "rows": get_report(name, limit=page_rows),
+            })
+    except Exception as e:
+        logger.exception("Database Error: %s", e)
+        flash("Could not load the reports. Please try again.")
+    return render_template("view_reports.html", reports=reports, page_rows=page_rows,
+                           pending_events=pending_events, pending_since=pending_since)
+
+
+@app.route('/view_reports/<report_name>.csv')
+def export_report_csv(report_name):
+    """
+    Stream a full report as CSV, one keyset-paged chunk at a time.
+    """
+    if session.get("user_type") != "manager":
+        return redirect("/login")
+    if report_name not in REPORTS:
+        return "Unknown report", 404
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(REPORTS[report_name]["columns"])
+        for rows in iter_report_chunks(report_name, chunk_size=int(os.getenv("REPORTS_CSV_CHUNK", "1000"))):
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={report_name}.csv"},
+    )
 
 if __name__ == "__main__":
+    # The debug reloader runs this file twice; only its serving child starts the jobs
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_jobs(app)
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,358 @@
+"""
+Request and database instrumentation, exposed in Prometheus text format on /metrics.
+
+- Per request: latency histogram by endpoint/method/status, and the number
+  and total time of the DB queries it ran.
+- Per DB helper: query latency histogram, labelled with the function that
+  issued the query (cursors from utils.get_db_connection / get_db_transaction
+  are wrapped in InstrumentedCursor).
+- Slow queries (>= SLOW_QUERY_MS) are logged to "flytau.slow_query" with
+  literals stripped from the SQL and the parameters left out.
+- Optional sampling profiler: a request carrying X-Profile: <PROFILE_TOKEN>
+  (or picked at PROFILE_SAMPLE_RATE) has its thread's stack sampled every few
+  milliseconds; the folded stacks (flamegraph.pl / speedscope format) are
+  written to PROFILE_DIR.
+"""
+import contextvars
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger("flytau.metrics")
+slow_query_logger = logging.getLogger("flytau.slow_query")
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_MS", "200")) / 1000
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram per label tuple, as Prometheus expects.
+    """
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [count per bucket..., +Inf count, sum]
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += value
+
+    def totals(self) -> Dict[Tuple, float]:
+        """
+        {labels: sum of observed values}.
+        """
+        with self._lock:
+            return {labels: values[-1] for labels, values in self._series.items()}
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            base = _format_labels(self.label_names, labels)
+            for bound, count in zip(self.buckets, values):
+                yield f'{self.name}_bucket{{{base}{"," if base else ""}le="{bound}"}} {count}'
+            yield f'{self.name}_bucket{{{base}{"," if base else ""}le="+Inf"}} {values[-2]}'
+            yield f"{self.name}_sum{{{base}}} {values[-1]}"
+            yield f"{self.name}_count{{{base}}} {values[-2]}"
+
+
+class CounterMetric:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] += amount
+
+    def values(self) -> Dict[Tuple, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f"{self.name}{{{_format_labels(self.label_names, labels)}}} {value}"
+
+
+class GaugeMetric:
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, labels: Tuple, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help_text}"
+        yield f"# TYPE {self.name} gauge"
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}{{{label_text}}} {value}" if label_text else f"{self.name} {value}"
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple) -> str:
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+REQUEST_LATENCY = Histogram("flytau_http_request_duration_seconds", "Request latency.",
+                            ("endpoint", "method", "status"), LATENCY_BUCKETS)
+REQUEST_QUERIES = Histogram("flytau_http_request_db_queries", "DB queries run per request.",
+                            ("endpoint",), QUERY_COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram("flytau_http_request_db_seconds", "Time spent in DB queries per request.",
+                            ("endpoint",), LATENCY_BUCKETS)
+QUERY_LATENCY = Histogram("flytau_db_query_duration_seconds", "DB query latency by issuing helper.",
+                          ("helper",), LATENCY_BUCKETS)
+SLOW_QUERIES = CounterMetric("flytau_db_slow_queries_total", "Queries slower than SLOW_QUERY_MS.", ("helper",))
+QUERY_ERRORS = CounterMetric("flytau_db_query_errors_total", "Queries that raised.", ("helper",))
+
+METRICS = [REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, QUERY_LATENCY, SLOW_QUERIES, QUERY_ERRORS]
+
+
+def register(metric):
+    """
+    Add a metric defined elsewhere (e.g. by a background job) to /metrics.
+    """
+    METRICS.append(metric)
+    return metric
+
+
+# -- per-request DB accounting ------------------------------------------------
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_current_request: contextvars.ContextVar = contextvars.ContextVar("flytau_request_stats", default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def redact_sql(sql: str) -> str:
+    """
+    The statement with whitespace collapsed and string/number literals replaced
+    by ?, so it is safe to log (parameters are never logged).
+    """
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def observe_query(helper: str, elapsed: float, sql, param_count: int, failed: bool = False) -> None:
+    QUERY_LATENCY.observe((helper,), elapsed)
+    if failed:
+        QUERY_ERRORS.inc((helper,))
+    stats = _current_request.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+    if elapsed >= SLOW_QUERY_SECONDS:
+        SLOW_QUERIES.inc((helper,))
+        if isinstance(sql, bytes):
+            sql = sql.decode("utf-8", "replace")
+        slow_query_logger.warning("Slow query (%.1f ms) in %s: %s [%d parameter(s) redacted]",
+                                  elapsed * 1000, helper, redact_sql(str(sql)), param_count)
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy timing execute/executemany. The label is the name of the
+    function that called execute, i.e. the utils helper that owns the query.
+    """
+
+    __slots__ = ("_cursor", "connection")
+
+    def __init__(self, cursor, connection=None):
+        self._cursor = cursor
+        # The cursor's connection, for queries.py's prepared statements
+        self.connection = connection
+
+    def execute(self, operation, params=None, **kwargs):
+        helper = sys._getframe(1).f_code.co_name
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = self._cursor.execute(operation, params, **kwargs)
+            failed = False
+            return result
+        finally:
+            observe_query(helper, time.perf_counter() - start, operation, len(params) if params else 0, failed)
+
+    def executemany(self, operation, seq_params):
+        helper = sys._getframe(1).f_code.co_name
+        seq_params = list(seq_params)
+        start = time.perf_counter()
+        failed = True
+        try:
+            result = self._cursor.executemany(operation, seq_params)
+            failed = False
+            return result
+        finally:
+            observe_query(helper, time.perf_counter() - start, operation,
+                          sum(len(params) for params in seq_params), failed)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+# -- sampling profiler -----------------------------------------------------------
+
+class StackSampler:
+    """
+    Samples one thread's Python stack every `interval` seconds from a helper
+    thread and counts the folded stacks ("outer;...;inner" -> samples).
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+def write_folded_stacks(stacks: Counter, directory: str, name: str) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}.folded")
+    with open(path, "w") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+# -- Flask wiring -------------------------------------------------------------------
+
+def render_metrics(pool_stats: Optional[Callable[[], Dict]] = None) -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    if pool_stats is not None:
+        try:
+            stats = pool_stats()
+        except Exception as e:
+            logger.warning("Could not read pool stats: %s", e)
+            stats = {}
+        for key, value in sorted(stats.items()):
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE flytau_db_pool_{key} gauge")
+                lines.append(f"flytau_db_pool_{key} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def init_metrics(app, pool_stats: Optional[Callable[[], Dict]] = None) -> None:
+    """
+    Time every request, count its queries and serve /metrics.
+    METRICS_TOKEN (if set) must be sent as "Authorization: Bearer <token>" to read /metrics.
+    """
+    from flask import Response, g, request
+
+    metrics_token = os.getenv("METRICS_TOKEN")
+    profile_token = os.getenv("PROFILE_TOKEN")
+    profile_rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    profile_dir = os.getenv("PROFILE_DIR", "profiles")
+
+    @app.before_request
+    def start_request_metrics():
+        g._metrics_start = time.perf_counter()
+        g._metrics_stats = RequestStats()
+        g._metrics_token = _current_request.set(g._metrics_stats)
+        g._profiler = None
+        if (profile_token and request.headers.get("X-Profile") == profile_token) or \
+                (profile_rate and random.random() < profile_rate):
+            g._profiler = StackSampler(threading.get_ident()).start()
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop("_metrics_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        stats = g.pop("_metrics_stats")
+        _current_request.reset(g.pop("_metrics_token"))
+        endpoint = request.endpoint or "unmatched"
+
+        REQUEST_LATENCY.observe((endpoint, request.method, str(response.status_code)), elapsed)
+        REQUEST_QUERIES.observe((endpoint,), stats.queries)
+        REQUEST_DB_TIME.observe((endpoint,), stats.db_seconds)
+        response.headers["Server-Timing"] = (f"app;dur={elapsed * 1000:.1f}, "
+                                             f"db;dur={stats.db_seconds * 1000:.1f};desc=\"{stats.queries} queries\"")
+
+        profiler = g.pop("_profiler", None)
+        if profiler is not None:
+            try:
+                path = write_folded_stacks(profiler.stop(), profile_dir, endpoint)
+                logger.info("Profiled %s %s (%.1f ms) -> %s", request.method, request.path, elapsed * 1000, path)
+            except OSError as e:
+                logger.warning("Could not write profile: %s", e)
+        return response
+
+    @app.route("/metrics")
+    def metrics():
+        if metrics_token and request.headers.get("Authorization") != f"Bearer {metrics_token}":
+            return Response("Forbidden\n", status=403, mimetype="text/plain")
+        return Response(render_metrics(pool_stats), mimetype="text/plain; version=0.0.4")
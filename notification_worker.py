@@ -0,0 +1,53 @@
+"""
+Send the queued booking / cancellation emails (see notifications.py).
+
+Run the worker next to the web app (it only needs the queue file and SMTP):
+    python notification_worker.py
+Send what is due and exit, e.g. from cron:
+    python notification_worker.py --once
+Local SMTP stand-in that writes every message to ./outbox (point SMTP_HOST /
+SMTP_PORT at it, the defaults already do):
+    python notification_worker.py --smtp-sink
+"""
+import argparse
+import logging
+import os
+
+from dotenv import load_dotenv
+
+from notifications import SMTPSink, queue_from_env, run_worker, sender_from_env
+
+
+def main():
+    load_dotenv()
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Send queued FLYTAU notifications.")
+    parser.add_argument("--once", action="store_true", help="Send everything that is due, then exit.")
+    parser.add_argument("--batch-size", type=int, default=int(os.getenv("NOTIFY_BATCH_SIZE", "50")),
+                        help="Messages per SMTP connection.")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Seconds between queue polls when idle.")
+    parser.add_argument("--smtp-sink", action="store_true", help="Run the local SMTP stand-in instead.")
+    parser.add_argument("--outbox", default="outbox", help="Where the SMTP stand-in stores messages.")
+    parser.add_argument("--purge-sent-days", type=float, default=7.0,
+                        help="Delete sent jobs older than this many days on start.")
+    args = parser.parse_args()
+
+    if args.smtp_sink:
+        port = int(os.getenv("SMTP_PORT", "1025"))
+        with SMTPSink(os.getenv("SMTP_HOST", "localhost"), port, args.outbox) as server:
+            print(f"SMTP stand-in listening on port {port}, writing to {args.outbox}/")
+            server.serve_forever()
+        return
+
+    queue = queue_from_env()
+    purged = queue.purge_sent(args.purge_sent_days * 24 * 3600)
+    if purged:
+        print(f"Purged {purged} sent notification(s).")
+    sent = run_worker(queue, sender_from_env(), batch_size=args.batch_size,
+                      poll_interval=args.poll_interval, once=args.once)
+    print(f"Sent {sent} notification(s). Queue: {queue.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+import json
+import logging
+import os
+import smtplib
+import socketserver
+import sqlite3
+import threading
+import time
+from email.message import EmailMessage
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("flytau.notifications")
+
+# kind -> (subject, body); formatted with the job's payload
+TEMPLATES = {
+    "booking_confirmation": (
+        "Your FLYTAU booking #{order_id}",
+        "Thank you for flying with FLYTAU.\n\n"
+        "Booking code: {order_id}\n"
+        "Flight: {origin} -> {destination}, departing {departure}\n"
+        "Seats: {seats}\n"
+        "Total paid: ${total_price:.2f}\n\n"
+        "Use your booking code and this email address to view or cancel the booking.\n",
+    ),
+    "cancellation_receipt": (
+        "Your FLYTAU booking #{order_id} was cancelled",
+        "Your booking #{order_id} ({origin} -> {destination}, departing {departure}) was cancelled.\n"
+        "A cancellation fee of ${fee:.2f} was charged.\n",
+    ),
+    "flight_cancelled": (
+        "Your FLYTAU flight {origin} -> {destination} was cancelled",
+        "We are sorry: the flight of your booking #{order_id} ({origin} -> {destination}, departing {departure}) "
+        "was cancelled by FLYTAU.\nYou will receive a full refund.\n",
+    ),
+}
+
+
+def render_message(kind: str, payload: Dict) -> Tuple[str, str]:
+    subject, body = TEMPLATES[kind]
+    return subject.format(**payload), body.format(**payload)
+
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    recipient: str
+    payload: Dict
+    attempts: int
+
+
+class NotificationQueue:
+    """
+    Persistent outgoing-notification queue in a local SQLite file, shared by
+    the web processes (which only enqueue) and the worker (notification_worker.py).
+
+    A job is claimed with a lease: if the worker dies mid-batch its jobs become
+    due again once the lease runs out. Failed sends are retried with
+    exponential backoff (retry_seconds * 2**attempts, at most an hour) until
+    max_attempts, then kept as 'failed' for inspection.
+    """
+
+    def __init__(self, path: str, max_attempts: int = 5, retry_seconds: float = 30.0, lease_seconds: float = 300.0):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.lease_seconds = lease_seconds
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    # WAL: enqueues from the web workers do not wait for the sending worker
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.execute(
+                        """
+                        CREATE TABLE IF NOT EXISTS notification_job (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            kind TEXT NOT NULL,
+                            recipient TEXT NOT NULL,
+                            payload TEXT NOT NULL,
+                            status TEXT NOT NULL DEFAULT 'pending',
+                            attempts INTEGER NOT NULL DEFAULT 0,
+                            next_attempt REAL NOT NULL,
+                            last_error TEXT,
+                            created_at REAL NOT NULL
+                        )
+                        """
+                    )
+                    conn.execute(
+                        "CREATE INDEX IF NOT EXISTS idx_notification_job_due ON notification_job (status, next_attempt)"
+                    )
+                    self._initialized = True
+        return conn
+
+    def enqueue(self, kind: str, recipient: str, payload: Dict) -> int:
+        return self.enqueue_many([(kind, recipient, payload)])
+
+    def enqueue_many(self, messages: Iterable[Tuple[str, str, Dict]]) -> int:
+        """
+        Queue (kind, recipient, payload) messages in one transaction; returns how many.
+        """
+        now = time.time()
+        rows = [(kind, recipient, json.dumps(payload, default=str), now, now)
+                for kind, recipient, payload in messages if recipient]
+        if not rows:
+            return 0
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT INTO notification_job (kind, recipient, payload, next_attempt, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+        finally:
+            conn.close()
+        return len(rows)
+
+    def claim(self, batch_size: int) -> List[Job]:
+        """
+        Due jobs (pending, or sending with an expired lease), leased to the caller.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                rows = conn.execute(
+                    """
+                    SELECT id, kind, recipient, payload, attempts FROM notification_job
+                    WHERE status IN ('pending', 'sending') AND next_attempt <= ?
+                    ORDER BY next_attempt, id
+                    LIMIT ?
+                    """,
+                    (now, batch_size),
+                ).fetchall()
+                conn.executemany(
+                    "UPDATE notification_job SET status = 'sending', next_attempt = ? WHERE id = ?",
+                    [(now + self.lease_seconds, row[0]) for row in rows],
+                )
+        finally:
+            conn.close()
+        return [Job(row[0], row[1], row[2], json.loads(row[3]), row[4]) for row in rows]
+
+    def mark_sent(self, job_ids: Iterable[int]) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("UPDATE notification_job SET status = 'sent', last_error = NULL WHERE id = ?",
+                                 [(job_id,) for job_id in job_ids])
+        finally:
+            conn.close()
+
+    def mark_failed(self, failures: Iterable[Tuple[Job, str]]) -> None:
+        now = time.time()
+        updates = []
+        for job, error in failures:
+            attempts = job.attempts + 1
+            status = "failed" if attempts >= self.max_attempts else "pending"
+            delay = min(self.retry_seconds * 2 ** job.attempts, 3600)
+            updates.append((status, attempts, now + delay, error[:500], job.id))
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "UPDATE notification_job SET status = ?, attempts = ?, next_attempt = ?, last_error = ? "
+                    "WHERE id = ?",
+                    updates,
+                )
+        finally:
+            conn.close()
+
+    def purge_sent(self, older_than_seconds: float = 7 * 24 * 3600) -> int:
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute("DELETE FROM notification_job WHERE status = 'sent' AND created_at < ?",
+                                      (time.time() - older_than_seconds,))
+                return cursor.rowcount
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM notification_job GROUP BY status").fetchall())
+        finally:
+            conn.close()
+
+
+class SMTPSender:
+    """
+    Sends a batch of messages over one SMTP connection.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 1025, sender: str = "FLYTAU <no-reply@flytau.local>",
+                 username: Optional[str] = None, password: Optional[str] = None, starttls: bool = False,
+                 timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def build(self, job: Job) -> EmailMessage:
+        subject, body = render_message(job.kind, job.payload)
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = job.recipient
+        message["Subject"] = subject
+        message.set_content(body)
+        return message
+
+    def send_batch(self, jobs: List[Job]) -> Dict[int, Optional[str]]:
+        """
+        {job_id: None if sent, else the error}. A connection failure fails the whole batch.
+        """
+        results: Dict[int, Optional[str]] = {}
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+                if self.starttls:
+                    smtp.starttls()
+                if self.username:
+                    smtp.login(self.username, self.password or "")
+                for job in jobs:
+                    try:
+                        smtp.send_message(self.build(job))
+                        results[job.id] = None
+                    except (smtplib.SMTPException, KeyError, ValueError) as e:
+                        results[job.id] = f"{type(e).__name__}: {e}"
+        except (OSError, smtplib.SMTPException) as e:
+            for job in jobs:
+                results.setdefault(job.id, f"{type(e).__name__}: {e}")
+        return results
+
+
+def run_worker(queue: NotificationQueue, sender: SMTPSender, batch_size: int = 50, poll_interval: float = 2.0,
+               stop: Optional[threading.Event] = None, once: bool = False) -> int:
+    """
+    Claim due jobs in batches and send them until `stop` is set (or the queue
+    is drained, with `once`). Returns the number of messages sent.
+    """
+    stop = stop or threading.Event()
+    sent_total = 0
+    while not stop.is_set():
+        jobs = queue.claim(batch_size)
+        if not jobs:
+            if once:
+                break
+            stop.wait(poll_interval)
+            continue
+
+        results = sender.send_batch(jobs)
+        sent = [job.id for job in jobs if results.get(job.id) is None]
+        failed = [(job, results[job.id]) for job in jobs if results.get(job.id) is not None]
+        if sent:
+            queue.mark_sent(sent)
+        if failed:
+            queue.mark_failed(failed)
+            logger.warning("%d of %d notification(s) failed, first error: %s", len(failed), len(jobs), failed[0][1])
+        sent_total += len(sent)
+    return sent_total
+
+
+def queue_from_env() -> NotificationQueue:
+    return NotificationQueue(
+        os.getenv("NOTIFY_QUEUE_PATH", "notifications.sqlite3"),
+        max_attempts=int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5")),
+        retry_seconds=float(os.getenv("NOTIFY_RETRY_SECONDS", "30")),
+    )
+
+
+def sender_from_env() -> SMTPSender:
+    return SMTPSender(
+        host=os.getenv("SMTP_HOST", "localhost"),
+        port=int(os.getenv("SMTP_PORT", "1025")),
+        sender=os.getenv("NOTIFY_FROM", "FLYTAU <no-reply@flytau.local>"),
+        username=os.getenv("SMTP_USER"),
+        password=os.getenv("SMTP_PASSWORD"),
+        starttls=os.getenv("SMTP_STARTTLS", "0") == "1",
+    )
+
+
+# -- local SMTP stand-in ----------------------------------------------------------
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough SMTP to accept mail from smtplib; each message is written to
+    the server's outbox directory as an .eml file.
+    """
+
+    def reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+    def handle(self):
+        self.reply("220 flytau-smtp-sink ready")
+        sender, recipients = None, []
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            command = raw.decode("utf-8", "replace").strip()
+            verb = command[:4].upper()
+            if verb == "EHLO":
+                self.reply("250-flytau-smtp-sink")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 flytau-smtp-sink")
+            elif verb == "MAIL":
+                sender, recipients = command[10:].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                recipients.append(command[8:].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                while True:
+                    line = self.rfile.readline()
+                    if not line or line in (b".\r\n", b".\n"):
+                        break
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                self.server.store(sender, recipients, b"".join(lines))
+                self.reply("250 OK: queued")
+            elif verb in ("RSET", "NOOP"):
+                sender, recipients = (None, []) if verb == "RSET" else (sender, recipients)
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    Local SMTP server for development and tests: accepts every message and
+    stores it in `outbox` instead of delivering it.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "localhost", port: int = 1025, outbox: str = "outbox"):
+        super().__init__((host, port), _SinkHandler)
+        self.outbox = outbox
+        self.count = 0
+        self._lock = threading.Lock()
+        os.makedirs(outbox, exist_ok=True)
+
+    def store(self, sender: str, recipients: List[str], data: bytes) -> None:
+        with self._lock:
+            self.count += 1
+            path = os.path.join(self.outbox, f"{time.strftime('%Y%m%d-%H%M%S')}-{self.count:06d}.eml")
+        with open(path, "wb") as f:
+            f.write(data)
+        logger.info("Stored message from %s to %s in %s", sender, ", ".join(recipients), path)
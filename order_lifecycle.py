@@ -0,0 +1,26 @@
+"""
+Run the order lifecycle pass the app runs every ORDER_LIFECYCLE_SECONDS:
+mark the active orders of departed flights 'completed' and system-cancel the
+active orders left on cancelled flights.
+
+From cron when the in-app scheduler is disabled, or once after applying
+sql/migrations/006_order_lifecycle.sql to work through the backlog:
+    python order_lifecycle.py
+"""
+import argparse
+
+from utils import cancel_orders_of_cancelled_flights, complete_departed_orders, ORDER_LIFECYCLE_BATCH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Complete orders of departed flights, cancel orders of cancelled ones.")
+    parser.add_argument("--batch-size", type=int, default=ORDER_LIFECYCLE_BATCH, help="Flights per transaction.")
+    args = parser.parse_args()
+
+    completed = complete_departed_orders(flight_batch=args.batch_size)
+    cancelled = cancel_orders_of_cancelled_flights(flight_batch=args.batch_size)
+    print(f"Completed {completed} order(s), cancelled {cancelled} order(s) of cancelled flights.")
+
+
+if __name__ == "__main__":
+    main()
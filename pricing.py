@@ -0,0 +1,138 @@
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+
+from cache import TTLCache
+
+
+class PricingError(Exception):
+    """
+    Raised when seats cannot be priced (unknown flight, seat not on its plane)
+    or a signed quote is invalid, expired or does not match the booking.
+    """
+
+
+def parse_seat_ids(values: Iterable) -> List[int]:
+    """
+    Seat IDs from a form, as ints in the given order.
+    Raises PricingError for a non-numeric or repeated seat.
+    """
+    seat_ids = []
+    for value in values:
+        try:
+            seat_id = int(value)
+        except (TypeError, ValueError):
+            raise PricingError(f"Invalid seat '{value}'.")
+        if seat_id in seat_ids:
+            raise PricingError(f"Seat {seat_id} was selected more than once.")
+        seat_ids.append(seat_id)
+    return seat_ids
+
+
+class PricingCache:
+    """
+    Prices seat selections in memory.
+
+    Seat classes per plane never change, so each plane's layout is loaded once
+    and kept. Flight rows (plane and fares) are kept for `flight_ttl` seconds,
+    so a quote costs no query while the flight is cached.
+
+    Loaders are passed in so this module never touches the database:
+        load_plane_seats(plane_id) -> [(seat_id, class_type, row_num, letter, location), ...]
+        load_flight(flight_id) -> {"flight_id", "plane_id", "business_price", "economy_price", ...} or None
+    """
+
+    def __init__(self, load_plane_seats: Callable, load_flight: Callable, max_flights: int = 4096,
+                 flight_ttl: float = 60.0):
+        self._load_plane_seats = load_plane_seats
+        self._load_flight = load_flight
+        self._flights = TTLCache(max_size=max_flights, ttl=flight_ttl)
+        self._layouts: Dict[int, Dict[int, Tuple[str, int, str, str]]] = {}
+        self._lock = threading.Lock()
+
+    def get_flight(self, flight_id: int) -> Optional[Dict]:
+        flight = self._flights.get(flight_id)
+        if flight is None:
+            flight = self._load_flight(flight_id)
+            if flight is not None:
+                self._flights.set(flight_id, flight)
+        return flight
+
+    def _layout(self, plane_id: int) -> Dict[int, Tuple[str, int, str, str]]:
+        layout = self._layouts.get(plane_id)
+        if layout is None:
+            layout = {seat_id: (class_type, row_num, letter, location)
+                      for seat_id, class_type, row_num, letter, location in self._load_plane_seats(plane_id)}
+            with self._lock:
+                self._layouts[plane_id] = layout
+        return layout
+
+    def invalidate_flight(self, flight_id: int) -> None:
+        self._flights.invalidate(flight_id)
+
+    def quote(self, flight_id: int, seat_ids: Iterable[int]) -> Tuple[List[Dict], float]:
+        """
+        (seat lines, total) for the seats on this flight, in seat order.
+        Raises PricingError for an unknown flight, an invalid or repeated seat,
+        or a seat not on its plane.
+        """
+        seat_ids = parse_seat_ids(seat_ids)
+        flight = self.get_flight(flight_id)
+        if flight is None:
+            raise PricingError(f"Flight #{flight_id} does not exist.")
+        layout = self._layout(flight["plane_id"])
+        fares = {"business": float(flight["business_price"]), "economy": float(flight["economy_price"])}
+
+        lines = []
+        total_cents = 0
+        for seat_id in sorted(seat_ids):
+            seat = layout.get(seat_id)
+            if seat is None:
+                raise PricingError(f"Seat {seat_id} is not on flight #{flight_id}.")
+            class_type, row_num, letter, location = seat
+            price = fares["business" if class_type.lower() == "business" else "economy"]
+            # Sum in cents so the signed total matches what the customer was shown
+            total_cents += round(price * 100)
+            lines.append({"id": seat_id, "type": class_type, "row": row_num, "letter": letter,
+                          "location": location, "price": price})
+        return lines, total_cents / 100
+
+    def stats(self) -> Dict:
+        with self._lock:
+            planes = len(self._layouts)
+        return {"planes": planes, "flights": self._flights.stats()}
+
+
+class QuoteSigner:
+    """
+    Signs a priced seat selection so /finalize_booking can trust the total
+    without pricing it again: the payload is the flight, the seats and the
+    total in cents, signed with the app secret and valid for `max_age` seconds.
+    """
+
+    def __init__(self, secret_key: str, max_age: int = 900):
+        self._serializer = URLSafeTimedSerializer(secret_key, salt="flytau-price-quote")
+        self.max_age = max_age
+
+    def sign(self, flight_id: int, seat_ids: Iterable[int], total: float) -> str:
+        return self._serializer.dumps({
+            "f": int(flight_id),
+            "s": sorted(int(seat_id) for seat_id in seat_ids),
+            "t": round(total * 100),
+        })
+
+    def verify(self, token: str, flight_id: int, seat_ids: Iterable[int]) -> float:
+        """
+        The quoted total, if `token` is a valid, unexpired quote for exactly
+        these seats on this flight. Raises PricingError otherwise.
+        """
+        try:
+            quote = self._serializer.loads(token or "", max_age=self.max_age)
+        except SignatureExpired:
+            raise PricingError("Your price quote has expired.")
+        except BadSignature:
+            raise PricingError("Invalid price quote.")
+        if quote.get("f") != int(flight_id) or quote.get("s") != sorted(parse_seat_ids(seat_ids)):
+            raise PricingError("The price quote does not match the selected seats.")
+        return quote["t"] / 100
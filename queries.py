@@ -0,0 +1,192 @@
+import logging
+import os
+import string
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from metrics import CounterMetric, Histogram, LATENCY_BUCKETS, observe_query, register
+
+logger = logging.getLogger("flytau.queries")
+
+# IN-lists are padded up to one of these sizes, so a statement has a handful
+# of variants instead of one per list length
+IN_LIST_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+USE_PREPARED = os.getenv("DB_PREPARED_STATEMENTS", "1") == "1"
+MAX_PREPARED_PER_CONNECTION = int(os.getenv("DB_PREPARED_PER_CONNECTION", "64"))
+
+STATEMENT_EXECUTIONS = register(CounterMetric(
+    "flytau_db_statement_executions_total", "Executions per registered statement.", ("statement",)))
+STATEMENT_PREPARES = register(CounterMetric(
+    "flytau_db_statement_prepares_total", "Server-side prepares per registered statement (cache misses).",
+    ("statement",)))
+STATEMENT_LATENCY = register(Histogram(
+    "flytau_db_statement_duration_seconds", "Execution time per registered statement.", ("statement",),
+    LATENCY_BUCKETS))
+
+
+class Statement:
+    """
+    A named SQL statement in the registry.
+
+    `sql` uses %s parameters; an IN-list is a named field, e.g.
+    "WHERE ID IN ({ids})", and its values are passed as one list/tuple in the
+    parameter sequence (lists fill the fields in order of appearance).
+    """
+
+    __slots__ = ("name", "sql", "in_lists", "_variants")
+
+    def __init__(self, name: str, sql: str):
+        self.name = name
+        self.sql = sql
+        self.in_lists = tuple(field for _, field, _, _ in string.Formatter().parse(sql) if field)
+        self._variants: Dict[Tuple[int, ...], str] = {}
+
+    def bind(self, params: Sequence) -> Tuple[str, str, Tuple]:
+        """
+        (variant key, SQL text, flat parameters) for these parameters, with
+        each IN-list padded to its bucket by repeating its last value.
+        """
+        if not self.in_lists:
+            return self.name, self.sql, tuple(params)
+
+        sizes = []
+        flat = []
+        for value in params:
+            if isinstance(value, (list, tuple)):
+                if not value:
+                    raise ValueError(f"Empty IN-list for statement '{self.name}'.")
+                size = next((bucket for bucket in IN_LIST_BUCKETS if bucket >= len(value)), len(value))
+                sizes.append(size)
+                flat.extend(value)
+                flat.extend([value[-1]] * (size - len(value)))
+            else:
+                flat.append(value)
+        if len(sizes) != len(self.in_lists):
+            raise ValueError(f"Statement '{self.name}' expects {len(self.in_lists)} IN-list(s), got {len(sizes)}.")
+
+        sizes = tuple(sizes)
+        sql = self._variants.get(sizes)
+        if sql is None:
+            sql = self._variants[sizes] = self.sql.format(
+                **{field: ",".join(["%s"] * size) for field, size in zip(self.in_lists, sizes)})
+        return f"{self.name}[{'x'.join(map(str, sizes))}]", sql, tuple(flat)
+
+
+_registry: Dict[str, Statement] = {}
+
+
+def statement(name: str, sql: str) -> Statement:
+    """
+    Register a statement under a unique name and return it.
+    """
+    if name in _registry:
+        raise ValueError(f"Statement '{name}' is already registered.")
+    stmt = _registry[name] = Statement(name, sql)
+    return stmt
+
+
+def registered() -> List[Statement]:
+    return list(_registry.values())
+
+
+# Prepared cursors per pooled connection: {connection: OrderedDict(variant key -> cursor)}.
+# Weak keys, so a closed/recycled connection drops its cursors with it.
+_prepared: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+
+def _prepared_cursor(connection, key: str, name: str):
+    """
+    The connection's prepared cursor for a statement variant, created (and
+    the least recently used one closed) on a miss. A connection is only used
+    by one thread at a time, so only the map itself needs the lock.
+    """
+    with _prepared_lock:
+        cursors = _prepared.get(connection)
+        if cursors is None:
+            cursors = _prepared[connection] = OrderedDict()
+    cursor = cursors.get(key)
+    if cursor is not None:
+        cursors.move_to_end(key)
+        return cursor
+
+    cursor = connection.cursor(prepared=True)
+    cursors[key] = cursor
+    if len(cursors) > MAX_PREPARED_PER_CONNECTION:
+        _, evicted = cursors.popitem(last=False)
+        try:
+            evicted.close()
+        except Exception as e:
+            logger.warning("Could not close prepared statement: %s", e)
+    STATEMENT_PREPARES.inc((name,))
+    return cursor
+
+
+def _run(cursor, stmt: Statement, params: Sequence, helper: str):
+    """
+    Execute `stmt` for a utils helper. `cursor` is the InstrumentedCursor the
+    helper got from get_db_connection / get_db_read_connection /
+    get_db_transaction; the statement runs on a prepared cursor of the same
+    connection (so inside the same transaction), or as plain text on the
+    helper's cursor when prepared statements are off or the connection is unknown.
+    Returns the cursor that ran it.
+    """
+    key, sql, flat = stmt.bind(params)
+    connection = getattr(cursor, "connection", None)
+    prepared = USE_PREPARED and connection is not None
+    target = _prepared_cursor(connection, key, stmt.name) if prepared else getattr(cursor, "_cursor", cursor)
+
+    start = time.perf_counter()
+    failed = True
+    try:
+        target.execute(sql, flat)
+        failed = False
+    except Exception:
+        if prepared:
+            # Drop the prepared cursor; the next call prepares again
+            _prepared.get(connection, {}).pop(key, None)
+            target.close()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        STATEMENT_EXECUTIONS.inc((stmt.name,))
+        STATEMENT_LATENCY.observe((stmt.name,), elapsed)
+        observe_query(helper, elapsed, sql, len(flat), failed)
+    return target
+
+
+def fetchall(cursor, stmt: Statement, params: Sequence = ()) -> List[Tuple]:
+    return _run(cursor, stmt, params, sys._getframe(1).f_code.co_name).fetchall()
+
+
+def fetchone(cursor, stmt: Statement, params: Sequence = ()) -> Optional[Tuple]:
+    """
+    The first row, or None. The rest are read too, so the prepared cursor
+    is clean for its next execution; use it for single-row lookups.
+    """
+    rows = _run(cursor, stmt, params, sys._getframe(1).f_code.co_name).fetchall()
+    return rows[0] if rows else None
+
+
+def execute(cursor, stmt: Statement, params: Sequence = ()):
+    """
+    Run a statement without a result set; returns the cursor that ran it
+    (for rowcount / lastrowid).
+    """
+    return _run(cursor, stmt, params, sys._getframe(1).f_code.co_name)
+
+
+def stats() -> Dict[str, Dict]:
+    """
+    {statement: {"executions", "prepares", "seconds"}} since start, e.g. for benchmarks.
+    """
+    executions = {labels[0]: value for labels, value in STATEMENT_EXECUTIONS.values().items()}
+    prepares = {labels[0]: value for labels, value in STATEMENT_PREPARES.values().items()}
+    seconds = {labels[0]: total for labels, total in STATEMENT_LATENCY.totals().items()}
+    return {name: {"executions": executions.get(name, 0), "prepares": prepares.get(name, 0),
+                   "seconds": seconds.get(name, 0.0)} for name in sorted(_registry)}
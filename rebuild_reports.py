@@ -0,0 +1,32 @@
+"""
+Maintain the precomputed management report tables.
+
+Full rebuild from the booking tables (offline / quiet period), e.g. after
+manual data fixes or when the summaries have drifted:
+    python rebuild_reports.py
+Only fold pending booking events into the summaries (what the app does every
+REPORTS_REFRESH_SECONDS), e.g. from cron when the in-app aggregator is disabled:
+    python rebuild_reports.py --apply-events
+"""
+import argparse
+
+from utils import apply_report_events, rebuild_reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or update the management report summary tables.")
+    parser.add_argument("--apply-events", action="store_true", help="Only apply pending order events.")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Events per transaction.")
+    args = parser.parse_args()
+
+    if args.apply_events:
+        applied = apply_report_events(batch_size=args.batch_size)
+        print(f"Applied {applied} report event(s).")
+        return
+
+    rebuild_reports()
+    print("Rebuilt report summary tables.")
+
+
+if __name__ == "__main__":
+    main()
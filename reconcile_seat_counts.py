@@ -0,0 +1,24 @@
+"""
+Rebuild the Flight_Seat_Counts table from Assigned/Order.
+
+Run it after manual data fixes or on a schedule to correct counter drift:
+    python reconcile_seat_counts.py                # every flight
+    python reconcile_seat_counts.py --flight-id 7  # one flight
+"""
+import argparse
+
+from utils import reconcile_seat_counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild per-flight booked-seat counters.")
+    parser.add_argument("--flight-id", type=int, default=None, help="Only rebuild this flight.")
+    parser.add_argument("--batch-size", type=int, default=500, help="Flights per transaction.")
+    args = parser.parse_args()
+
+    processed = reconcile_seat_counts(flight_id=args.flight_id, batch_size=args.batch_size)
+    print(f"Rebuilt seat counters for {processed} flight(s).")
+
+
+if __name__ == "__main__":
+    main()
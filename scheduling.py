@@ -0,0 +1,443 @@
+import csv
+import io
+import logging
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger("flytau.scheduling")
+
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+class IntervalIndex:
+    """
+    Busy intervals per resource (plane, pilot, attendant), each list sorted by
+    start. Intervals of one resource never overlap (that is what it validates),
+    so an overlap check is one bisect plus a look at the neighbours.
+    """
+
+    def __init__(self):
+        self._intervals: Dict[int, List[Tuple[datetime, datetime, int]]] = defaultdict(list)
+
+    def add(self, resource_id: int, start: datetime, end: datetime, flight_id: int) -> None:
+        insort(self._intervals[resource_id], (start, end, flight_id))
+
+    def remove(self, resource_id: int, start: datetime, end: datetime, flight_id: int) -> None:
+        intervals = self._intervals.get(resource_id, [])
+        idx = bisect_left(intervals, (start, end, flight_id))
+        if idx < len(intervals) and intervals[idx] == (start, end, flight_id):
+            del intervals[idx]
+
+    def conflict(self, resource_id: int, start: datetime, end: datetime) -> Optional[int]:
+        """
+        Flight ID of an interval overlapping [start, end), or None.
+        """
+        intervals = self._intervals.get(resource_id)
+        if not intervals:
+            return None
+        idx = bisect_left(intervals, (start,))
+        # The previous interval may still be running at `start`; the next one may begin before `end`
+        if idx > 0 and intervals[idx - 1][1] > start:
+            return intervals[idx - 1][2]
+        if idx < len(intervals) and intervals[idx][0] < end:
+            return intervals[idx][2]
+        return None
+
+    def is_free(self, resource_id: int, start: datetime, end: datetime) -> bool:
+        return self.conflict(resource_id, start, end) is None
+
+    def neighbours(self, resource_id: int, start: datetime) -> Tuple[Optional[Tuple], Optional[Tuple]]:
+        """
+        The intervals just before and at/after `start` (either may be None),
+        from one bisect, for callers that check overlap and position together.
+        """
+        intervals = self._intervals.get(resource_id)
+        if not intervals:
+            return None, None
+        idx = bisect_left(intervals, (start,))
+        return (intervals[idx - 1] if idx > 0 else None,
+                intervals[idx] if idx < len(intervals) else None)
+
+    def busy(self, resource_id: int) -> List[Tuple[datetime, datetime, int]]:
+        return list(self._intervals.get(resource_id, []))
+
+
+class FlightPlan:
+    """
+    One flight to be scheduled: route, times, plane, crew and prices.
+    `line` is the CSV line or recurrence date it came from, for error messages.
+    """
+
+    __slots__ = ("origin", "destination", "departure", "arrival", "plane_id", "pilot_ids", "attendant_ids",
+                 "business_price", "economy_price", "line")
+
+    def __init__(self, origin: str, destination: str, departure: datetime, arrival: datetime, plane_id: int,
+                 pilot_ids: Iterable[int], attendant_ids: Iterable[int], business_price, economy_price, line: str = ""):
+        self.origin = origin.strip().upper()
+        self.destination = destination.strip().upper()
+        self.departure = departure
+        self.arrival = arrival
+        self.plane_id = int(plane_id)
+        self.pilot_ids = sorted({int(p) for p in pilot_ids})
+        self.attendant_ids = sorted({int(a) for a in attendant_ids})
+        self.business_price = float(business_price)
+        self.economy_price = float(economy_price)
+        self.line = line
+
+    @property
+    def duration_minutes(self) -> int:
+        return int((self.arrival - self.departure).total_seconds() // 60)
+
+    def to_dict(self) -> Dict:
+        return {
+            "origin_airport": self.origin,
+            "destination_airport": self.destination,
+            "departure_datetime": self.departure.strftime("%Y-%m-%d %H:%M:%S"),
+            "arrival_datetime": self.arrival.strftime("%Y-%m-%d %H:%M:%S"),
+            "plane_id": self.plane_id,
+            "pilot_ids": self.pilot_ids,
+            "attendant_ids": self.attendant_ids,
+            "business_seat_price": self.business_price,
+            "economy_seat_price": self.economy_price,
+        }
+
+
+def _id_list(value) -> List[int]:
+    """
+    Crew IDs from a list or a "1;2;3" / "1,2,3" / "1 2 3" string.
+    """
+    if isinstance(value, (list, tuple)):
+        return [int(v) for v in value]
+    return [int(v) for v in str(value or "").replace(";", " ").replace(",", " ").split()]
+
+
+def expand_recurrence(spec: Dict) -> List[FlightPlan]:
+    """
+    Flights for a weekly pattern:
+        {"origin": "TLV", "destination": "LHR", "weekdays": ["mon", "thu"],
+         "departure_time": "08:30", "duration_minutes": 320,
+         "start_date": "2026-11-01", "end_date": "2027-03-31",
+         "plane_id": 3, "pilot_ids": [1, 2], "attendant_ids": [5, 6, 7],
+         "business_price": 1800, "economy_price": 450}
+    Raises ValueError on a malformed spec.
+    """
+    weekdays = {WEEKDAYS.index(str(day).strip().lower()[:3]) for day in spec["weekdays"]}
+    if not weekdays:
+        raise ValueError("Choose at least one weekday.")
+    day = datetime.strptime(spec["start_date"], "%Y-%m-%d")
+    last_day = datetime.strptime(spec["end_date"], "%Y-%m-%d")
+    if last_day < day:
+        raise ValueError("The end date is before the start date.")
+    hour, minute = (int(part) for part in spec["departure_time"].split(":"))
+    duration = timedelta(minutes=int(spec["duration_minutes"]))
+    if duration <= timedelta(0):
+        raise ValueError("The flight duration must be positive.")
+
+    plans = []
+    while day <= last_day:
+        if day.weekday() in weekdays:
+            departure = day.replace(hour=hour, minute=minute)
+            plans.append(FlightPlan(
+                spec["origin"], spec["destination"], departure, departure + duration, spec["plane_id"],
+                _id_list(spec.get("pilot_ids")), _id_list(spec.get("attendant_ids")),
+                spec["business_price"], spec["economy_price"], line=day.strftime("%Y-%m-%d"),
+            ))
+        day += timedelta(days=1)
+    return plans
+
+
+CSV_COLUMNS = ["origin", "destination", "departure", "arrival", "plane_id", "pilot_ids", "attendant_ids",
+               "business_price", "economy_price"]
+
+
+def parse_schedule_csv(text: str) -> Tuple[List[FlightPlan], List[str]]:
+    """
+    Flights from a CSV with a header row of CSV_COLUMNS (departure/arrival as
+    "YYYY-MM-DD HH:MM", crew IDs separated by ";").
+    Returns (plans, errors); a malformed line is reported, not raised.
+    """
+    reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))  # Excel adds a BOM
+    missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        return [], [f"Missing CSV column(s): {', '.join(missing)}"]
+
+    plans, errors = [], []
+    for line_no, row in enumerate(reader, start=2):
+        if any(row.get(column) in (None, "") for column in CSV_COLUMNS):
+            errors.append(f"line {line_no}: every column needs a value")
+            continue
+        try:
+            plans.append(FlightPlan(
+                row["origin"], row["destination"],
+                datetime.strptime(row["departure"].strip(), "%Y-%m-%d %H:%M"),
+                datetime.strptime(row["arrival"].strip(), "%Y-%m-%d %H:%M"),
+                row["plane_id"], _id_list(row["pilot_ids"]), _id_list(row["attendant_ids"]),
+                row["business_price"], row["economy_price"], line=f"line {line_no}",
+            ))
+        except (TypeError, ValueError) as e:
+            errors.append(f"line {line_no}: {e}")
+    return plans, errors
+
+
+class ResourceSchedule:
+    """
+    Busy intervals of planes, pilots and attendants.
+
+    A plane interval is padded by `turnaround` after arrival (ground time
+    before its next departure); crew intervals by `crew_rest`.
+    """
+
+    def __init__(self, turnaround: timedelta = timedelta(minutes=60), crew_rest: timedelta = timedelta(hours=10)):
+        self.turnaround = turnaround
+        self.crew_rest = crew_rest
+        self.planes = IntervalIndex()
+        self.pilots = IntervalIndex()
+        self.attendants = IntervalIndex()
+
+    def add_flight(self, flight_id: int, departure: datetime, arrival: datetime, plane_id: Optional[int],
+                   pilot_ids: Iterable[int] = (), attendant_ids: Iterable[int] = ()) -> None:
+        if plane_id is not None:
+            self.planes.add(plane_id, departure, arrival + self.turnaround, flight_id)
+        for pilot_id in pilot_ids:
+            self.pilots.add(pilot_id, departure, arrival + self.crew_rest, flight_id)
+        for attendant_id in attendant_ids:
+            self.attendants.add(attendant_id, departure, arrival + self.crew_rest, flight_id)
+
+    def remove_flight(self, flight_id: int, departure: datetime, arrival: datetime, plane_id: Optional[int],
+                      pilot_ids: Iterable[int] = (), attendant_ids: Iterable[int] = ()) -> None:
+        if plane_id is not None:
+            self.planes.remove(plane_id, departure, arrival + self.turnaround, flight_id)
+        for pilot_id in pilot_ids:
+            self.pilots.remove(pilot_id, departure, arrival + self.crew_rest, flight_id)
+        for attendant_id in attendant_ids:
+            self.attendants.remove(attendant_id, departure, arrival + self.crew_rest, flight_id)
+
+    def conflicts(self, plan: FlightPlan) -> List[str]:
+        problems = []
+        flight_id = self.planes.conflict(plan.plane_id, plan.departure, plan.arrival + self.turnaround)
+        if flight_id is not None:
+            problems.append(f"plane {plan.plane_id} is busy (flight {_flight_label(flight_id)})")
+        for index, label, ids in ((self.pilots, "pilot", plan.pilot_ids),
+                                  (self.attendants, "attendant", plan.attendant_ids)):
+            for crew_id in ids:
+                flight_id = index.conflict(crew_id, plan.departure, plan.arrival + self.crew_rest)
+                if flight_id is not None:
+                    problems.append(f"{label} {crew_id} is busy (flight {_flight_label(flight_id)})")
+        return problems
+
+
+def _flight_label(flight_id: int) -> str:
+    # Plans of the batch being validated get negative placeholder IDs
+    return f"#{flight_id}" if flight_id > 0 else f"row {-flight_id} of this batch"
+
+
+def validate_plans(plans: List[FlightPlan], schedule: ResourceSchedule, planes: Set[int],
+                   pilots: Dict[int, bool], attendants: Dict[int, bool], long_haul_minutes: int = 360,
+                   min_pilots: int = 1, min_attendants: int = 1) -> List[str]:
+    """
+    Check every plan against the existing schedule and against the earlier
+    plans of the same batch (each valid plan is added to `schedule`).
+
+    `planes` are the known plane IDs; `pilots` / `attendants` map crew ID to
+    whether they are certified for long-haul flights (over `long_haul_minutes`).
+    Returns error messages, empty if everything can be scheduled.
+    """
+    errors = []
+    for n, plan in enumerate(plans, start=1):
+        problems = []
+        if plan.origin == plan.destination:
+            problems.append("origin and destination are the same")
+        if plan.arrival <= plan.departure:
+            problems.append("arrival is not after departure")
+        if plan.departure <= datetime.now():
+            problems.append("departure is in the past")
+        if plan.business_price <= 0 or plan.economy_price <= 0:
+            problems.append("prices must be positive")
+        if plan.plane_id not in planes:
+            problems.append(f"unknown plane {plan.plane_id}")
+        if len(plan.pilot_ids) < min_pilots:
+            problems.append(f"needs at least {min_pilots} pilot(s)")
+        if len(plan.attendant_ids) < min_attendants:
+            problems.append(f"needs at least {min_attendants} attendant(s)")
+
+        long_haul = plan.duration_minutes > long_haul_minutes
+        for label, ids, crew in (("pilot", plan.pilot_ids, pilots), ("attendant", plan.attendant_ids, attendants)):
+            for crew_id in ids:
+                if crew_id not in crew:
+                    problems.append(f"unknown {label} {crew_id}")
+                elif long_haul and not crew[crew_id]:
+                    problems.append(f"{label} {crew_id} is not certified for long-haul flights")
+
+        if not problems:
+            problems = schedule.conflicts(plan)
+        if problems:
+            errors.append(f"{plan.line or f'row {n}'} ({plan.origin}->{plan.destination} "
+                          f"{plan.departure:%Y-%m-%d %H:%M}): {'; '.join(problems)}")
+        else:
+            schedule.add_flight(-n, plan.departure, plan.arrival, plan.plane_id, plan.pilot_ids, plan.attendant_ids)
+    return errors
+
+
+class AvailabilityIndex:
+    """
+    Long-lived index of which planes and crew are busy when, for offering
+    valid choices while a manager assigns a new flight.
+
+    Holds a ResourceSchedule over all active upcoming flights plus each
+    flight's route, so "who is free for this window at this origin" is a
+    bisect per candidate, with no database round trip. It is updated in place
+    when flights are scheduled or cancelled in this process and reloaded in
+    the background every `refresh_interval` seconds to pick up other processes'
+    writes. schedule_flights still validates against the database under its
+    lock; this index only answers suggestions.
+
+    Loaders are passed in so this module never touches the database:
+        load_flights() -> [(flight_id, departure, arrival, origin, dest, plane_id, [pilot_ids], [attendant_ids]), ...]
+        load_resources() -> ({plane_id: capacity}, {pilot_id: long_haul}, {attendant_id: long_haul})
+    """
+
+    def __init__(self, load_flights: Callable, load_resources: Callable,
+                 turnaround: timedelta = timedelta(minutes=60), crew_rest: timedelta = timedelta(hours=10),
+                 long_haul_minutes: int = 360, refresh_interval: float = 300.0):
+        self._load_flights = load_flights
+        self._load_resources = load_resources
+        self.turnaround = turnaround
+        self.crew_rest = crew_rest
+        self.long_haul_minutes = long_haul_minutes
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._schedule = ResourceSchedule(turnaround, crew_rest)
+        self._flights: Dict[int, Tuple] = {}
+        self._planes: Dict[int, int] = {}
+        self._pilots: Dict[int, bool] = {}
+        self._attendants: Dict[int, bool] = {}
+        # Candidate orders, sorted once per load: planes largest first, crew by ID
+        self._plane_order: List[int] = []
+        self._crew_order: Dict[Tuple[str, bool], List[int]] = {}
+        self._loaded_at: Optional[float] = None
+        self._refreshing = False
+
+    # -- loading -----------------------------------------------------------
+
+    def rebuild(self) -> None:
+        planes, pilots, attendants = self._load_resources()
+        schedule = ResourceSchedule(self.turnaround, self.crew_rest)
+        flights = {}
+        for flight_id, departure, arrival, origin, dest, plane_id, pilot_ids, attendant_ids in self._load_flights():
+            flights[flight_id] = (departure, arrival, origin, dest, plane_id, list(pilot_ids), list(attendant_ids))
+            schedule.add_flight(flight_id, departure, arrival, plane_id, pilot_ids, attendant_ids)
+
+        with self._lock:
+            self._schedule = schedule
+            self._flights = flights
+            self._planes, self._pilots, self._attendants = planes, pilots, attendants
+            self._plane_order = sorted(planes, key=lambda plane_id: (-planes[plane_id], plane_id))
+            self._crew_order = {
+                ("pilots", False): sorted(pilots),
+                ("pilots", True): sorted(p for p, certified in pilots.items() if certified),
+                ("attendants", False): sorted(attendants),
+                ("attendants", True): sorted(a for a, certified in attendants.items() if certified),
+            }
+            self._loaded_at = time.monotonic()
+
+    def _ensure_fresh(self) -> None:
+        if self._loaded_at is None:
+            self.rebuild()
+            return
+        if time.monotonic() - self._loaded_at < self.refresh_interval or self._refreshing:
+            return
+
+        # Serve the current index while a new one is loaded
+        self._refreshing = True
+
+        def refresh():
+            try:
+                self.rebuild()
+            except Exception as e:
+                logger.exception("Availability index refresh error: %s", e)
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=refresh, name="availability-refresh", daemon=True).start()
+
+    # -- incremental updates ----------------------------------------------
+
+    def add_flight(self, flight_id: int, departure: datetime, arrival: datetime, origin: str, destination: str,
+                   plane_id: int, pilot_ids: Iterable[int], attendant_ids: Iterable[int]) -> None:
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._remove(flight_id)
+            self._flights[flight_id] = (departure, arrival, origin, destination, plane_id,
+                                        list(pilot_ids), list(attendant_ids))
+            self._schedule.add_flight(flight_id, departure, arrival, plane_id, pilot_ids, attendant_ids)
+
+    def remove_flight(self, flight_id: int) -> None:
+        with self._lock:
+            self._remove(flight_id)
+
+    def _remove(self, flight_id: int) -> None:
+        flight = self._flights.pop(flight_id, None)
+        if flight is not None:
+            departure, arrival, _, _, plane_id, pilot_ids, attendant_ids = flight
+            self._schedule.remove_flight(flight_id, departure, arrival, plane_id, pilot_ids, attendant_ids)
+
+    # -- queries ------------------------------------------------------------
+
+    def _free(self, index: IntervalIndex, candidates: List[int], departure: datetime, end: datetime,
+              origin: Optional[str], destination: Optional[str]) -> List[int]:
+        flights = self._flights
+        free = []
+        for resource_id in candidates:
+            before, after = index.neighbours(resource_id, departure)
+            if before is not None:
+                # Still flying (or resting) at departure, or last landed elsewhere
+                if before[1] > departure or (origin and flights[before[2]][3] != origin):
+                    continue
+            if after is not None:
+                # Next flight starts too soon, or leaves from somewhere else
+                if after[0] < end or (destination and flights[after[2]][2] != destination):
+                    continue
+            free.append(resource_id)
+        return free
+
+    def available(self, departure: datetime, arrival: datetime, origin: Optional[str] = None,
+                  destination: Optional[str] = None) -> Dict:
+        """
+        Planes, pilots and attendants free for [departure, arrival] (plus
+        turnaround / rest), positioned at `origin` and, if given, able to
+        continue from `destination`. Crew lists only hold long-haul certified
+        members when the flight is long-haul. Planes are largest first.
+        """
+        self._ensure_fresh()
+        origin = origin.upper() if origin else None
+        destination = destination.upper() if destination else None
+        long_haul = (arrival - departure).total_seconds() / 60 > self.long_haul_minutes
+
+        with self._lock:
+            schedule = self._schedule
+            planes = self._free(schedule.planes, self._plane_order, departure,
+                                arrival + self.turnaround, origin, destination)
+            return {
+                "long_haul": long_haul,
+                "planes": [{"plane_id": plane_id, "capacity": self._planes[plane_id]} for plane_id in planes],
+                "pilots": self._free(schedule.pilots, self._crew_order[("pilots", long_haul)], departure,
+                                     arrival + self.crew_rest, origin, destination),
+                "attendants": self._free(schedule.attendants, self._crew_order[("attendants", long_haul)],
+                                         departure, arrival + self.crew_rest, origin, destination),
+            }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "flights": len(self._flights),
+                "planes": len(self._planes),
+                "pilots": len(self._pilots),
+                "attendants": len(self._attendants),
+                "age_seconds": time.monotonic() - self._loaded_at if self._loaded_at else None,
+            }
@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+logger = logging.getLogger("flytau.seat_holds")
+
+
+class SeatHold:
+    __slots__ = ("flight_id", "seat_ids", "expires_at")
+
+    def __init__(self, flight_id: int, seat_ids: Set[int], expires_at: float):
+        self.flight_id = flight_id
+        self.seat_ids = seat_ids
+        self.expires_at = expires_at
+
+
+class SeatHoldStore:
+    """
+    Short-lived seat holds taken at /booking_summary so two passengers in
+    checkout cannot pick the same seats.
+
+    Each holder (one browser session) has at most one hold: a set of seats on
+    one flight, expiring `ttl` seconds after it was taken. Holding new seats
+    replaces the holder's previous hold. Lookups are dict operations under one
+    lock; expired holds are ignored on read and dropped by sweep().
+
+    Holds are process-local and advisory: create_order_with_seats still locks
+    the seats in the database, so with several workers a hold only narrows the
+    race instead of closing it.
+    """
+
+    def __init__(self, ttl: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._holders: Dict[str, SeatHold] = {}
+        self._flights: Dict[int, Dict[int, str]] = {}  # flight_id -> {seat_id: holder}
+
+    def _live_holder(self, flight_id: int, seat_id: int, now: float) -> Optional[str]:
+        holder = self._flights.get(flight_id, {}).get(seat_id)
+        if holder is None:
+            return None
+        hold = self._holders.get(holder)
+        if hold is None or hold.expires_at <= now:
+            return None
+        return holder
+
+    def _drop(self, holder: str) -> None:
+        hold = self._holders.pop(holder, None)
+        if hold is None:
+            return
+        seats = self._flights.get(hold.flight_id)
+        if seats is None:
+            return
+        for seat_id in hold.seat_ids:
+            if seats.get(seat_id) == holder:
+                del seats[seat_id]
+        if not seats:
+            del self._flights[hold.flight_id]
+
+    def hold(self, flight_id: int, seat_ids: Iterable[int], holder: str) -> List[int]:
+        """
+        Hold all of `seat_ids` for `holder`, or none of them.
+        Returns the seats held by someone else ([] on success).
+        """
+        seat_ids = set(seat_ids)
+        now = self._clock()
+        with self._lock:
+            taken = sorted(seat_id for seat_id in seat_ids
+                           if self._live_holder(flight_id, seat_id, now) not in (None, holder))
+            if taken:
+                return taken
+            self._drop(holder)
+            self._holders[holder] = SeatHold(flight_id, seat_ids, now + self.ttl)
+            seats = self._flights.setdefault(flight_id, {})
+            for seat_id in seat_ids:
+                previous = seats.get(seat_id)
+                if previous is not None and previous != holder:
+                    # An expired hold that the sweeper has not reached yet
+                    self._drop(previous)
+                    seats = self._flights.setdefault(flight_id, {})
+                seats[seat_id] = holder
+            return []
+
+    def conflicts(self, flight_id: int, seat_ids: Iterable[int], holder: Optional[str]) -> List[int]:
+        """
+        Seats among `seat_ids` currently held by someone other than `holder`.
+        """
+        now = self._clock()
+        with self._lock:
+            return sorted(seat_id for seat_id in set(seat_ids)
+                          if self._live_holder(flight_id, seat_id, now) not in (None, holder))
+
+    def held_seats(self, flight_id: int, exclude_holder: Optional[str] = None) -> List[int]:
+        now = self._clock()
+        with self._lock:
+            seats = self._flights.get(flight_id)
+            if not seats:
+                return []
+            return sorted(seat_id for seat_id, holder in seats.items()
+                          if holder != exclude_holder and self._live_holder(flight_id, seat_id, now))
+
+    def seconds_left(self, holder: str) -> Optional[float]:
+        with self._lock:
+            hold = self._holders.get(holder)
+            if hold is None:
+                return None
+            return max(0.0, hold.expires_at - self._clock())
+
+    def release(self, holder: str) -> None:
+        with self._lock:
+            self._drop(holder)
+
+    def sweep(self) -> int:
+        """
+        Drop expired holds; returns how many were dropped.
+        """
+        now = self._clock()
+        with self._lock:
+            expired = [holder for holder, hold in self._holders.items() if hold.expires_at <= now]
+            for holder in expired:
+                self._drop(holder)
+        return len(expired)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"holders": len(self._holders),
+                    "seats": sum(len(seats) for seats in self._flights.values())}
+
+
+def start_sweeper(store: SeatHoldStore, interval: float) -> None:
+    """
+    Background thread dropping expired holds every `interval` seconds.
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                store.sweep()
+            except Exception as e:
+                logger.exception("Seat hold sweep error: %s", e)
+
+    threading.Thread(target=run, name="seat-hold-sweeper", daemon=True).start()
@@ -0,0 +1,254 @@
+import itertools
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Occupancy loads tried before a read is served from a detached snapshot
+LOAD_ATTEMPTS = 3
+
+
+class PlaneLayout:
+    """
+    The static seat layout of a plane: seats in display order (row, letter)
+    and the position of each seat ID in the occupancy bitmap.
+    """
+
+    def __init__(self, plane_id: int, seats: List[Tuple[int, int, str, str]]):
+        # seats: (seat_id, row_num, letter, class_type) ordered by row/letter
+        self.plane_id = plane_id
+        self.seats = seats
+        self.index = {seat[0]: i for i, seat in enumerate(seats)}
+
+    def __len__(self):
+        return len(self.seats)
+
+
+class FlightSeatSnapshot:
+    """
+    Occupancy of one flight as a bitmap over its plane's layout.
+
+    Every change bumps `version` and is kept in a bounded change log, so
+    clients can ask for "what changed since version N" instead of the whole
+    plane. `epoch` identifies this snapshot; a client holding a version from
+    another epoch (reload, other worker process) must refetch in full.
+    """
+
+    def __init__(self, flight_id: int, layout: PlaneLayout, occupied_ids: Iterable[int], version: int,
+                 log_size: int = 256):
+        self.flight_id = flight_id
+        self.layout = layout
+        self.bitmap = bytearray((len(layout) + 7) // 8)
+        self.epoch = uuid.uuid4().hex[:12]
+        self.version = version
+        self.log_start = version  # changes after this version are in `changes`
+        self.changes = deque(maxlen=log_size)  # (version, seat_id, is_occupied)
+        self.loaded_at = time.monotonic()
+        for seat_id in occupied_ids:
+            idx = layout.index.get(seat_id)
+            if idx is not None:
+                self.bitmap[idx >> 3] |= 1 << (idx & 7)
+
+    def is_occupied(self, idx: int) -> bool:
+        return bool(self.bitmap[idx >> 3] & (1 << (idx & 7)))
+
+    def set_seat(self, seat_id: int, occupied: bool, version: int) -> bool:
+        idx = self.layout.index.get(seat_id)
+        if idx is None or self.is_occupied(idx) == occupied:
+            return False
+        if occupied:
+            self.bitmap[idx >> 3] |= 1 << (idx & 7)
+        else:
+            self.bitmap[idx >> 3] &= ~(1 << (idx & 7)) & 0xFF
+        if len(self.changes) == self.changes.maxlen:
+            self.log_start = self.changes[0][0]
+        self.changes.append((version, seat_id, occupied))
+        self.version = version
+        return True
+
+    def occupied_seat_ids(self) -> List[int]:
+        return [seat[0] for i, seat in enumerate(self.layout.seats) if self.is_occupied(i)]
+
+    def to_seat_list(self) -> List[Dict]:
+        return [{
+            "seat_id": seat_id,
+            "row_num": row_num,
+            "letter": letter,
+            "class_type": class_type,
+            "is_occupied": self.is_occupied(i),
+        } for i, (seat_id, row_num, letter, class_type) in enumerate(self.layout.seats)]
+
+    def changes_since(self, epoch: str, version: int) -> Optional[List[Dict]]:
+        """
+        Seat changes after `version`, or None if the log cannot answer
+        (other epoch, or the version has already rotated out of the log).
+        """
+        if epoch != self.epoch or version < self.log_start or version > self.version:
+            return None
+        latest = {}
+        for change_version, seat_id, occupied in self.changes:
+            if change_version > version:
+                latest[seat_id] = occupied
+        return [{"seat_id": seat_id, "is_occupied": occupied} for seat_id, occupied in latest.items()]
+
+
+class SeatMapCache:
+    """
+    Per-process cache of plane layouts (static, kept forever) and flight
+    seat snapshots (LRU-bounded, reloaded after `ttl` seconds so bookings made
+    by other worker processes show up).
+
+    Each flight has a generation, bumped by mark_seats and invalidate_flight.
+    A load passes the generation it started under to install(), which drops
+    it if the generation moved on, so occupancy read before a booking
+    committed cannot overwrite that booking's seats.
+
+    Loaders are passed in so the cache itself never touches the database:
+        load_plane_id(flight_id) -> Optional[int]
+        load_layout(plane_id) -> [(seat_id, row_num, letter, class_type), ...]
+        load_occupied(flight_id) -> [seat_id, ...]
+    """
+
+    def __init__(self, load_plane_id: Callable, load_layout: Callable, load_occupied: Callable,
+                 max_flights: int = 2048, ttl: float = 30.0):
+        self._load_plane_id = load_plane_id
+        self._load_layout = load_layout
+        self._load_occupied = load_occupied
+        self.max_flights = max_flights
+        self.ttl = ttl
+        self._layouts: Dict[int, PlaneLayout] = {}
+        self._flight_planes: Dict[int, int] = {}
+        self._snapshots = OrderedDict()
+        self._generations = OrderedDict()  # flight_id -> value of the last bump
+        self._versions = itertools.count(1)
+        self._lock = threading.RLock()
+
+    def get_layout(self, plane_id: int) -> PlaneLayout:
+        layout = self._layouts.get(plane_id)
+        if layout is None:
+            layout = PlaneLayout(plane_id, self._load_layout(plane_id))
+            with self._lock:
+                self._layouts[plane_id] = layout
+        return layout
+
+    def get_plane_id(self, flight_id: int) -> Optional[int]:
+        plane_id = self._flight_planes.get(flight_id)
+        if plane_id is None:
+            plane_id = self._load_plane_id(flight_id)
+            if plane_id is not None:
+                with self._lock:
+                    self._flight_planes[flight_id] = plane_id
+        return plane_id
+
+    def get_fresh(self, flight_id: int) -> Optional[FlightSeatSnapshot]:
+        """
+        The cached snapshot if it is younger than the TTL, without loading anything.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(flight_id)
+            if snapshot is not None and time.monotonic() - snapshot.loaded_at < self.ttl:
+                self._snapshots.move_to_end(flight_id)
+                return snapshot
+        return None
+
+    def generation(self, flight_id: int) -> int:
+        """
+        Read before loading a flight's occupancy and pass it to install().
+        """
+        with self._lock:
+            return self._generations.get(flight_id, 0)
+
+    def _bump(self, flight_id: int) -> None:
+        # Values come from the version counter, so they never repeat; a
+        # generation pruned here reads as 0 and only makes a load retry
+        self._generations[flight_id] = next(self._versions)
+        self._generations.move_to_end(flight_id)
+        while len(self._generations) > self.max_flights:
+            self._generations.popitem(last=False)
+
+    def get_snapshot(self, flight_id: int) -> Optional[FlightSeatSnapshot]:
+        snapshot = self.get_fresh(flight_id)
+        if snapshot is not None:
+            return snapshot
+
+        plane_id = self.get_plane_id(flight_id)
+        if plane_id is None:
+            return None
+        layout = self.get_layout(plane_id)
+        for _ in range(LOAD_ATTEMPTS):
+            generation = self.generation(flight_id)
+            occupied = self._load_occupied(flight_id)
+            snapshot = self.install(flight_id, layout, occupied, generation)
+            if snapshot is not None:
+                return snapshot
+        return self.detached(flight_id, layout, occupied)
+
+    def install(self, flight_id: int, layout: PlaneLayout, occupied_ids: Iterable[int],
+                generation: Optional[int] = None) -> Optional[FlightSeatSnapshot]:
+        """
+        Store freshly loaded occupancy for a flight. Callers that load data
+        themselves (e.g. the async driver) use this instead of get_snapshot.
+
+        If seats were marked since `generation` the load is stale and is not
+        stored: the cached snapshot (which has the marks) is returned, or
+        None when there is none and the caller should load again.
+        """
+        occupied = set(occupied_ids)
+        with self._lock:
+            current = self._snapshots.get(flight_id)
+            if generation is not None and generation != self._generations.get(flight_id, 0):
+                return current
+            self._flight_planes[flight_id] = layout.plane_id
+            self._layouts.setdefault(layout.plane_id, layout)
+            if current is not None and current.layout is layout:
+                # Refresh in place: record the differences as normal changes so
+                # clients polling for deltas stay on the same epoch
+                for i, seat in enumerate(layout.seats):
+                    if current.is_occupied(i) != (seat[0] in occupied):
+                        current.set_seat(seat[0], seat[0] in occupied, next(self._versions))
+                current.loaded_at = time.monotonic()
+                self._snapshots.move_to_end(flight_id)
+                return current
+
+            snapshot = FlightSeatSnapshot(flight_id, layout, occupied, next(self._versions))
+            self._snapshots[flight_id] = snapshot
+            while len(self._snapshots) > self.max_flights:
+                self._snapshots.popitem(last=False)
+            return snapshot
+
+    def detached(self, flight_id: int, layout: PlaneLayout, occupied_ids: Iterable[int]) -> FlightSeatSnapshot:
+        """
+        A snapshot that is not stored, for a read whose loads kept going stale
+        (bookings landing while they ran); the next read loads again.
+        """
+        return FlightSeatSnapshot(flight_id, layout, occupied_ids, next(self._versions))
+
+    def cached_layout(self, plane_id: int) -> Optional[PlaneLayout]:
+        return self._layouts.get(plane_id)
+
+    def cached_plane_id(self, flight_id: int) -> Optional[int]:
+        return self._flight_planes.get(flight_id)
+
+    def mark_seats(self, flight_id: int, seat_ids: Iterable[int], occupied: bool) -> None:
+        """
+        Apply a committed booking (occupied=True) or cancellation (False).
+        Flights without a cached snapshot are left alone; they load fresh.
+        """
+        with self._lock:
+            self._bump(flight_id)
+            snapshot = self._snapshots.get(flight_id)
+            if snapshot is None:
+                return
+            for seat_id in seat_ids:
+                snapshot.set_seat(int(seat_id), occupied, next(self._versions))
+
+    def invalidate_flight(self, flight_id: int) -> None:
+        with self._lock:
+            self._bump(flight_id)
+            self._snapshots.pop(flight_id, None)
+            self._flight_planes.pop(flight_id, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"planes": len(self._layouts), "flights": len(self._snapshots)}
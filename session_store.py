@@ -0,0 +1,226 @@
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SecureCookieSessionInterface, SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+logger = logging.getLogger("flytau.sessions")
+
+
+_serializer = TaggedJSONSerializer()
+
+
+class MemorySessionStore:
+    """
+    Process-local session store: LRU-bounded dict of sid -> (expires_at, data).
+    Only suitable for a single worker process.
+    """
+
+    def __init__(self, max_sessions: int = 10000):
+        self.max_sessions = max_sessions
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._data[sid]
+                return None
+            self._data.move_to_end(sid)
+            return _serializer.loads(entry[1])
+
+    def set(self, sid: str, data: Dict, ttl: int) -> None:
+        payload = _serializer.dumps(data)
+        with self._lock:
+            self._data[sid] = (time.time() + ttl, payload)
+            self._data.move_to_end(sid)
+            while len(self._data) > self.max_sessions:
+                self._data.popitem(last=False)
+
+    def touch(self, sid: str, ttl: int) -> None:
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is not None:
+                self._data[sid] = (time.time() + ttl, entry[1])
+
+    def delete(self, sid: str) -> None:
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [sid for sid, (expires_at, _) in self._data.items() if expires_at < now]
+            for sid in expired:
+                del self._data[sid]
+        return len(expired)
+
+
+class RedisSessionStore:
+    """
+    Shared session store for several worker processes or nodes.
+    Talks the Redis protocol, so a local `redis-server` (or any compatible
+    stand-in) serves it in development. Keys expire on the server, so no
+    garbage collection is needed here.
+    """
+
+    def __init__(self, url: str, prefix: str = "flytau:session:"):
+        import redis  # optional dependency, only needed for this backend
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, sid: str) -> Optional[Dict]:
+        payload = self.client.get(self.prefix + sid)
+        return _serializer.loads(payload.decode("utf-8")) if payload else None
+
+    def set(self, sid: str, data: Dict, ttl: int) -> None:
+        self.client.setex(self.prefix + sid, ttl, _serializer.dumps(data))
+
+    def touch(self, sid: str, ttl: int) -> None:
+        self.client.expire(self.prefix + sid, ttl)
+
+    def delete(self, sid: str) -> None:
+        self.client.delete(self.prefix + sid)
+
+    def purge_expired(self) -> int:
+        return 0
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    # Always permanent (cookie expiry from PERMANENT_SESSION_LIFETIME) without
+    # storing a `_permanent` key, so a visitor's empty session stays empty and
+    # is never written to the store
+    permanent = True
+
+    def __init__(self, initial=None, sid: Optional[str] = None, new: bool = False):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.rotate = False
+
+    def clear(self) -> None:
+        # Every login and logout clears the session first; the next save
+        # issues a new session ID, so a planted ID never gets authenticated
+        super().clear()
+        self.rotate = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Keeps session data in a store and only a signed session ID in the cookie.
+
+    The store is written only when the session was modified; an unchanged
+    session just has its expiry extended (no payload rewrite). A cleared
+    session is saved under a fresh session ID and its old entry is deleted.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app) -> Signer:
+        return Signer(app.secret_key, salt="flytau-session")
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode("utf-8")
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.store.get(sid)
+                if data is not None:
+                    return ServerSideSession(data, sid=sid)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.rotate and not session.new:
+            self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+            session.rotate = False
+
+        ttl = int(app.permanent_session_lifetime.total_seconds())
+        if session.modified:
+            self.store.set(session.sid, dict(session), ttl)
+        elif self.should_set_cookie(app, session):
+            self.store.touch(session.sid, ttl)
+        else:
+            return
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode("utf-8"),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def _start_gc(store, interval: float) -> None:
+    def sweep():
+        while True:
+            time.sleep(interval)
+            try:
+                store.purge_expired()
+            except Exception as e:
+                logger.exception("Session GC Error: %s", e)
+
+    threading.Thread(target=sweep, name="session-gc", daemon=True).start()
+
+
+def init_session(app) -> None:
+    """
+    Pick the session backend from SESSION_BACKEND:
+    - cookie (default): signed cookie, nothing stored server-side
+    - memory: in-process LRU store, single worker only
+    - redis:  shared store at SESSION_REDIS_URL for several workers/nodes
+    """
+    if not app.secret_key:
+        app.secret_key = os.getenv("FLASK_SECRET_KEY")
+    if not app.secret_key:
+        # Sessions will not survive a restart or work across workers without a fixed key
+        logger.warning("FLASK_SECRET_KEY is not set, using a random per-process key.")
+        app.secret_key = secrets.token_hex(32)
+
+    backend = os.getenv("SESSION_BACKEND", "cookie").lower()
+    if backend == "cookie":
+        app.session_interface = SecureCookieSessionInterface()
+        return
+
+    if backend == "memory":
+        store = MemorySessionStore(max_sessions=int(os.getenv("SESSION_MEMORY_MAX", "10000")))
+        _start_gc(store, float(os.getenv("SESSION_GC_INTERVAL", "60")))
+    elif backend == "redis":
+        store = RedisSessionStore(os.getenv("SESSION_REDIS_URL", "redis://localhost:6379/0"))
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND '{backend}' (expected cookie, memory or redis).")
+
+    app.session_interface = ServerSideSessionInterface(store)
@@ -0,0 +1,30 @@
+-- Per-flight booked-seat counters maintained by utils.create_order_with_seats
+-- and utils.delete_ticket in the same transaction as the order change.
+-- search_flights filters on Seats_Remaining instead of re-counting Assigned.
+
+CREATE TABLE IF NOT EXISTS Flight_Seat_Counts (
+    Flight_ID INT NOT NULL PRIMARY KEY,
+    Business_Booked INT NOT NULL DEFAULT 0,
+    Economy_Booked INT NOT NULL DEFAULT 0,
+    Seats_Remaining INT NOT NULL,
+    Updated_At TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CONSTRAINT fk_seat_counts_flight FOREIGN KEY (Flight_ID) REFERENCES Flight (ID) ON DELETE CASCADE
+);
+
+-- Backfill from the current bookings (same query as utils.reconcile_seat_counts)
+INSERT INTO Flight_Seat_Counts (Flight_ID, Business_Booked, Economy_Booked, Seats_Remaining)
+SELECT
+    f.ID,
+    COALESCE(SUM(LOWER(c.Type) = 'business'), 0),
+    COALESCE(SUM(LOWER(c.Type) <> 'business'), 0),
+    p.Total_Capacity - COUNT(c.ID)
+FROM Flight f
+JOIN Plane p ON f.Plane_ID = p.ID
+LEFT JOIN `Order` o ON o.Flight_ID = f.ID AND o.Status = 'Active'
+LEFT JOIN Assigned a ON a.Order_ID = o.Order_ID
+LEFT JOIN class c ON a.Class_ID = c.ID
+GROUP BY f.ID, p.Total_Capacity
+ON DUPLICATE KEY UPDATE
+    Business_Booked = VALUES(Business_Booked),
+    Economy_Booked = VALUES(Economy_Booked),
+    Seats_Remaining = VALUES(Seats_Remaining);
@@ -0,0 +1,18 @@
+-- Composite covering indexes for the hot read paths.
+-- Run once; MySQL has no CREATE INDEX IF NOT EXISTS.
+
+-- search_flights: equality on the route, range on the departure time, and the
+-- remaining selected columns so the rows come straight from the index
+-- (InnoDB secondary indexes carry the primary key, Flight.ID).
+CREATE INDEX idx_flight_route_departure ON Flight
+    (Path_Origin_Airport, Path_Dest_Airport, Departure_DateTime,
+     Arrival_DateTime, Business_Seat_Price, Economy_Seat_Price, Plane_ID);
+
+-- Seat map: plane layout in display order.
+CREATE INDEX idx_class_plane_layout ON class (Plane_ID, Row_Num, Column_Letter, Type);
+
+-- Seat map / seat counters / booking conflict check: active orders of a flight.
+CREATE INDEX idx_order_flight_status ON `Order` (Flight_ID, Status);
+
+-- Order lookup and cancellation: seats of an order.
+CREATE INDEX idx_assigned_order ON Assigned (Order_ID, Class_ID);
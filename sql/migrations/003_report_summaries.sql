@@ -0,0 +1,122 @@
+-- Precomputed management reports (/view_reports).
+--
+-- Order changes append a row to Report_Event in the same transaction as the
+-- order (utils._record_order_event); utils.apply_report_events folds the
+-- events into the summary tables in batches and deletes them. Bookings never
+-- update a shared summary row themselves, so reporting adds no lock contention
+-- to the booking path. utils.rebuild_reports (python rebuild_reports.py)
+-- recomputes everything from the base tables, same queries as the backfill below.
+
+CREATE TABLE IF NOT EXISTS Report_Event (
+    Event_ID BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    Order_ID INT NULL,                -- NULL: flight added, no order change
+    Flight_ID INT NOT NULL,
+    Old_Status VARCHAR(30) NULL,      -- NULL: new order
+    New_Status VARCHAR(30) NULL,
+    Old_Price DECIMAL(10, 2) NOT NULL DEFAULT 0,
+    New_Price DECIMAL(10, 2) NOT NULL DEFAULT 0,
+    Seats_Delta INT NOT NULL DEFAULT 0,
+    Created_At TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Revenue counts every order's current Total_Price (cancellation fees included);
+-- Seats_Sold counts seats still assigned (cancellations release theirs).
+CREATE TABLE IF NOT EXISTS Report_Flight_Stats (
+    Flight_ID INT NOT NULL PRIMARY KEY,
+    Origin_Airport CHAR(3) NOT NULL,
+    Dest_Airport CHAR(3) NOT NULL,
+    Departure_DateTime DATETIME NOT NULL,
+    Plane_ID INT NOT NULL,
+    Capacity INT NOT NULL,
+    Orders INT NOT NULL DEFAULT 0,
+    Seats_Sold INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS Report_Route_Stats (
+    Origin_Airport CHAR(3) NOT NULL,
+    Dest_Airport CHAR(3) NOT NULL,
+    Flights INT NOT NULL DEFAULT 0,
+    Seats_Offered INT NOT NULL DEFAULT 0,
+    Orders INT NOT NULL DEFAULT 0,
+    Seats_Sold INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (Origin_Airport, Dest_Airport)
+);
+
+CREATE TABLE IF NOT EXISTS Report_Plane_Stats (
+    Plane_ID INT NOT NULL PRIMARY KEY,
+    Flights INT NOT NULL DEFAULT 0,
+    Seats_Offered INT NOT NULL DEFAULT 0,
+    Seats_Sold INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS Report_Order_Status (
+    Status VARCHAR(30) NOT NULL PRIMARY KEY,
+    Orders INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(14, 2) NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS Report_Crew_Stats (
+    Crew_Type VARCHAR(20) NOT NULL,
+    Crew_ID INT NOT NULL,
+    Flights INT NOT NULL DEFAULT 0,
+    Flight_Minutes INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (Crew_Type, Crew_ID)
+);
+
+-- Backfill from the current data (same queries as utils.rebuild_reports)
+DELETE FROM Report_Event;
+DELETE FROM Report_Flight_Stats;
+DELETE FROM Report_Route_Stats;
+DELETE FROM Report_Plane_Stats;
+DELETE FROM Report_Order_Status;
+DELETE FROM Report_Crew_Stats;
+
+INSERT INTO Report_Flight_Stats
+    (Flight_ID, Origin_Airport, Dest_Airport, Departure_DateTime, Plane_ID, Capacity, Orders, Seats_Sold, Revenue)
+SELECT
+    f.ID, f.Path_Origin_Airport, f.Path_Dest_Airport, f.Departure_DateTime, f.Plane_ID, p.Total_Capacity,
+    COALESCE(o.Orders, 0), COALESCE(s.Seats_Sold, 0), COALESCE(o.Revenue, 0)
+FROM Flight f
+JOIN Plane p ON f.Plane_ID = p.ID
+LEFT JOIN (
+    SELECT Flight_ID, COUNT(*) AS Orders, SUM(Total_Price) AS Revenue
+    FROM `Order`
+    GROUP BY Flight_ID
+) o ON o.Flight_ID = f.ID
+LEFT JOIN (
+    SELECT o.Flight_ID, COUNT(*) AS Seats_Sold
+    FROM `Order` o
+    JOIN Assigned a ON a.Order_ID = o.Order_ID
+    GROUP BY o.Flight_ID
+) s ON s.Flight_ID = f.ID;
+
+INSERT INTO Report_Route_Stats (Origin_Airport, Dest_Airport, Flights, Seats_Offered, Orders, Seats_Sold, Revenue)
+SELECT Origin_Airport, Dest_Airport, COUNT(*), SUM(Capacity), SUM(Orders), SUM(Seats_Sold), SUM(Revenue)
+FROM Report_Flight_Stats
+GROUP BY Origin_Airport, Dest_Airport;
+
+INSERT INTO Report_Plane_Stats (Plane_ID, Flights, Seats_Offered, Seats_Sold, Revenue)
+SELECT Plane_ID, COUNT(*), SUM(Capacity), SUM(Seats_Sold), SUM(Revenue)
+FROM Report_Flight_Stats
+GROUP BY Plane_ID;
+
+INSERT INTO Report_Order_Status (Status, Orders, Revenue)
+SELECT Status, COUNT(*), SUM(Total_Price)
+FROM `Order`
+GROUP BY Status;
+
+INSERT INTO Report_Crew_Stats (Crew_Type, Crew_ID, Flights, Flight_Minutes)
+SELECT 'Pilot', c.ID, COUNT(f.ID), COALESCE(SUM(TIMESTAMPDIFF(MINUTE, f.Departure_DateTime, f.Arrival_DateTime)), 0)
+FROM Pilot c
+LEFT JOIN Pilot_Flight cf ON cf.Pilot_ID = c.ID
+LEFT JOIN Flight f ON f.ID = cf.Flight_ID
+GROUP BY c.ID
+UNION ALL
+SELECT 'Attendant', c.ID, COUNT(f.ID), COALESCE(SUM(TIMESTAMPDIFF(MINUTE, f.Departure_DateTime, f.Arrival_DateTime)), 0)
+FROM Flight_Attendant c
+LEFT JOIN Attendant_Flight cf ON cf.Attendant_ID = c.ID
+LEFT JOIN Flight f ON f.ID = cf.Flight_ID
+GROUP BY c.ID;
@@ -0,0 +1,7 @@
+-- Purchase history (utils.iter_purchase_history): a customer's orders newest
+-- first, paged by (Order_Date, Order_ID), optionally filtered by status.
+-- Both indexes serve the rows already in page order, so a page reads only
+-- its own rows however many orders the account has.
+-- (Order_ID is spelled out even though InnoDB appends it, to document the key.)
+CREATE INDEX idx_order_customer_history ON `Order` (Costumer_Mail, Order_Date, Order_ID);
+CREATE INDEX idx_order_customer_status_history ON `Order` (Costumer_Mail, Status, Order_Date, Order_ID);
@@ -0,0 +1,15 @@
+-- Flight status for bulk cancellation (utils.cancel_flights).
+-- 'Active' flights are searchable and bookable; 'Cancelled' flights keep their
+-- row (and their orders, as 'system cancel') for history and reports.
+ALTER TABLE Flight ADD COLUMN Status VARCHAR(20) NOT NULL DEFAULT 'Active';
+
+-- Searches now filter on Status: rebuild the covering route index with it
+-- as an equality column before the departure range. The new index is created
+-- first because the old one also backs the path foreign key.
+CREATE INDEX idx_flight_route_status_departure ON Flight
+    (Path_Origin_Airport, Path_Dest_Airport, Status, Departure_DateTime,
+     Arrival_DateTime, Business_Seat_Price, Economy_Seat_Price, Plane_ID);
+DROP INDEX idx_flight_route_departure ON Flight;
+
+-- Schedule validation: a plane's flights in a time window.
+CREATE INDEX idx_flight_plane_departure ON Flight (Plane_ID, Departure_DateTime);
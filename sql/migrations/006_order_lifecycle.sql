@@ -0,0 +1,17 @@
+-- Order lifecycle scheduler (utils.complete_departed_orders).
+
+-- Departed flights in departure order; the keyset (Departure_DateTime, ID)
+-- comes straight from this index (InnoDB appends the primary key).
+CREATE INDEX idx_flight_status_departure ON Flight (Status, Departure_DateTime);
+
+-- Resume point of each background job. For complete_departed_orders it is the
+-- last flight (by departure, then ID) whose orders were completed.
+CREATE TABLE IF NOT EXISTS Job_Checkpoint (
+    Job_Name VARCHAR(50) NOT NULL PRIMARY KEY,
+    Last_Departure DATETIME NULL,
+    Last_Flight_ID INT NULL,
+    Rows_Processed BIGINT NOT NULL DEFAULT 0,
+    Updated_At DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT IGNORE INTO Job_Checkpoint (Job_Name) VALUES ('complete_departed_orders');
@@ -0,0 +1,43 @@
+-- Optional airport names for the search-form autocomplete (utils.airport_index).
+-- Every code in `path` is an airport whether or not it has a row here; a row
+-- only adds the city and name the autocomplete matches and shows.
+CREATE TABLE IF NOT EXISTS Airport (
+    Code CHAR(3) NOT NULL PRIMARY KEY,
+    City VARCHAR(100) NOT NULL,
+    Name VARCHAR(150) NOT NULL,
+    Country VARCHAR(100) NULL
+);
+
+INSERT IGNORE INTO Airport (Code, City, Name, Country) VALUES
+    ('TLV', 'Tel Aviv', 'Ben Gurion International', 'Israel'),
+    ('ETM', 'Eilat', 'Ramon International', 'Israel'),
+    ('HFA', 'Haifa', 'Haifa International', 'Israel'),
+    ('ATH', 'Athens', 'Athens International', 'Greece'),
+    ('LCA', 'Larnaca', 'Larnaca International', 'Cyprus'),
+    ('IST', 'Istanbul', 'Istanbul Airport', 'Turkey'),
+    ('FCO', 'Rome', 'Leonardo da Vinci-Fiumicino', 'Italy'),
+    ('MXP', 'Milan', 'Malpensa', 'Italy'),
+    ('CDG', 'Paris', 'Charles de Gaulle', 'France'),
+    ('ORY', 'Paris', 'Orly', 'France'),
+    ('LHR', 'London', 'Heathrow', 'United Kingdom'),
+    ('LGW', 'London', 'Gatwick', 'United Kingdom'),
+    ('LTN', 'London', 'Luton', 'United Kingdom'),
+    ('AMS', 'Amsterdam', 'Schiphol', 'Netherlands'),
+    ('FRA', 'Frankfurt', 'Frankfurt am Main', 'Germany'),
+    ('MUC', 'Munich', 'Munich Airport', 'Germany'),
+    ('BER', 'Berlin', 'Berlin Brandenburg', 'Germany'),
+    ('VIE', 'Vienna', 'Vienna International', 'Austria'),
+    ('ZRH', 'Zurich', 'Zurich Airport', 'Switzerland'),
+    ('MAD', 'Madrid', 'Adolfo Suarez Madrid-Barajas', 'Spain'),
+    ('BCN', 'Barcelona', 'Josep Tarradellas Barcelona-El Prat', 'Spain'),
+    ('LIS', 'Lisbon', 'Humberto Delgado', 'Portugal'),
+    ('PRG', 'Prague', 'Vaclav Havel Airport Prague', 'Czech Republic'),
+    ('BUD', 'Budapest', 'Budapest Ferenc Liszt International', 'Hungary'),
+    ('WAW', 'Warsaw', 'Warsaw Chopin', 'Poland'),
+    ('DXB', 'Dubai', 'Dubai International', 'United Arab Emirates'),
+    ('BKK', 'Bangkok', 'Suvarnabhumi', 'Thailand'),
+    ('JFK', 'New York', 'John F. Kennedy International', 'United States'),
+    ('EWR', 'Newark', 'Newark Liberty International', 'United States'),
+    ('LAX', 'Los Angeles', 'Los Angeles International', 'United States'),
+    ('MIA', 'Miami', 'Miami International', 'United States'),
+    ('YYZ', 'Toronto', 'Toronto Pearson International', 'Canada');
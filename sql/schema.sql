@@ -0,0 +1,120 @@
+-- FLYTAU base schema, reconstructed from the queries in utils.py.
+-- Used to create local, benchmark and load-test databases; apply the files in
+-- sql/migrations/ on top of it in order.
+
+CREATE TABLE IF NOT EXISTS Manager (
+    ID INT NOT NULL PRIMARY KEY,
+    First_Name VARCHAR(50) NOT NULL,
+    Last_Name VARCHAR(50) NOT NULL,
+    Password VARCHAR(100) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Costumer (
+    Mail VARCHAR(100) NOT NULL PRIMARY KEY,
+    Passport_Num VARCHAR(20) NOT NULL,
+    B_Date DATE NOT NULL,
+    Password VARCHAR(100) NOT NULL,
+    Signup_date DATE NOT NULL,
+    First_Name VARCHAR(50) NOT NULL,
+    Last_Name VARCHAR(50) NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Costumer_Phone (
+    Phone VARCHAR(20) NOT NULL,
+    Costumer_Mail VARCHAR(100) NOT NULL,
+    PRIMARY KEY (Phone, Costumer_Mail),
+    FOREIGN KEY (Costumer_Mail) REFERENCES Costumer (Mail)
+);
+
+CREATE TABLE IF NOT EXISTS Guest (
+    Mail VARCHAR(100) NOT NULL PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS path (
+    Origin_Airport CHAR(3) NOT NULL,
+    Dest_Airport CHAR(3) NOT NULL,
+    PRIMARY KEY (Origin_Airport, Dest_Airport)
+);
+
+CREATE TABLE IF NOT EXISTS Plane (
+    ID INT NOT NULL PRIMARY KEY,
+    Total_Capacity INT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS class (
+    ID INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    Plane_ID INT NOT NULL,
+    Type VARCHAR(20) NOT NULL,
+    Row_Num INT NOT NULL,
+    Column_Letter CHAR(1) NOT NULL,
+    Seat_Type VARCHAR(20) NOT NULL,
+    FOREIGN KEY (Plane_ID) REFERENCES Plane (ID)
+);
+
+CREATE TABLE IF NOT EXISTS Flight (
+    ID INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    Departure_DateTime DATETIME NOT NULL,
+    Arrival_DateTime DATETIME NOT NULL,
+    Path_Origin_Airport CHAR(3) NOT NULL,
+    Path_Dest_Airport CHAR(3) NOT NULL,
+    Business_Seat_Price DECIMAL(10, 2) NOT NULL,
+    Economy_Seat_Price DECIMAL(10, 2) NOT NULL,
+    Plane_ID INT NOT NULL,
+    FOREIGN KEY (Path_Origin_Airport, Path_Dest_Airport) REFERENCES path (Origin_Airport, Dest_Airport),
+    FOREIGN KEY (Plane_ID) REFERENCES Plane (ID)
+);
+
+CREATE TABLE IF NOT EXISTS `Order` (
+    Order_ID INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    Status VARCHAR(30) NOT NULL,
+    Order_Date DATETIME NOT NULL,
+    Total_Price DECIMAL(10, 2) NOT NULL,
+    Flight_ID INT NOT NULL,
+    Costumer_Mail VARCHAR(100) NULL,
+    Guest_Mail VARCHAR(100) NULL,
+    FOREIGN KEY (Flight_ID) REFERENCES Flight (ID),
+    FOREIGN KEY (Costumer_Mail) REFERENCES Costumer (Mail),
+    FOREIGN KEY (Guest_Mail) REFERENCES Guest (Mail)
+);
+
+CREATE TABLE IF NOT EXISTS Assigned (
+    Class_ID INT NOT NULL,
+    Order_ID INT NOT NULL,
+    Plane_ID INT NOT NULL,
+    PRIMARY KEY (Class_ID, Order_ID),
+    FOREIGN KEY (Class_ID) REFERENCES class (ID),
+    FOREIGN KEY (Order_ID) REFERENCES `Order` (Order_ID),
+    FOREIGN KEY (Plane_ID) REFERENCES Plane (ID)
+);
+
+-- Crew (from the brief: pilots and flight attendants staffed per flight).
+-- Long_Haul marks crew certified for long flights.
+CREATE TABLE IF NOT EXISTS Pilot (
+    ID INT NOT NULL PRIMARY KEY,
+    First_Name VARCHAR(50) NOT NULL,
+    Last_Name VARCHAR(50) NOT NULL,
+    Long_Haul TINYINT(1) NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS Flight_Attendant (
+    ID INT NOT NULL PRIMARY KEY,
+    First_Name VARCHAR(50) NOT NULL,
+    Last_Name VARCHAR(50) NOT NULL,
+    Long_Haul TINYINT(1) NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS Pilot_Flight (
+    Pilot_ID INT NOT NULL,
+    Flight_ID INT NOT NULL,
+    PRIMARY KEY (Pilot_ID, Flight_ID),
+    FOREIGN KEY (Pilot_ID) REFERENCES Pilot (ID),
+    FOREIGN KEY (Flight_ID) REFERENCES Flight (ID)
+);
+
+CREATE TABLE IF NOT EXISTS Attendant_Flight (
+    Attendant_ID INT NOT NULL,
+    Flight_ID INT NOT NULL,
+    PRIMARY KEY (Attendant_ID, Flight_ID),
+    FOREIGN KEY (Attendant_ID) REFERENCES Flight_Attendant (ID),
+    FOREIGN KEY (Flight_ID) REFERENCES Flight (ID)
+);
@@ -0,0 +1,152 @@
+"""
+Static asset fingerprinting and HTTP response compression / revalidation.
+
+- url_for('static', filename=...) gets a ?v=<content hash> parameter, and a
+  fingerprinted request is served with a year-long immutable Cache-Control,
+  so repeat visitors never re-download an unchanged stylesheet.
+- Precompressed variants written by compress_static.py (styles.css.br /
+  styles.css.gz) are served when the client accepts them.
+- Other responses (pages, JSON) are compressed on the fly, and full GET pages
+  get a weak ETag so a revisit is answered with 304 Not Modified.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+from flask import request, send_from_directory
+
+try:
+    import brotli  # optional dependency: br encoding on top of gzip
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("text/html", "text/css", "text/plain", "text/csv", "text/javascript", "application/json",
+                      "application/javascript", "image/svg+xml")
+
+# Extensions of precompressed variants, preferred in this order
+PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+
+class StaticAssets:
+    """
+    Content hashes of the files in the static folder, recomputed when a
+    file's mtime changes (so edits in development show up immediately).
+    """
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self._hashes: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+
+    def version(self, filename: str) -> Optional[str]:
+        path = os.path.join(self.folder, filename)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._hashes.get(filename)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        with self._lock:
+            self._hashes[filename] = (mtime, digest)
+        return digest
+
+    def precompressed(self, filename: str, accept_encoding: str) -> Tuple[str, Optional[str]]:
+        """
+        (file to send, its Content-Encoding): a .br / .gz variant if the client
+        accepts it and it is at least as new as the original, else the original.
+        """
+        source = os.path.join(self.folder, filename)
+        for encoding, suffix in PRECOMPRESSED:
+            if encoding not in accept_encoding:
+                continue
+            variant = source + suffix
+            try:
+                if os.path.getmtime(variant) >= os.path.getmtime(source):
+                    return filename + suffix, encoding
+            except OSError:
+                continue
+        return filename, None
+
+
+def _accepts(encoding: str) -> bool:
+    return encoding in request.headers.get("Accept-Encoding", "").lower()
+
+
+def compress_response(response, min_size: int = 500, level: int = 6):
+    """
+    Compress a buffered, compressible response with br (if installed) or gzip.
+    """
+    response.vary.add("Accept-Encoding")
+    if (response.direct_passthrough or response.is_streamed or "Content-Encoding" in response.headers
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+
+    body = response.get_data()
+    if len(body) < min_size:
+        return response
+    if brotli is not None and _accepts("br"):
+        # Low quality keeps on-the-fly br about as cheap as gzip -6
+        response.set_data(brotli.compress(body, quality=4))
+        response.headers["Content-Encoding"] = "br"
+    elif _accepts("gzip"):
+        response.set_data(gzip.compress(body, compresslevel=level))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def init_static_assets(app) -> StaticAssets:
+    """
+    Install fingerprinted static URLs, the static file view with cache headers
+    and precompressed variants, and the ETag / compression after_request hook.
+    STATIC_MAX_AGE, COMPRESS_MIN_SIZE and COMPRESS_LEVEL tune it.
+    """
+    assets = StaticAssets(app.static_folder)
+    max_age = int(os.getenv("STATIC_MAX_AGE", str(365 * 24 * 3600)))
+    min_size = int(os.getenv("COMPRESS_MIN_SIZE", "500"))
+    level = int(os.getenv("COMPRESS_LEVEL", "6"))
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == "static" and "filename" in values and "v" not in values:
+            version = assets.version(values["filename"])
+            if version:
+                values["v"] = version
+
+    def static(filename):
+        send_name, encoding = assets.precompressed(filename, request.headers.get("Accept-Encoding", "").lower())
+        response = send_from_directory(assets.folder, send_name,
+                                       mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream")
+        response.vary.add("Accept-Encoding")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        if request.args.get("v") and request.args.get("v") == assets.version(filename):
+            # The URL changes with the content, so this exact URL can be cached forever
+            response.headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
+        else:
+            response.headers["Cache-Control"] = "public, no-cache"
+        return response
+
+    app.view_functions["static"] = static
+
+    @app.after_request
+    def conditional_and_compress(response):
+        if request.endpoint == "static":
+            return response
+        if (request.method == "GET" and response.status_code == 200 and not response.is_streamed
+                and response.mimetype == "text/html"):
+            # Pages are per-user: let the browser keep them but revalidate every time.
+            # The ETag is taken on the uncompressed body, hence weak.
+            response.add_etag(weak=True)
+            response.headers.setdefault("Cache-Control", "private, no-cache")
+            response.make_conditional(request)
+        return compress_response(response, min_size=min_size, level=level)
+
+    return assets
@@ -1,31 +1,121 @@
-import mysql.connector
+import base64
+import contextvars
 from contextlib import contextmanager
+import logging
 import os
+import threading
+import time
 from typing import Optional, Tuple, List, Dict
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 load_dotenv()
 
+from db_pool import get_pool, get_pool_stats, get_replica_router
+from metrics import CounterMetric, GaugeMetric, Histogram, InstrumentedCursor, LATENCY_BUCKETS, register
+from cache import TTLCache
+import queries
+from queries import statement
+from seat_map_cache import SeatMapCache, FlightSeatSnapshot
+from seat_holds import SeatHoldStore
+from pricing import PricingCache, PricingError
+from notifications import queue_from_env
+from itineraries import RouteGraph
+from airports import AirportIndex
+from scheduling import AvailabilityIndex, FlightPlan, ResourceSchedule, validate_plans
+
+logger = logging.getLogger("flytau")
+
+# Search results keyed on (origin, destination, date, passengers).
+# Entries are tagged with their route/date so a booking or cancellation on any
+# flight of that route and day drops them (see invalidate_flight_search).
+search_cache = TTLCache(
+    max_size=int(os.getenv("SEARCH_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "30")),
+)
+
 
 @contextmanager
 def get_db_connection():
-    mydb = None
-    cursor = None
-    try:
-        mydb = mysql.connector.connect(
-            host=os.getenv("DB_HOST"),
-            user=os.getenv("DB_USER"),
-            password=os.getenv("DB_PASSWORD"),
-            database=os.getenv("DB_NAME"),
-            autocommit=True,
-        )
+    """
+    Yield a cursor on a pooled connection (autocommit on).
+    The connection goes back to the pool when the block exits.
+    """
+    with get_pool().connection() as mydb:
         cursor = mydb.cursor()
+        try:
+            yield InstrumentedCursor(cursor, mydb)
+        finally:
+            cursor.close()
+
+
+# Read routing for the current request (see get_db_read_connection):
+# [reads pinned to the primary, a transaction has run]
+_read_routing: contextvars.ContextVar = contextvars.ContextVar("flytau_read_routing", default=None)
+
+
+def begin_read_routing(pin_primary: bool = False) -> None:
+    """
+    Start a request's read routing; `pin_primary` sends all its reads to the
+    primary (the session wrote recently, see main.READ_YOUR_WRITES_SECONDS).
+    """
+    _read_routing.set([pin_primary, False])
+
+
+def wrote_in_request() -> bool:
+    """
+    Whether a transaction ran in this request, so its session should read
+    from the primary for a while.
+    """
+    routing = _read_routing.get()
+    return routing is not None and routing[1]
+
+
+@contextmanager
+def get_db_read_connection():
+    """
+    Yield a cursor for a read-only helper: on a replica that is up and within
+    DB_REPLICA_MAX_LAG of the primary, otherwise on the primary (no replica
+    configured, none usable, or this request/session has written).
+    Never use it for a read that must see the caller's own uncommitted or
+    just-committed writes outside a request; use get_db_connection.
+    """
+    routing = _read_routing.get()
+    router = get_replica_router() if routing is None or not routing[0] else None
+    if router is not None:
+        with router.connection() as mydb:
+            if mydb is not None:
+                cursor = mydb.cursor()
+                try:
+                    yield InstrumentedCursor(cursor, mydb)
+                finally:
+                    cursor.close()
+                return
+    with get_db_connection() as cursor:
         yield cursor
-    finally:
-        if cursor:
+
+
+@contextmanager
+def get_db_transaction(isolation_level: Optional[str] = None):
+    """
+    Yield a cursor on a pooled connection inside one transaction.
+    Commits when the block exits normally, rolls back if it raises.
+    `isolation_level` (e.g. "READ COMMITTED") overrides the server default for this transaction.
+    The rest of the request then reads from the primary (read-your-writes).
+    """
+    routing = _read_routing.get()
+    if routing is not None:
+        routing[0] = routing[1] = True
+    with get_pool().connection() as mydb:
+        mydb.start_transaction(isolation_level=isolation_level)
+        cursor = mydb.cursor()
+        try:
+            yield InstrumentedCursor(cursor, mydb)
+            mydb.commit()
+        except Exception:
+            mydb.rollback()
+            raise
+        finally:
             cursor.close()
-        if mydb:
-            mydb.close()
 
 
 def get_customer_by_email_and_password(email: str, password: str) -> Optional[Tuple[str, str, str]]:
@@ -116,102 +206,214 @@ def guest_sign_in(email: str) -> None:
         )
 
 
+SEARCH_FLIGHTS_SQL = """
+    SELECT 
+        f.ID, f.Departure_DateTime, f.Arrival_DateTime,
+        f.Path_Origin_Airport, f.Path_Dest_Airport,
+        f.Business_Seat_Price, f.Economy_Seat_Price, f.Plane_ID
+    FROM Flight f
+    JOIN Plane p ON f.Plane_ID = p.ID
+    LEFT JOIN Flight_Seat_Counts sc ON sc.Flight_ID = f.ID
+    WHERE f.Path_Origin_Airport = %s
+      AND f.Path_Dest_Airport = %s
+      AND f.Status = 'Active'
+      AND f.Departure_DateTime >= GREATEST(%s, NOW())
+      AND f.Departure_DateTime < %s
+      AND COALESCE(sc.Seats_Remaining, p.Total_Capacity) >= %s
+    ORDER BY f.Departure_DateTime ASC
+"""
+SEARCH_FLIGHTS = statement("search_flights", SEARCH_FLIGHTS_SQL)
+
+
+def _search_params(origin_airport: str, destination_airport: str, departure_date: str, passengers: int) -> Tuple:
+    # Half-open [day, day + 1) range instead of DATE(column) so the
+    # route/departure index can be range-scanned
+    day_start = datetime.strptime(departure_date, "%Y-%m-%d")
+    return origin_airport, destination_airport, day_start, day_start + timedelta(days=1), passengers
+
+
+def _flight_row_to_dict(row) -> Dict:
+    return {
+        "flight_id": row[0],
+        "departure_datetime": row[1].strftime("%Y-%m-%d %H:%M:%S") if row[1] else None,
+        "arrival_datetime": row[2].strftime("%Y-%m-%d %H:%M:%S") if row[2] else None,
+        "origin_airport": row[3],
+        "destination_airport": row[4],
+        "business_seat_price": row[5],
+        "economy_seat_price": row[6],
+        "plane_id": row[7],
+    }
+
+
+def cache_search_result(origin_airport: str, destination_airport: str, departure_date: str, passengers: int,
+                        flights: List[Dict], generation: int) -> None:
+    search_cache.set(
+        (origin_airport, destination_airport, departure_date, passengers),
+        tuple(flights),
+        tags=[_route_tag(origin_airport, destination_airport, departure_date)],
+        generation=generation,
+    )
+
+
 def search_flights(origin_airport: str, destination_airport: str, departure_date: str, passengers: int) -> List[Dict]:
     """
     Search for flights based on origin, destination, date, and required capacity.
-    Uses Class_ID for seat identification in the Assigned table as per the schema.
+    Remaining capacity comes from the maintained Flight_Seat_Counts row
+    (flights with no bookings yet have no row and use the plane's capacity).
+    Results are served from search_cache when possible.
     """
-    with get_db_connection() as cursor:
-        cursor.execute(
-            """
-            SELECT 
-                f.ID, f.Departure_DateTime, f.Arrival_DateTime,
-                f.Path_Origin_Airport, f.Path_Dest_Airport,
-                f.Business_Seat_Price, f.Economy_Seat_Price, f.Plane_ID
-            FROM Flight f
-            JOIN Plane p ON f.Plane_ID = p.ID
-            LEFT JOIN (
-                SELECT 
-                    o.Flight_ID,
-                    COUNT(a.Class_ID) AS booked_seats
-                FROM Assigned a
-                JOIN `Order` o ON a.Order_ID = o.Order_ID
-                WHERE o.Status = 'Active'
-                GROUP BY o.Flight_ID
-            ) seat_counts ON f.ID = seat_counts.Flight_ID
-            WHERE f.Path_Origin_Airport = %s
-              AND f.Path_Dest_Airport = %s
-              AND DATE(f.Departure_DateTime) = %s
-              AND (p.Total_Capacity - COALESCE(seat_counts.booked_seats, 0)) >= %s
-            ORDER BY f.Departure_DateTime ASC
-            """,
-            (origin_airport.upper(), destination_airport.upper(), departure_date, passengers),
-        )
+    origin_airport = origin_airport.upper()
+    destination_airport = destination_airport.upper()
+    cached = search_cache.get((origin_airport, destination_airport, departure_date, passengers))
+    if cached is not None:
+        return list(cached)
 
-        results = cursor.fetchall()
+    generation = search_cache.generation
+    with get_db_read_connection() as cursor:
+        rows = queries.fetchall(
+            cursor, SEARCH_FLIGHTS, _search_params(origin_airport, destination_airport, departure_date, passengers))
+        flights = [_flight_row_to_dict(row) for row in rows]
+
+    cache_search_result(origin_airport, destination_airport, departure_date, passengers, flights, generation)
+    return flights
 
-        flights = []
-        for row in results:
-            flights.append({
-                "flight_id": row[0],
-                "departure_datetime": row[1].strftime("%Y-%m-%d %H:%M:%S") if row[1] else None,
-                "arrival_datetime": row[2].strftime("%Y-%m-%d %H:%M:%S") if row[2] else None,
-                "origin_airport": row[3],
-                "destination_airport": row[4],
-                "business_seat_price": row[5],
-                "economy_seat_price": row[6],
-                "plane_id": row[7],
-            })
 
-        return flights
+FLEXIBLE_SEARCH_SQL = """
+    SELECT 
+        f.ID, f.Departure_DateTime, f.Arrival_DateTime,
+        f.Path_Origin_Airport, f.Path_Dest_Airport,
+        f.Business_Seat_Price, f.Economy_Seat_Price, f.Plane_ID
+    FROM Flight f
+    JOIN Plane p ON f.Plane_ID = p.ID
+    LEFT JOIN Flight_Seat_Counts sc ON sc.Flight_ID = f.ID
+    WHERE f.Path_Origin_Airport IN ({origins})
+      AND f.Path_Dest_Airport IN ({destinations})
+      AND f.Status = 'Active'
+      AND f.Departure_DateTime >= GREATEST(%s, NOW())
+      AND f.Departure_DateTime < %s
+      AND COALESCE(sc.Seats_Remaining, p.Total_Capacity) >= %s
+    ORDER BY f.Departure_DateTime ASC
+"""
+FLEXIBLE_SEARCH = statement("search_flights_flexible", FLEXIBLE_SEARCH_SQL)
+
+
+def search_flights_flexible(origin_airports: List[str], destination_airports: List[str], start_date: str,
+                            end_date: str, passengers: int) -> List[Dict]:
+    """
+    Search a date range (inclusive) and any of several origin/destination
+    airports in one query, grouped by departure day:
+        [{"date", "min_economy_price", "min_business_price", "flights": [...]}, ...]
+    Days without flights are left out. Results are cached like search_flights
+    and dropped when any route/day they cover changes.
+    """
+    origins = sorted({code.upper() for code in origin_airports})
+    destinations = sorted({code.upper() for code in destination_airports})
+    key = ("flexible", tuple(origins), tuple(destinations), start_date, end_date, passengers)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return list(cached)
+
+    range_start = datetime.strptime(start_date, "%Y-%m-%d")
+    range_end = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
+
+    generation = search_cache.generation
+    with get_db_read_connection() as cursor:
+        rows = queries.fetchall(
+            cursor, FLEXIBLE_SEARCH, (origins, destinations, range_start, range_end, passengers))
+        flights = [_flight_row_to_dict(row) for row in rows]
+
+    days = {}
+    for flight in flights:
+        day = days.setdefault(flight["departure_datetime"][:10], {
+            "date": flight["departure_datetime"][:10],
+            "min_economy_price": flight["economy_seat_price"],
+            "min_business_price": flight["business_seat_price"],
+            "flights": [],
+        })
+        day["min_economy_price"] = min(day["min_economy_price"], flight["economy_seat_price"])
+        day["min_business_price"] = min(day["min_business_price"], flight["business_seat_price"])
+        day["flights"].append(flight)
+    result = list(days.values())
+
+    tags = []
+    day = range_start
+    while day < range_end:
+        tags.extend(_route_tag(o, d, day.strftime("%Y-%m-%d")) for o in origins for d in destinations if o != d)
+        day += timedelta(days=1)
+    search_cache.set(key, tuple(result), tags=tags, generation=generation)
+    return result
+
+
+def _route_tag(origin_airport: str, destination_airport: str, departure_date: str) -> Tuple[str, str, str, str]:
+    return ("route", origin_airport.upper(), destination_airport.upper(), departure_date)
+
+
+def invalidate_flight_search(origin_airport: str, destination_airport: str, departure) -> None:
+    """
+    Drop cached searches for the route and day of a flight whose seat count changed.
+    Works on the whole route/day (not only results that contained the flight),
+    because a cancellation can make a flight appear in a search it was filtered out of.
+    """
+    departure_date = departure.strftime("%Y-%m-%d") if hasattr(departure, "strftime") else str(departure)[:10]
+    search_cache.invalidate_tag(_route_tag(origin_airport, destination_airport, departure_date))
+
+
+TICKET_DETAILS_SQL = """
+    SELECT 
+        o.Order_ID, f.Path_Origin_Airport, f.Path_Dest_Airport, f.Departure_DateTime,
+        GROUP_CONCAT(CONCAT(c.Row_Num, c.Column_Letter) SEPARATOR ', ') as Seats,
+        o.Status, o.Total_Price
+    FROM `Order` o
+    JOIN Flight f ON o.Flight_ID = f.ID
+    LEFT JOIN Assigned a ON o.Order_ID = a.Order_ID
+    LEFT JOIN CLASS c ON a.Class_ID = c.ID 
+    WHERE o.Order_ID = %s AND (o.Guest_Mail = %s OR o.Costumer_Mail = %s)
+    GROUP BY o.Order_ID
+"""
+TICKET_DETAILS = statement("ticket_details", TICKET_DETAILS_SQL)
+
+
+def _ticket_row_to_dict(row) -> Dict:
+    return {
+        "Ticket_ID": row[0],
+        "Origin": row[1],
+        "Destination": row[2],
+        "Departure_Time": row[3].strftime("%Y-%m-%d %H:%M") if row[3] else "TBD",
+        "Seat_ID": row[4] if row[4] else "Not Assigned",
+        "Status": row[5],
+        "Total_Price": row[6]
+    }
+
 
 def get_ticket_details(order_id: int, email: str):
     """
     Fetches ticket details without passenger identity fields (Passport/DOB)
     as per the requirement to keep the Order table structure original.
     """
-    with get_db_connection() as cursor:
-        query = """
-            SELECT 
-                o.Order_ID, f.Path_Origin_Airport, f.Path_Dest_Airport, f.Departure_DateTime,
-                GROUP_CONCAT(CONCAT(c.Row_Num, c.Column_Letter) SEPARATOR ', ') as Seats,
-                o.Status, o.Total_Price
-            FROM `Order` o
-            JOIN Flight f ON o.Flight_ID = f.ID
-            LEFT JOIN Assigned a ON o.Order_ID = a.Order_ID
-            LEFT JOIN CLASS c ON a.Class_ID = c.ID 
-            WHERE o.Order_ID = %s AND (o.Guest_Mail = %s OR o.Costumer_Mail = %s)
-            GROUP BY o.Order_ID
-        """
+    with get_db_read_connection() as cursor:
         try:
-            cursor.execute(query, (order_id, email, email))
-            row = cursor.fetchone()
+            row = queries.fetchone(cursor, TICKET_DETAILS, (order_id, email, email))
             if row:
-                return {
-                    "Ticket_ID": row[0],
-                    "Origin": row[1],
-                    "Destination": row[2],
-                    "Departure_Time": row[3].strftime("%Y-%m-%d %H:%M") if row[3] else "TBD",
-                    "Seat_ID": row[4] if row[4] else "Not Assigned",
-                    "Status": row[5],
-                    "Total_Price": row[6]
-                }
+                return _ticket_row_to_dict(row)
             return None
         except Exception as e:
-            print(f"Database Error: {e}")
+            logger.exception("Database Error: %s", e)
             return None
 
 def delete_ticket(order_id: int, email: str):
     """
     Handles cancellation logic using confirmed Departure_DateTime.
+    The status change, the seat release and the seat counters are one transaction.
     """
-    with get_db_connection() as cursor:
-        try:
+    try:
+        with get_db_transaction() as cursor:
             query = """
-                SELECT f.Departure_DateTime, o.Total_Price, o.Status
+                SELECT f.Departure_DateTime, o.Total_Price, o.Status,
+                       f.Path_Origin_Airport, f.Path_Dest_Airport, o.Flight_ID
                 FROM `Order` o
                 JOIN Flight f ON o.Flight_ID = f.ID
                 WHERE o.Order_ID = %s AND (o.Guest_Mail = %s OR o.Costumer_Mail = %s)
+                FOR UPDATE
             """
             cursor.execute(query, (order_id, email, email))
             result = cursor.fetchone()
@@ -219,7 +421,7 @@ def delete_ticket(order_id: int, email: str):
             if not result:
                 return False, "Order not found or access denied."
 
-            departure_time, current_price, status = result
+            departure_time, current_price, status, origin, destination, flight_id = result
 
             if status != 'Active':
                 return False, "This order is already cancelled."
@@ -237,58 +439,278 @@ def delete_ticket(order_id: int, email: str):
                 WHERE Order_ID = %s
             """, (penalty_fee, order_id))
 
-            # Free up the seats
+            # Free up the seats and give them back to the flight's counters
+            order_seats = _get_order_seats(cursor, order_id)
+            business_seats = sum(1 for _, class_type in order_seats if class_type.lower() == 'business')
             cursor.execute("DELETE FROM Assigned WHERE Order_ID = %s", (order_id,))
+            _apply_seat_count_delta(cursor, flight_id, -business_seats, business_seats - len(order_seats))
+            _record_order_event(cursor, flight_id, order_id, status, 'Costumer Cancelation',
+                                current_price, penalty_fee, -len(order_seats))
 
-            return True, f"Order successfully cancelled. A 5% fee (${penalty_fee:.2f}) was charged."
+    except Exception as e:
+        logger.exception("Database Error during cancellation: %s", e)
+        return False, "An internal error occurred."
+
+    invalidate_flight_search(origin, destination, departure_time)
+    seat_map_cache.mark_seats(flight_id, [seat_id for seat_id, _ in order_seats], occupied=False)
+    route_graph.adjust_seats(flight_id, len(order_seats))
+    _notify([("cancellation_receipt", email, {
+        "order_id": order_id, "origin": origin, "destination": destination,
+        "departure": departure_time.strftime("%d/%m/%Y %H:%M"), "fee": penalty_fee,
+    })])
+    return True, f"Order successfully cancelled. A 5% fee (${penalty_fee:.2f}) was charged."
+
+ORDER_STATUSES = ('Active', 'completed', 'Costumer Cancelation', 'system cancel')
+
+# Newest first. The keyset condition is spelled out (not a row comparison) so
+# MySQL range-scans idx_order_customer_history / idx_order_customer_status_history.
+PURCHASE_HISTORY_SQL = """
+    SELECT 
+        o.Order_ID, o.Order_Date, o.Status, o.Total_Price,
+        f.ID, f.Path_Origin_Airport, f.Path_Dest_Airport, f.Departure_DateTime
+    FROM `Order` o
+    JOIN Flight f ON o.Flight_ID = f.ID
+    WHERE o.Costumer_Mail = %s {status_filter} {keyset_filter}
+    ORDER BY o.Order_Date DESC, o.Order_ID DESC
+    LIMIT %s
+"""
+
+
+def encode_history_cursor(order: Dict) -> str:
+    """
+    Opaque page cursor pointing after `order` (a purchase history row).
+    """
+    raw = f"{order['order_date']}|{order['order_id']}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_history_cursor(cursor_token: str) -> Tuple[datetime, int]:
+    """
+    (Order_Date, Order_ID) from a page cursor. Raises ValueError if it is malformed.
+    """
+    # binascii.Error and UnicodeError are ValueErrors too
+    order_date, order_id = base64.urlsafe_b64decode(cursor_token.encode("ascii")).decode("utf-8").split("|")
+    return datetime.strptime(order_date, "%Y-%m-%d %H:%M:%S"), int(order_id)
+
+
+def _history_row_to_dict(row) -> Dict:
+    return {
+        "order_id": row[0],
+        "order_date": row[1].strftime("%Y-%m-%d %H:%M:%S"),
+        "status": row[2],
+        "total_price": float(row[3]),
+        "flight_id": row[4],
+        "origin_airport": row[5],
+        "destination_airport": row[6],
+        "departure_datetime": row[7].strftime("%Y-%m-%d %H:%M:%S") if row[7] else None,
+    }
+
+
+def iter_purchase_history(customer_mail: str, status: Optional[str] = None,
+                          after: Optional[Tuple[datetime, int]] = None, limit: int = 20):
+    """
+    Yield a customer's orders newest first, at most `limit` of them, starting
+    after the (Order_Date, Order_ID) key `after` (from decode_history_cursor).
+
+    Rows are read off the unbuffered cursor one at a time instead of fetchall,
+    so memory stays flat whatever the page size. The pooled connection is held
+    until the generator is exhausted or closed.
+    """
+    params = [customer_mail]
+    status_filter = keyset_filter = ""
+    if status:
+        status_filter = "AND o.Status = %s"
+        params.append(status)
+    if after:
+        keyset_filter = "AND (o.Order_Date < %s OR (o.Order_Date = %s AND o.Order_ID < %s))"
+        params.extend([after[0], after[0], after[1]])
+    params.append(limit)
+
+    with get_db_read_connection() as cursor:
+        cursor.execute(PURCHASE_HISTORY_SQL.format(status_filter=status_filter, keyset_filter=keyset_filter),
+                       tuple(params))
+        for row in cursor:
+            yield _history_row_to_dict(row)
+
+
+FLIGHT_PLANE_SQL = "SELECT Plane_ID FROM Flight WHERE ID = %s"
+
+PLANE_LAYOUT_SQL = """
+    SELECT ID, Row_Num, Column_Letter, Type
+    FROM class
+    WHERE Plane_ID = %s
+    ORDER BY Row_Num, Column_Letter
+"""
+
+# Seat IDs held by active orders on a flight (cancelled orders do not count)
+OCCUPIED_SEATS_SQL = """
+    SELECT a.Class_ID
+    FROM `Order` o
+    JOIN Assigned a ON a.Order_ID = o.Order_ID
+    WHERE o.Flight_ID = %s AND o.Status = 'Active'
+"""
+FLIGHT_PLANE = statement("flight_plane", FLIGHT_PLANE_SQL)
+PLANE_LAYOUT = statement("plane_layout", PLANE_LAYOUT_SQL)
+OCCUPIED_SEATS = statement("occupied_seats", OCCUPIED_SEATS_SQL)
+
+
+def _load_flight_plane_id(flight_id: int) -> Optional[int]:
+    with get_db_read_connection() as cursor:
+        row = queries.fetchone(cursor, FLIGHT_PLANE, (flight_id,))
+        return row[0] if row else None
+
+
+def _load_plane_layout(plane_id: int) -> List[Tuple[int, int, str, str]]:
+    with get_db_read_connection() as cursor:
+        return queries.fetchall(cursor, PLANE_LAYOUT, (plane_id,))
+
+
+def _load_occupied_seats(flight_id: int) -> List[int]:
+    with get_db_read_connection() as cursor:
+        return [row[0] for row in queries.fetchall(cursor, OCCUPIED_SEATS, (flight_id,))]
+
+
+seat_map_cache = SeatMapCache(
+    load_plane_id=_load_flight_plane_id,
+    load_layout=_load_plane_layout,
+    load_occupied=_load_occupied_seats,
+    max_flights=int(os.getenv("SEAT_MAP_CACHE_FLIGHTS", "2048")),
+    ttl=float(os.getenv("SEAT_MAP_CACHE_TTL", "30")),
+)
+
+# Outgoing emails; sent by notification_worker.py, never inside a request
+notification_queue = queue_from_env()
+
+
+def _notify(messages: List[Tuple[str, str, Dict]]) -> None:
+    """
+    Queue (kind, recipient, payload) emails. A queue failure is logged and
+    never fails the booking or cancellation that triggered it.
+    """
+    try:
+        notification_queue.enqueue_many(messages)
+    except Exception as e:
+        logger.exception("Notification Queue Error: %s", e)
+
+
+# Seats held by passengers between /booking_summary and /finalize_booking
+seat_holds = SeatHoldStore(ttl=float(os.getenv("SEAT_HOLD_SECONDS", "600")))
+
+
+def get_seat_map_snapshot(flight_id: int) -> Optional[FlightSeatSnapshot]:
+    """
+    Return the cached occupancy snapshot of a flight (None if the flight does not exist).
+    """
+    return seat_map_cache.get_snapshot(flight_id)
 
-        except Exception as e:
-            print(f"Database Error during cancellation: {e}")
-            return False, "An internal error occurred."
 
 def get_flight_seat_map(flight_id: int):
-    with get_db_connection() as cursor:
-        query = """
-            SELECT 
-                c.ID AS seat_id,
-                c.Row_Num,
-                c.Column_Letter,
-                c.Type AS class_type,
-                IF(EXISTS(
-                    SELECT 1 
-                    FROM flytau.assigned a
-                    JOIN flytau.`Order` o ON a.Order_ID = o.Order_ID 
-                    WHERE a.Class_ID = c.ID 
-                      AND o.Flight_ID = %s
-                ), 1, 0) AS is_occupied
-            FROM flytau.class c
-            JOIN flytau.Flight f ON f.Plane_ID = c.Plane_ID
-            WHERE f.ID = %s
-            ORDER BY c.Row_Num, c.Column_Letter
-        """
-        cursor.execute(query, (flight_id, flight_id))
-        results = cursor.fetchall()
+    """
+    Seats of the flight's plane in display order with their occupancy,
+    served from the in-memory seat map snapshot.
+    """
+    snapshot = get_seat_map_snapshot(flight_id)
+    return snapshot.to_seat_list() if snapshot else []
 
 
-        return [{
-            "seat_id": r[0],
-            "row_num": r[1],
-            "letter": r[2],
-            "class_type": r[3],
-            "is_occupied": bool(r[4])
-        } for r in results]
+def _load_itinerary_legs() -> List[Tuple]:
+    """
+    Upcoming flights (within ITINERARY_HORIZON_DAYS) with their remaining seats.
+    """
+    horizon_days = int(os.getenv("ITINERARY_HORIZON_DAYS", "60"))
+    with get_db_read_connection() as cursor:
+        cursor.execute(
+            """
+            SELECT f.ID, f.Path_Origin_Airport, f.Path_Dest_Airport, f.Departure_DateTime, f.Arrival_DateTime,
+                   f.Economy_Seat_Price, f.Business_Seat_Price,
+                   COALESCE(sc.Seats_Remaining, p.Total_Capacity)
+            FROM Flight f
+            JOIN Plane p ON f.Plane_ID = p.ID
+            LEFT JOIN Flight_Seat_Counts sc ON sc.Flight_ID = f.ID
+            WHERE f.Status = 'Active'
+              AND f.Departure_DateTime >= NOW()
+              AND f.Departure_DateTime < NOW() + INTERVAL %s DAY
+            """,
+            (horizon_days,),
+        )
+        return cursor.fetchall()
+
+
+def _load_paths() -> List[Tuple[str, str]]:
+    with get_db_read_connection() as cursor:
+        cursor.execute("SELECT Origin_Airport, Dest_Airport FROM path")
+        return cursor.fetchall()
+
+
+# Airports = codes in the path table, with routes per code for ranking
+AIRPORT_CODES_SQL = """
+    SELECT code, COUNT(*)
+    FROM (
+        SELECT Origin_Airport AS code FROM path
+        UNION ALL
+        SELECT Dest_Airport FROM path
+    ) codes
+    GROUP BY code
+"""
+
+
+def _load_airports() -> List[Tuple[str, Optional[str], Optional[str], int]]:
+    with get_db_read_connection() as cursor:
+        cursor.execute(AIRPORT_CODES_SQL)
+        routes = cursor.fetchall()
+        try:
+            cursor.execute("SELECT Code, City, Name FROM Airport")
+            names = {code: (city, name) for code, city, name in cursor.fetchall()}
+        except Exception as e:
+            # The Airport table is optional (sql/migrations/007_airports.sql)
+            logger.info("Airport names unavailable, indexing codes only: %s", e)
+            names = {}
+    return [(code, *names.get(code, (None, None)), count) for code, count in routes]
+
+
+# Search-form autocomplete and unknown-code check; reloaded by main (AIRPORTS_REFRESH_SECONDS)
+airport_index = AirportIndex(load_airports=_load_airports)
+
+
+route_graph = RouteGraph(
+    load_legs=_load_itinerary_legs,
+    load_paths=_load_paths,
+    refresh_interval=float(os.getenv("ITINERARY_REFRESH_SECONDS", "300")),
+)
+
+
+def search_itineraries(origin_airport: str, destination_airport: str, departure_date: str, passengers: int,
+                       max_stops: int = 2, min_layover_minutes: int = 45, max_layover_minutes: int = 360,
+                       sort_by: str = "duration") -> List[Dict]:
+    """
+    Direct and connecting (1-2 stop) itineraries from the in-memory route graph.
+    """
+    return route_graph.find_itineraries(
+        origin_airport,
+        destination_airport,
+        departure_date,
+        passengers=passengers,
+        max_stops=max_stops,
+        min_layover=timedelta(minutes=min_layover_minutes),
+        max_layover=timedelta(minutes=max_layover_minutes),
+        sort_by=sort_by,
+    )
+
+
+FLIGHT_BY_ID = statement("flight_by_id", """
+    SELECT ID, Departure_DateTime, Path_Origin_Airport, Path_Dest_Airport,
+           Business_Seat_Price, Economy_Seat_Price, Plane_ID
+    FROM Flight WHERE ID = %s AND Status = 'Active'
+""")
+
 
 def get_flight_by_id(flight_id: int) -> Optional[Dict]:
     """
     Fetches details for a single flight to be used in the booking summary.
+    Booking pages read it through pricing_cache.get_flight.
     """
-    with get_db_connection() as cursor:
-        cursor.execute("""
-            SELECT ID, Departure_DateTime, Path_Origin_Airport, Path_Dest_Airport, 
-                   Business_Seat_Price, Economy_Seat_Price 
-            FROM Flight WHERE ID = %s
-        """, (flight_id,))
-        row = cursor.fetchone()
+    with get_db_read_connection() as cursor:
+        row = queries.fetchone(cursor, FLIGHT_BY_ID, (flight_id,))
         if row:
             return {
                 "flight_id": row[0],
@@ -296,32 +718,1236 @@ def get_flight_by_id(flight_id: int) -> Optional[Dict]:
                 "origin": row[2],
                 "destination": row[3],
                 "business_price": row[4],
-                "economy_price": row[5]
+                "economy_price": row[5],
+                "plane_id": row[6]
             }
         return None
 
 
+PLANE_SEAT_CLASSES = statement(
+    "plane_seat_classes", "SELECT ID, Type, Row_Num, Column_Letter, Seat_Type FROM class WHERE Plane_ID = %s")
+
+
+def _load_plane_seat_classes(plane_id: int) -> List[Tuple[int, str, int, str, str]]:
+    with get_db_read_connection() as cursor:
+        return queries.fetchall(cursor, PLANE_SEAT_CLASSES, (plane_id,))
+
+
+# Seat classes per plane (kept for good) and flight fares (PRICING_FLIGHT_TTL),
+# so booking pages price seats without a query
+pricing_cache = PricingCache(
+    load_plane_seats=_load_plane_seat_classes,
+    load_flight=get_flight_by_id,
+    max_flights=int(os.getenv("PRICING_CACHE_FLIGHTS", "4096")),
+    flight_ttl=float(os.getenv("PRICING_FLIGHT_TTL", "60")),
+)
+
+
+class SeatTakenError(Exception):
+    """
+    Raised by create_order_with_seats when some of the chosen seats were booked
+    by another order first. `seats` holds their labels (e.g. ["12A", "12B"]).
+    """
+
+    def __init__(self, seats: List[str]):
+        self.seats = seats
+        super().__init__(f"Seat(s) already taken: {', '.join(seats)}")
+
+
+# Booking statements; the seat lists are bucketed IN-lists (see queries.py)
+BOOKING_FLIGHT = statement("booking_flight", """
+    SELECT Plane_ID, Path_Origin_Airport, Path_Dest_Airport, Departure_DateTime, Status,
+           Departure_DateTime > NOW()
+    FROM Flight WHERE ID = %s
+    LOCK IN SHARE MODE
+""")
+BOOKING_LOCK_SEATS = statement("booking_lock_seats", """
+    SELECT ID, Type, CONCAT(Row_Num, Column_Letter)
+    FROM class
+    WHERE Plane_ID = %s AND ID IN ({seats})
+    ORDER BY ID
+    FOR UPDATE
+""")
+BOOKING_TAKEN_SEATS = statement("booking_taken_seats", """
+    SELECT a.Class_ID
+    FROM Assigned a
+    JOIN `Order` o ON a.Order_ID = o.Order_ID
+    WHERE o.Flight_ID = %s AND o.Status = 'Active' AND a.Class_ID IN ({seats})
+    LOCK IN SHARE MODE
+""")
+BOOKING_INSERT_ORDER = statement("booking_insert_order", """
+    INSERT INTO `Order` (Status, Order_Date, Total_Price, Flight_ID, Costumer_Mail, Guest_Mail)
+    VALUES ('Active', NOW(), %s, %s, %s, %s)
+""")
+
+
 def create_order_with_seats(flight_id: int, selected_seats: list, total_price: float,
                             customer_mail: str = None, guest_mail: str = None) -> int:
     """
     Creates a new order record.
     Note: Passport and DOB are NOT saved here anymore to comply with table constraints.
+
+    Everything runs in one transaction:
+    - the chosen seat rows are locked (in ID order, so concurrent buyers cannot deadlock),
+    - seats already held by an active order on this flight raise SeatTakenError; the check is
+      a locking read at READ COMMITTED, so a buyer who waited on the seat locks sees the
+      Assigned rows the previous holder committed (Assigned has no per-flight unique key),
+    - the order, all Assigned rows (one multi-row insert) and the seat counters are written.
+    Nothing is left behind if any step fails.
     """
-    with get_db_connection() as cursor:
-        cursor.execute("SELECT Plane_ID FROM Flight WHERE ID = %s", (flight_id,))
-        plane_result = cursor.fetchone()
+    seat_ids = sorted({int(seat_id) for seat_id in selected_seats})
+    if not seat_ids or len(seat_ids) != len(selected_seats):
+        raise ValueError("Each seat can only be selected once.")
+
+    with get_db_transaction(isolation_level="READ COMMITTED") as cursor:
+        # Shared lock: bookings do not block each other, but a bulk cancellation
+        # of this flight waits for them (and they wait for it)
+        plane_result = queries.fetchone(cursor, BOOKING_FLIGHT, (flight_id,))
         if not plane_result: raise Exception(f"Flight ID {flight_id} not found.")
-        plane_id = plane_result[0]
+        plane_id, origin, destination, departure_time, flight_status, upcoming = plane_result
+        if flight_status != 'Active': raise Exception(f"Flight ID {flight_id} is cancelled.")
+        # The order lifecycle job only completes orders of flights it has not passed yet
+        if not upcoming: raise Exception(f"Flight ID {flight_id} has already departed.")
+
+        # Lock the chosen seats; buyers of other seats on the flight are not blocked
+        seat_rows = queries.fetchall(cursor, BOOKING_LOCK_SEATS, (plane_id, seat_ids))
+        if len(seat_rows) != len(seat_ids):
+            raise ValueError(f"Some selected seats do not belong to flight {flight_id}.")
+        seat_labels = {row[0]: row[2] for row in seat_rows}
+
+        taken = [seat_labels[row[0]] for row in queries.fetchall(cursor, BOOKING_TAKEN_SEATS, (flight_id, seat_ids))]
+        if taken:
+            raise SeatTakenError(sorted(taken))
 
         # SQL query back to original 6-column structure
-        order_sql = """
-            INSERT INTO `Order` (Status, Order_Date, Total_Price, Flight_ID, Costumer_Mail, Guest_Mail)
-            VALUES ('Active', NOW(), %s, %s, %s, %s)
-        """
-        cursor.execute(order_sql, (total_price, flight_id, customer_mail, guest_mail))
-        new_order_id = cursor.lastrowid
+        new_order_id = queries.execute(
+            cursor, BOOKING_INSERT_ORDER, (total_price, flight_id, customer_mail, guest_mail)).lastrowid
 
+        # executemany on a plain INSERT ... VALUES is sent as a single multi-row insert
         assigned_sql = "INSERT INTO Assigned (Class_ID, Order_ID, Plane_ID) VALUES (%s, %s, %s)"
-        for seat_id in selected_seats:
-            cursor.execute(assigned_sql, (seat_id, new_order_id, plane_id))
-        return new_order_id
\ No newline at end of file
+        cursor.executemany(assigned_sql, [(seat_id, new_order_id, plane_id) for seat_id in seat_ids])
+
+        business_seats = sum(1 for row in seat_rows if row[1].lower() == 'business')
+        _apply_seat_count_delta(cursor, flight_id, business_seats, len(seat_rows) - business_seats)
+        _record_order_event(cursor, flight_id, new_order_id, None, 'Active', 0, total_price, len(seat_ids))
+
+    invalidate_flight_search(origin, destination, departure_time)
+    seat_map_cache.mark_seats(flight_id, seat_ids, occupied=True)
+    route_graph.adjust_seats(flight_id, -len(seat_ids))
+    _notify([("booking_confirmation", customer_mail or guest_mail, {
+        "order_id": new_order_id, "origin": origin, "destination": destination,
+        "departure": departure_time.strftime("%d/%m/%Y %H:%M"),
+        "seats": ", ".join(seat_labels[seat_id] for seat_id in seat_ids), "total_price": float(total_price),
+    })])
+    return new_order_id
+
+
+def _get_order_seats(cursor, order_id: int) -> List[Tuple[int, str]]:
+    """
+    Return (seat_id, class_type) for every seat currently assigned to an order.
+    """
+    cursor.execute(
+        """
+        SELECT a.Class_ID, c.Type
+        FROM Assigned a
+        JOIN class c ON a.Class_ID = c.ID
+        WHERE a.Order_ID = %s
+        """,
+        (order_id,),
+    )
+    return cursor.fetchall()
+
+
+SEAT_COUNTS_ENSURE_ROW = statement("seat_counts_ensure_row", """
+    INSERT IGNORE INTO Flight_Seat_Counts (Flight_ID, Business_Booked, Economy_Booked, Seats_Remaining)
+    SELECT f.ID, 0, 0, p.Total_Capacity
+    FROM Flight f
+    JOIN Plane p ON f.Plane_ID = p.ID
+    WHERE f.ID = %s
+""")
+SEAT_COUNTS_ADD = statement("seat_counts_add", """
+    UPDATE Flight_Seat_Counts
+    SET Business_Booked = Business_Booked + %s,
+        Economy_Booked = Economy_Booked + %s,
+        Seats_Remaining = Seats_Remaining - %s
+    WHERE Flight_ID = %s
+""")
+
+
+def _apply_seat_count_delta(cursor, flight_id: int, business_delta: int, economy_delta: int) -> None:
+    """
+    Add booked seats (negative to release) to a flight's Flight_Seat_Counts row.
+    Must run on the caller's transaction cursor so the counters commit with the order.
+
+    Assumes the table from sql/migrations/001_flight_seat_counts.sql:
+        Flight_Seat_Counts(Flight_ID PK, Business_Booked, Economy_Booked, Seats_Remaining)
+    """
+    # Flights created after the backfill get their row on first booking
+    queries.execute(cursor, SEAT_COUNTS_ENSURE_ROW, (flight_id,))
+    queries.execute(cursor, SEAT_COUNTS_ADD,
+                    (business_delta, economy_delta, business_delta + economy_delta, flight_id))
+
+
+def get_flight_availability(flight_id: int) -> Optional[Dict]:
+    """
+    Read a flight's maintained seat counters (no scan of Assigned/Order).
+    """
+    with get_db_connection() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                COALESCE(sc.Business_Booked, 0),
+                COALESCE(sc.Economy_Booked, 0),
+                COALESCE(sc.Seats_Remaining, p.Total_Capacity)
+            FROM Flight f
+            JOIN Plane p ON f.Plane_ID = p.ID
+            LEFT JOIN Flight_Seat_Counts sc ON sc.Flight_ID = f.ID
+            WHERE f.ID = %s
+            """,
+            (flight_id,),
+        )
+        row = cursor.fetchone()
+        if row:
+            return {
+                "business_booked": int(row[0]),
+                "economy_booked": int(row[1]),
+                "seats_remaining": int(row[2]),
+            }
+        return None
+
+
+def reconcile_seat_counts(flight_id: Optional[int] = None, batch_size: int = 500) -> int:
+    """
+    Rebuild Flight_Seat_Counts from Assigned/Order to correct any drift.
+
+    Works through Flight in ID order, one short transaction per batch, so it
+    never holds locks on the whole booking history at once.
+    Returns the number of flights processed.
+    """
+    rebuild_sql = """
+        INSERT INTO Flight_Seat_Counts (Flight_ID, Business_Booked, Economy_Booked, Seats_Remaining)
+        SELECT
+            f.ID,
+            COALESCE(SUM(LOWER(c.Type) = 'business'), 0),
+            COALESCE(SUM(LOWER(c.Type) <> 'business'), 0),
+            p.Total_Capacity - COUNT(c.ID)
+        FROM Flight f
+        JOIN Plane p ON f.Plane_ID = p.ID
+        LEFT JOIN `Order` o ON o.Flight_ID = f.ID AND o.Status = 'Active'
+        LEFT JOIN Assigned a ON a.Order_ID = o.Order_ID
+        LEFT JOIN class c ON a.Class_ID = c.ID
+        WHERE f.ID IN ({ids})
+        GROUP BY f.ID, p.Total_Capacity
+        ON DUPLICATE KEY UPDATE
+            Business_Booked = VALUES(Business_Booked),
+            Economy_Booked = VALUES(Economy_Booked),
+            Seats_Remaining = VALUES(Seats_Remaining)
+    """
+
+    if flight_id is not None:
+        with get_db_transaction() as cursor:
+            cursor.execute(rebuild_sql.format(ids="%s"), (flight_id,))
+        return 1
+
+    processed = 0
+    last_id = 0
+    while True:
+        with get_db_connection() as cursor:
+            cursor.execute("SELECT ID FROM Flight WHERE ID > %s ORDER BY ID LIMIT %s", (last_id, batch_size))
+            flight_ids = [row[0] for row in cursor.fetchall()]
+        if not flight_ids:
+            return processed
+
+        with get_db_transaction() as cursor:
+            cursor.execute(rebuild_sql.format(ids=",".join(["%s"] * len(flight_ids))), tuple(flight_ids))
+        processed += len(flight_ids)
+        last_id = flight_ids[-1]
+
+
+RECORD_ORDER_EVENT = statement("record_order_event", """
+    INSERT INTO Report_Event (Order_ID, Flight_ID, Old_Status, New_Status, Old_Price, New_Price, Seats_Delta)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+""")
+
+
+def _record_order_event(cursor, flight_id: int, order_id: Optional[int], old_status: Optional[str],
+                        new_status: Optional[str], old_price, new_price, seats_delta: int) -> None:
+    """
+    Append an order change to Report_Event for the report aggregator.
+    Must run on the caller's transaction cursor so the event commits with the order.
+    It is a plain append: no summary row is touched on the booking path.
+
+    Assumes the tables from sql/migrations/003_report_summaries.sql.
+    """
+    queries.execute(cursor, RECORD_ORDER_EVENT,
+                    (order_id, flight_id, old_status, new_status, old_price, new_price, seats_delta))
+
+
+def apply_report_events(batch_size: int = 1000) -> int:
+    """
+    Fold pending Report_Event rows into the report summary tables and delete them.
+
+    Each batch is one transaction. The events are locked FOR UPDATE, so two
+    aggregators (e.g. two worker processes) never apply the same event; READ
+    COMMITTED keeps the lock off the gap after the last event, so bookings can
+    keep appending while a batch is applied.
+    Returns the number of events applied.
+    """
+    applied = 0
+    while True:
+        with get_db_transaction(isolation_level="READ COMMITTED") as cursor:
+            cursor.execute(
+                """
+                SELECT Event_ID, Flight_ID, Old_Status, New_Status, Old_Price, New_Price, Seats_Delta
+                FROM Report_Event
+                ORDER BY Event_ID
+                LIMIT %s
+                FOR UPDATE
+                """,
+                (batch_size,),
+            )
+            events = cursor.fetchall()
+            if not events:
+                return applied
+
+            flight_deltas = {}  # flight_id -> [orders, seats, revenue]
+            status_deltas = {}  # status -> [orders, revenue]
+            for _, flight_id, old_status, new_status, old_price, new_price, seats_delta in events:
+                delta = flight_deltas.setdefault(flight_id, [0, 0, 0])
+                if old_status is None and new_status is not None:
+                    delta[0] += 1
+                delta[1] += seats_delta
+                delta[2] += new_price - old_price
+                if old_status is not None:
+                    status_delta = status_deltas.setdefault(old_status, [0, 0])
+                    status_delta[0] -= 1
+                    status_delta[1] -= old_price
+                if new_status is not None:
+                    status_delta = status_deltas.setdefault(new_status, [0, 0])
+                    status_delta[0] += 1
+                    status_delta[1] += new_price
+
+            _apply_report_flight_deltas(cursor, flight_deltas)
+            cursor.executemany(
+                """
+                INSERT INTO Report_Order_Status (Status, Orders, Revenue) VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE Orders = Orders + VALUES(Orders), Revenue = Revenue + VALUES(Revenue)
+                """,
+                [(status, orders, revenue) for status, (orders, revenue) in sorted(status_deltas.items())],
+            )
+
+            event_ids = [event[0] for event in events]
+            cursor.execute(
+                f"DELETE FROM Report_Event WHERE Event_ID IN ({','.join(['%s'] * len(event_ids))})",
+                tuple(event_ids),
+            )
+        applied += len(events)
+        if len(events) < batch_size:
+            return applied
+
+
+def _apply_report_flight_deltas(cursor, flight_deltas: Dict[int, List]) -> None:
+    """
+    Add per-flight deltas to the flight, route and plane summaries.
+    A flight seen for the first time gets its summary row here, and is counted
+    once in its route's and plane's Flights / Seats_Offered.
+    """
+    flight_ids = sorted(flight_deltas)
+    id_params = ",".join(["%s"] * len(flight_ids))
+    cursor.execute(f"SELECT Flight_ID FROM Report_Flight_Stats WHERE Flight_ID IN ({id_params})", tuple(flight_ids))
+    known = {row[0] for row in cursor.fetchall()}
+    new_ids = [flight_id for flight_id in flight_ids if flight_id not in known]
+    if new_ids:
+        cursor.execute(
+            f"""
+            INSERT INTO Report_Flight_Stats (Flight_ID, Origin_Airport, Dest_Airport, Departure_DateTime, Plane_ID, Capacity)
+            SELECT f.ID, f.Path_Origin_Airport, f.Path_Dest_Airport, f.Departure_DateTime, f.Plane_ID, p.Total_Capacity
+            FROM Flight f
+            JOIN Plane p ON f.Plane_ID = p.ID
+            WHERE f.ID IN ({','.join(['%s'] * len(new_ids))})
+            """,
+            tuple(new_ids),
+        )
+
+    cursor.execute(
+        f"""
+        SELECT Flight_ID, Origin_Airport, Dest_Airport, Plane_ID, Capacity
+        FROM Report_Flight_Stats
+        WHERE Flight_ID IN ({id_params})
+        """,
+        tuple(flight_ids),
+    )
+    route_deltas, plane_deltas = {}, {}  # [flights, seats_offered, orders, seats_sold, revenue]
+    flight_updates = []
+    for flight_id, origin, dest, plane_id, capacity in cursor.fetchall():
+        orders, seats, revenue = flight_deltas[flight_id]
+        added = 1 if flight_id in new_ids else 0
+        flight_updates.append((orders, seats, revenue, flight_id))
+        for totals in (route_deltas.setdefault((origin, dest), [0, 0, 0, 0, 0]),
+                       plane_deltas.setdefault(plane_id, [0, 0, 0, 0, 0])):
+            totals[0] += added
+            totals[1] += added * capacity
+            totals[2] += orders
+            totals[3] += seats
+            totals[4] += revenue
+
+    # Rows are updated in key order so concurrent batches cannot deadlock
+    cursor.executemany(
+        """
+        UPDATE Report_Flight_Stats
+        SET Orders = Orders + %s, Seats_Sold = Seats_Sold + %s, Revenue = Revenue + %s
+        WHERE Flight_ID = %s
+        """,
+        flight_updates,
+    )
+    cursor.executemany(
+        """
+        INSERT INTO Report_Route_Stats (Origin_Airport, Dest_Airport, Flights, Seats_Offered, Orders, Seats_Sold, Revenue)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            Flights = Flights + VALUES(Flights),
+            Seats_Offered = Seats_Offered + VALUES(Seats_Offered),
+            Orders = Orders + VALUES(Orders),
+            Seats_Sold = Seats_Sold + VALUES(Seats_Sold),
+            Revenue = Revenue + VALUES(Revenue)
+        """,
+        [(*route, *totals) for route, totals in sorted(route_deltas.items())],
+    )
+    cursor.executemany(
+        """
+        INSERT INTO Report_Plane_Stats (Plane_ID, Flights, Seats_Offered, Seats_Sold, Revenue)
+        VALUES (%s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            Flights = Flights + VALUES(Flights),
+            Seats_Offered = Seats_Offered + VALUES(Seats_Offered),
+            Seats_Sold = Seats_Sold + VALUES(Seats_Sold),
+            Revenue = Revenue + VALUES(Revenue)
+        """,
+        [(plane_id, flights, offered, sold, revenue)
+         for plane_id, (flights, offered, _, sold, revenue) in sorted(plane_deltas.items())],
+    )
+
+
+REFRESH_CREW_STATS_SQL = [
+    "DELETE FROM Report_Crew_Stats",
+    """
+    INSERT INTO Report_Crew_Stats (Crew_Type, Crew_ID, Flights, Flight_Minutes)
+    SELECT 'Pilot', c.ID, COUNT(f.ID), COALESCE(SUM(TIMESTAMPDIFF(MINUTE, f.Departure_DateTime, f.Arrival_DateTime)), 0)
+    FROM Pilot c
+    LEFT JOIN Pilot_Flight cf ON cf.Pilot_ID = c.ID
+    LEFT JOIN Flight f ON f.ID = cf.Flight_ID
+    GROUP BY c.ID
+    UNION ALL
+    SELECT 'Attendant', c.ID, COUNT(f.ID), COALESCE(SUM(TIMESTAMPDIFF(MINUTE, f.Departure_DateTime, f.Arrival_DateTime)), 0)
+    FROM Flight_Attendant c
+    LEFT JOIN Attendant_Flight cf ON cf.Attendant_ID = c.ID
+    LEFT JOIN Flight f ON f.ID = cf.Flight_ID
+    GROUP BY c.ID
+    """,
+]
+
+# Same statements as the backfill in sql/migrations/003_report_summaries.sql
+REBUILD_REPORTS_SQL = [
+    "DELETE FROM Report_Flight_Stats",
+    "DELETE FROM Report_Route_Stats",
+    "DELETE FROM Report_Plane_Stats",
+    "DELETE FROM Report_Order_Status",
+    """
+    INSERT INTO Report_Flight_Stats
+        (Flight_ID, Origin_Airport, Dest_Airport, Departure_DateTime, Plane_ID, Capacity, Orders, Seats_Sold, Revenue)
+    SELECT
+        f.ID, f.Path_Origin_Airport, f.Path_Dest_Airport, f.Departure_DateTime, f.Plane_ID, p.Total_Capacity,
+        COALESCE(o.Orders, 0), COALESCE(s.Seats_Sold, 0), COALESCE(o.Revenue, 0)
+    FROM Flight f
+    JOIN Plane p ON f.Plane_ID = p.ID
+    LEFT JOIN (
+        SELECT Flight_ID, COUNT(*) AS Orders, SUM(Total_Price) AS Revenue
+        FROM `Order`
+        GROUP BY Flight_ID
+    ) o ON o.Flight_ID = f.ID
+    LEFT JOIN (
+        SELECT o.Flight_ID, COUNT(*) AS Seats_Sold
+        FROM `Order` o
+        JOIN Assigned a ON a.Order_ID = o.Order_ID
+        GROUP BY o.Flight_ID
+    ) s ON s.Flight_ID = f.ID
+    """,
+    """
+    INSERT INTO Report_Route_Stats (Origin_Airport, Dest_Airport, Flights, Seats_Offered, Orders, Seats_Sold, Revenue)
+    SELECT Origin_Airport, Dest_Airport, COUNT(*), SUM(Capacity), SUM(Orders), SUM(Seats_Sold), SUM(Revenue)
+    FROM Report_Flight_Stats
+    GROUP BY Origin_Airport, Dest_Airport
+    """,
+    """
+    INSERT INTO Report_Plane_Stats (Plane_ID, Flights, Seats_Offered, Seats_Sold, Revenue)
+    SELECT Plane_ID, COUNT(*), SUM(Capacity), SUM(Seats_Sold), SUM(Revenue)
+    FROM Report_Flight_Stats
+    GROUP BY Plane_ID
+    """,
+    """
+    INSERT INTO Report_Order_Status (Status, Orders, Revenue)
+    SELECT Status, COUNT(*), SUM(Total_Price)
+    FROM `Order`
+    GROUP BY Status
+    """,
+] + REFRESH_CREW_STATS_SQL
+
+
+def rebuild_reports() -> None:
+    """
+    Recompute every report summary table from Flight/Order/Assigned and the crew tables.
+
+    Meant to run offline or in a quiet period (it reads the whole booking
+    history in one transaction). Pending events are dropped in the same
+    transaction, since the rebuilt rows already include them.
+    """
+    with get_db_transaction() as cursor:
+        cursor.execute("SELECT COALESCE(MAX(Event_ID), 0) FROM Report_Event")
+        last_event_id = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM Report_Event WHERE Event_ID <= %s", (last_event_id,))
+        for statement in REBUILD_REPORTS_SQL:
+            cursor.execute(statement)
+
+
+def refresh_crew_stats() -> None:
+    """
+    Recompute Report_Crew_Stats. Crew tables are small and change only through
+    manager actions, so this is a full refresh rather than an event stream;
+    call it after crew assignments change.
+    """
+    with get_db_transaction() as cursor:
+        for statement in REFRESH_CREW_STATS_SQL:
+            cursor.execute(statement)
+
+
+# name -> title, CSV/table columns, SELECT over the summary table, key columns
+# (the first columns of the SELECT, used to page through it) and display order.
+REPORTS = {
+    "routes": {
+        "title": "Revenue per Route",
+        "columns": ["Origin", "Destination", "Flights", "Seats Offered", "Orders", "Seats Sold", "Load Factor",
+                    "Revenue"],
+        "sql": """
+            SELECT Origin_Airport, Dest_Airport, Flights, Seats_Offered, Orders, Seats_Sold,
+                   ROUND(Seats_Sold / NULLIF(Seats_Offered, 0), 4), Revenue
+            FROM Report_Route_Stats
+        """,
+        "key": ["Origin_Airport", "Dest_Airport"],
+        "order": "Revenue DESC",
+    },
+    "flights": {
+        "title": "Revenue per Flight",
+        "columns": ["Flight ID", "Origin", "Destination", "Departure", "Plane ID", "Capacity", "Orders",
+                    "Seats Sold", "Load Factor", "Revenue"],
+        "sql": """
+            SELECT Flight_ID, Origin_Airport, Dest_Airport, Departure_DateTime, Plane_ID, Capacity, Orders,
+                   Seats_Sold, ROUND(Seats_Sold / NULLIF(Capacity, 0), 4), Revenue
+            FROM Report_Flight_Stats
+        """,
+        "key": ["Flight_ID"],
+        "order": "Revenue DESC",
+    },
+    "planes": {
+        "title": "Load Factor per Aircraft",
+        "columns": ["Plane ID", "Flights", "Seats Offered", "Seats Sold", "Load Factor", "Revenue"],
+        "sql": """
+            SELECT Plane_ID, Flights, Seats_Offered, Seats_Sold,
+                   ROUND(Seats_Sold / NULLIF(Seats_Offered, 0), 4), Revenue
+            FROM Report_Plane_Stats
+        """,
+        "key": ["Plane_ID"],
+        "order": "Plane_ID",
+    },
+    "order_status": {
+        "title": "Orders by Status",
+        "columns": ["Status", "Orders", "Share", "Revenue"],
+        "sql": """
+            SELECT Status, Orders, ROUND(Orders / NULLIF((SELECT SUM(Orders) FROM Report_Order_Status), 0), 4),
+                   Revenue
+            FROM Report_Order_Status
+        """,
+        "key": ["Status"],
+        "order": "Orders DESC",
+    },
+    "crew": {
+        "title": "Crew Utilisation",
+        "columns": ["Crew Type", "Crew ID", "Flights", "Flight Hours"],
+        "sql": """
+            SELECT Crew_Type, Crew_ID, Flights, ROUND(Flight_Minutes / 60, 1)
+            FROM Report_Crew_Stats
+        """,
+        "key": ["Crew_Type", "Crew_ID"],
+        "order": "Flight_Minutes DESC",
+    },
+}
+
+
+def get_report(name: str, limit: Optional[int] = None) -> List[Tuple]:
+    """
+    Rows of a precomputed report in display order (no scan of the booking tables).
+    """
+    report = REPORTS[name]
+    sql = f"{report['sql']} ORDER BY {report['order']}"
+    params = ()
+    if limit is not None:
+        sql += " LIMIT %s"
+        params = (limit,)
+    with get_db_read_connection() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def get_report_backlog() -> Tuple[int, Optional[datetime]]:
+    """
+    (pending Report_Event rows, time of the oldest one): the reports include
+    every change made before that time.
+    """
+    with get_db_read_connection() as cursor:
+        cursor.execute("SELECT COUNT(*), MIN(Created_At) FROM Report_Event")
+        return cursor.fetchone()
+
+
+def iter_report_chunks(name: str, chunk_size: int = 1000):
+    """
+    Yield a report's rows in key order, `chunk_size` rows at a time.
+    Each chunk is a separate keyset query ("key > last key seen"), so a long
+    export holds a pooled connection only while a chunk is read.
+    """
+    report = REPORTS[name]
+    key = report["key"]
+    order = ", ".join(key)
+    last_key = None
+    while True:
+        with get_db_read_connection() as cursor:
+            if last_key is None:
+                cursor.execute(f"{report['sql']} ORDER BY {order} LIMIT %s", (chunk_size,))
+            else:
+                cursor.execute(
+                    f"{report['sql']} WHERE ({order}) > ({','.join(['%s'] * len(key))}) ORDER BY {order} LIMIT %s",
+                    (*last_key, chunk_size),
+                )
+            rows = cursor.fetchall()
+        if rows:
+            yield rows
+        if len(rows) < chunk_size:
+            return
+        last_key = rows[-1][:len(key)]
+
+
+def start_report_aggregator(interval: float) -> None:
+    """
+    Apply pending report events every `interval` seconds in a daemon thread.
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                apply_report_events()
+            except Exception as e:
+                logger.exception("Report Aggregator Error: %s", e)
+
+    threading.Thread(target=run, name="report-aggregator", daemon=True).start()
+
+
+# Flight scheduling rules (see scheduling.validate_plans)
+SCHEDULE_TURNAROUND = timedelta(minutes=int(os.getenv("SCHEDULE_TURNAROUND_MINUTES", "60")))
+SCHEDULE_CREW_REST = timedelta(hours=float(os.getenv("SCHEDULE_CREW_REST_HOURS", "10")))
+LONG_HAUL_MINUTES = int(os.getenv("LONG_HAUL_MINUTES", "360"))
+FLIGHT_CANCEL_MIN_HOURS = int(os.getenv("FLIGHT_CANCEL_MIN_HOURS", "72"))
+
+
+@contextmanager
+def _named_lock(name: str, timeout: int = 10):
+    """
+    Hold a MySQL named lock (GET_LOCK) for the block, on a pooled connection of its own.
+    """
+    with get_db_connection() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (name, timeout))
+        if cursor.fetchone()[0] != 1:
+            raise TimeoutError(f"Could not acquire lock '{name}'.")
+        try:
+            yield
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (name,))
+            cursor.fetchone()
+
+
+def _load_fleet_and_crew() -> Tuple[Dict[int, int], Dict[int, bool], Dict[int, bool]]:
+    """
+    ({plane_id: capacity}, {pilot_id: long_haul}, {attendant_id: long_haul}).
+    """
+    with get_db_connection() as cursor:
+        cursor.execute("SELECT ID, Total_Capacity FROM Plane")
+        planes = dict(cursor.fetchall())
+        cursor.execute("SELECT ID, Long_Haul FROM Pilot")
+        pilots = {crew_id: bool(long_haul) for crew_id, long_haul in cursor.fetchall()}
+        cursor.execute("SELECT ID, Long_Haul FROM Flight_Attendant")
+        attendants = {crew_id: bool(long_haul) for crew_id, long_haul in cursor.fetchall()}
+    return planes, pilots, attendants
+
+
+def load_resource_schedule(start: datetime, end: datetime, plane_ids, pilot_ids, attendant_ids) -> ResourceSchedule:
+    """
+    Active flights of the given planes and crew that touch [start, end),
+    widened by the turnaround / rest padding, as an in-memory ResourceSchedule.
+    """
+    schedule = ResourceSchedule(turnaround=SCHEDULE_TURNAROUND, crew_rest=SCHEDULE_CREW_REST)
+    window_start = start - max(SCHEDULE_TURNAROUND, SCHEDULE_CREW_REST)
+    window_end = end + max(SCHEDULE_TURNAROUND, SCHEDULE_CREW_REST)
+    # Flights are shorter than a day, so a bounded departure range finds every overlap
+    departure_range = (window_start - timedelta(days=1), window_end, window_start)
+
+    resource_queries = [
+        (sorted(plane_ids), "SELECT f.Plane_ID, f.ID, f.Departure_DateTime, f.Arrival_DateTime FROM Flight f "
+                            "WHERE f.Plane_ID IN ({ids})", "plane"),
+        (sorted(pilot_ids), "SELECT c.Pilot_ID, f.ID, f.Departure_DateTime, f.Arrival_DateTime FROM Pilot_Flight c "
+                            "JOIN Flight f ON f.ID = c.Flight_ID WHERE c.Pilot_ID IN ({ids})", "pilot"),
+        (sorted(attendant_ids), "SELECT c.Attendant_ID, f.ID, f.Departure_DateTime, f.Arrival_DateTime "
+                                "FROM Attendant_Flight c JOIN Flight f ON f.ID = c.Flight_ID "
+                                "WHERE c.Attendant_ID IN ({ids})", "attendant"),
+    ]
+    with get_db_connection() as cursor:
+        for ids, sql, kind in resource_queries:
+            if not ids:
+                continue
+            cursor.execute(
+                sql.format(ids=",".join(["%s"] * len(ids)))
+                + " AND f.Status = 'Active' AND f.Departure_DateTime >= %s AND f.Departure_DateTime < %s"
+                + " AND f.Arrival_DateTime > %s",
+                (*ids, *departure_range),
+            )
+            for resource_id, flight_id, departure, arrival in cursor:
+                if kind == "plane":
+                    schedule.add_flight(flight_id, departure, arrival, resource_id)
+                elif kind == "pilot":
+                    schedule.add_flight(flight_id, departure, arrival, None, pilot_ids=[resource_id])
+                else:
+                    schedule.add_flight(flight_id, departure, arrival, None, attendant_ids=[resource_id])
+    return schedule
+
+
+def _load_availability_flights() -> List[Tuple]:
+    """
+    Active flights from AVAILABILITY_LOOKBACK_DAYS ago onwards (so the index
+    knows where each plane and crew member last landed) with their crew.
+    """
+    lookback_days = int(os.getenv("AVAILABILITY_LOOKBACK_DAYS", "2"))
+    window = "f.Status = 'Active' AND f.Arrival_DateTime >= NOW() - INTERVAL %s DAY"
+    with get_db_connection() as cursor:
+        cursor.execute(
+            f"""
+            SELECT f.ID, f.Departure_DateTime, f.Arrival_DateTime, f.Path_Origin_Airport, f.Path_Dest_Airport,
+                   f.Plane_ID
+            FROM Flight f
+            WHERE {window}
+            """,
+            (lookback_days,),
+        )
+        flights = {row[0]: (*row, [], []) for row in cursor.fetchall()}
+        cursor.execute(
+            f"SELECT c.Flight_ID, c.Pilot_ID FROM Pilot_Flight c JOIN Flight f ON f.ID = c.Flight_ID WHERE {window}",
+            (lookback_days,),
+        )
+        for flight_id, pilot_id in cursor:
+            flights[flight_id][6].append(pilot_id)
+        cursor.execute(
+            f"SELECT c.Flight_ID, c.Attendant_ID FROM Attendant_Flight c JOIN Flight f ON f.ID = c.Flight_ID "
+            f"WHERE {window}",
+            (lookback_days,),
+        )
+        for flight_id, attendant_id in cursor:
+            flights[flight_id][7].append(attendant_id)
+    return list(flights.values())
+
+
+# Which planes / crew are free when and where, for the manager's flight form.
+# Kept current on schedule_flights / cancel_flights in this process and
+# reloaded every AVAILABILITY_REFRESH_SECONDS for other processes' changes.
+availability_index = AvailabilityIndex(
+    load_flights=_load_availability_flights,
+    load_resources=_load_fleet_and_crew,
+    turnaround=SCHEDULE_TURNAROUND,
+    crew_rest=SCHEDULE_CREW_REST,
+    long_haul_minutes=LONG_HAUL_MINUTES,
+    refresh_interval=float(os.getenv("AVAILABILITY_REFRESH_SECONDS", "300")),
+)
+
+
+def find_available_resources(departure: datetime, arrival: datetime, origin: Optional[str] = None,
+                             destination: Optional[str] = None, pilots: int = 2, attendants: int = 3) -> Dict:
+    """
+    Free planes and crew for a new flight, with a suggested plane and the
+    first `pilots` / `attendants` free crew members (None if not enough).
+    """
+    available = availability_index.available(departure, arrival, origin, destination)
+    available["suggestion"] = {
+        "plane_id": available["planes"][0]["plane_id"] if available["planes"] else None,
+        "pilot_ids": available["pilots"][:pilots] if len(available["pilots"]) >= pilots else None,
+        "attendant_ids": available["attendants"][:attendants] if len(available["attendants"]) >= attendants else None,
+    }
+    return available
+
+
+def _insert_flight_batch(plans: List[FlightPlan]) -> List[int]:
+    """
+    Insert one batch of validated flights with their crew in a single transaction.
+    Returns the new flight IDs in plan order.
+    """
+    with get_db_transaction() as cursor:
+        cursor.executemany(
+            "INSERT IGNORE INTO path (Origin_Airport, Dest_Airport) VALUES (%s, %s)",
+            sorted({(plan.origin, plan.destination) for plan in plans}),
+        )
+        cursor.executemany(
+            """
+            INSERT INTO Flight (Departure_DateTime, Arrival_DateTime, Path_Origin_Airport, Path_Dest_Airport,
+                                Business_Seat_Price, Economy_Seat_Price, Plane_ID)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """,
+            [(plan.departure, plan.arrival, plan.origin, plan.destination, plan.business_price,
+              plan.economy_price, plan.plane_id) for plan in plans],
+        )
+        # A multi-row insert does not report every generated ID; a plane has one
+        # active flight per departure time, so (Plane_ID, Departure_DateTime) finds them
+        cursor.execute(
+            f"""
+            SELECT ID, Plane_ID, Departure_DateTime FROM Flight
+            WHERE Status = 'Active' AND (Plane_ID, Departure_DateTime) IN ({','.join(['(%s, %s)'] * len(plans))})
+            """,
+            tuple(value for plan in plans for value in (plan.plane_id, plan.departure)),
+        )
+        ids = {(plane_id, departure): flight_id for flight_id, plane_id, departure in cursor.fetchall()}
+        flight_ids = [ids[(plan.plane_id, plan.departure)] for plan in plans]
+
+        cursor.executemany(
+            "INSERT INTO Pilot_Flight (Pilot_ID, Flight_ID) VALUES (%s, %s)",
+            [(pilot_id, flight_id) for plan, flight_id in zip(plans, flight_ids) for pilot_id in plan.pilot_ids],
+        )
+        cursor.executemany(
+            "INSERT INTO Attendant_Flight (Attendant_ID, Flight_ID) VALUES (%s, %s)",
+            [(attendant_id, flight_id) for plan, flight_id in zip(plans, flight_ids)
+             for attendant_id in plan.attendant_ids],
+        )
+        # "Flight added" events count the new flights in the route/plane reports
+        cursor.executemany(
+            """
+            INSERT INTO Report_Event (Order_ID, Flight_ID, Old_Status, New_Status, Old_Price, New_Price, Seats_Delta)
+            VALUES (NULL, %s, NULL, NULL, 0, 0, 0)
+            """,
+            [(flight_id,) for flight_id in flight_ids],
+        )
+    return flight_ids
+
+
+def schedule_flights(plans: List[FlightPlan], dry_run: bool = False, batch_size: int = 200) -> Dict:
+    """
+    Validate a batch of flights against the existing schedule and insert them.
+
+    Plane and crew availability is checked in memory (interval indexes over
+    the affected planes' and crew's flights), including conflicts between the
+    new flights themselves. Nothing is inserted if any flight is invalid.
+    Valid flights are inserted `batch_size` per transaction; scheduling runs
+    are serialized with a named lock so two managers cannot double-book a plane.
+
+    Returns {"created", "flight_ids", "errors"}.
+    """
+    if not plans:
+        return {"created": 0, "flight_ids": [], "errors": ["No flights to schedule."]}
+
+    flight_ids = []
+    with _named_lock("flytau_scheduling"):
+        planes, pilots, attendants = _load_fleet_and_crew()
+        schedule = load_resource_schedule(
+            min(plan.departure for plan in plans),
+            max(plan.arrival for plan in plans),
+            {plan.plane_id for plan in plans},
+            {pilot_id for plan in plans for pilot_id in plan.pilot_ids},
+            {attendant_id for plan in plans for attendant_id in plan.attendant_ids},
+        )
+        errors = validate_plans(plans, schedule, set(planes), pilots, attendants, long_haul_minutes=LONG_HAUL_MINUTES)
+        if errors or dry_run:
+            return {"created": 0, "flight_ids": [], "errors": errors}
+
+        try:
+            for start in range(0, len(plans), batch_size):
+                flight_ids.extend(_insert_flight_batch(plans[start:start + batch_size]))
+        except Exception as e:
+            logger.exception("Database Error during scheduling: %s", e)
+            errors = [f"Stopped after {len(flight_ids)} of {len(plans)} flights: {e}"]
+
+    airport_index.add_codes({code for plan in plans[:len(flight_ids)] for code in (plan.origin, plan.destination)})
+    for plan, flight_id in zip(plans, flight_ids):
+        invalidate_flight_search(plan.origin, plan.destination, plan.departure)
+        route_graph.add_flight(flight_id, plan.origin, plan.destination, plan.departure, plan.arrival,
+                               plan.economy_price, plan.business_price, planes[plan.plane_id])
+        availability_index.add_flight(flight_id, plan.departure, plan.arrival, plan.origin, plan.destination,
+                                      plan.plane_id, plan.pilot_ids, plan.attendant_ids)
+    if flight_ids:
+        refresh_crew_stats()
+    return {"created": len(flight_ids), "flight_ids": flight_ids, "errors": errors}
+
+
+def _system_cancel_orders(cursor, flight_ids: Tuple[int, ...]) -> Tuple[List[Tuple], int]:
+    """
+    Set-wise: every active order of these flights becomes 'system cancel'
+    with a full refund (Total_Price 0), its seats are released with one join
+    delete and the flights' seat counters are reset. The flights must already
+    be locked by the caller.
+    Returns ([(order_id, flight_id, mail), ...] of the cancelled orders, seats released).
+    """
+    id_params = ",".join(["%s"] * len(flight_ids))
+    cursor.execute(
+        f"SELECT Order_ID, Flight_ID, COALESCE(Costumer_Mail, Guest_Mail) FROM `Order` "
+        f"WHERE Flight_ID IN ({id_params}) AND Status = 'Active'",
+        flight_ids,
+    )
+    affected_orders = cursor.fetchall()
+    if not affected_orders:
+        return [], 0
+    cursor.execute(
+        f"""
+        INSERT INTO Report_Event (Order_ID, Flight_ID, Old_Status, New_Status, Old_Price, New_Price, Seats_Delta)
+        SELECT o.Order_ID, o.Flight_ID, 'Active', 'system cancel', o.Total_Price, 0, -COUNT(a.Class_ID)
+        FROM `Order` o
+        LEFT JOIN Assigned a ON a.Order_ID = o.Order_ID
+        WHERE o.Flight_ID IN ({id_params}) AND o.Status = 'Active'
+        GROUP BY o.Order_ID, o.Flight_ID, o.Total_Price
+        """,
+        flight_ids,
+    )
+    cursor.execute(
+        f"UPDATE `Order` SET Status = 'system cancel', Total_Price = 0 "
+        f"WHERE Flight_ID IN ({id_params}) AND Status = 'Active'",
+        flight_ids,
+    )
+    cursor.execute(
+        f"""
+        DELETE a FROM Assigned a
+        JOIN `Order` o ON a.Order_ID = o.Order_ID
+        WHERE o.Flight_ID IN ({id_params}) AND o.Status = 'system cancel'
+        """,
+        flight_ids,
+    )
+    released_seats = cursor.rowcount
+    cursor.execute(
+        f"""
+        UPDATE Flight_Seat_Counts sc
+        JOIN Flight f ON f.ID = sc.Flight_ID
+        JOIN Plane p ON p.ID = f.Plane_ID
+        SET sc.Business_Booked = 0, sc.Economy_Booked = 0, sc.Seats_Remaining = p.Total_Capacity
+        WHERE sc.Flight_ID IN ({id_params})
+        """,
+        flight_ids,
+    )
+    return affected_orders, released_seats
+
+
+def _after_system_cancel(flights: List[Tuple], affected_orders: List[Tuple]) -> None:
+    """
+    After the commit: drop the flights' seat maps and queue one notice per
+    cancelled order. `flights` rows start with (ID, origin, destination, departure).
+    """
+    by_id = {row[0]: row for row in flights}
+    for flight_id in by_id:
+        seat_map_cache.invalidate_flight(flight_id)
+    _notify([("flight_cancelled", mail, {
+        "order_id": order_id, "origin": by_id[flight_id][1], "destination": by_id[flight_id][2],
+        "departure": by_id[flight_id][3].strftime("%d/%m/%Y %H:%M"),
+    }) for order_id, flight_id, mail in affected_orders])
+
+
+def cancel_flights(flight_ids, batch_size: int = 100) -> Dict:
+    """
+    Cancel flights in bulk, `batch_size` flights per transaction.
+
+    Per batch, set-wise: every active order of the batch's flights becomes
+    'system cancel' with a full refund (Total_Price 0), their Assigned rows
+    are deleted with one join delete, the seat counters are reset, the crew
+    is released and the flights are marked 'Cancelled'. Flights departing in
+    less than FLIGHT_CANCEL_MIN_HOURS, unknown or already cancelled are skipped
+    and reported.
+
+    Returns {"cancelled_flights", "cancelled_orders", "released_seats", "errors"}.
+    """
+    requested = sorted({int(flight_id) for flight_id in flight_ids})
+    result = {"cancelled_flights": [], "cancelled_orders": 0, "released_seats": 0, "errors": []}
+    cutoff = datetime.now() + timedelta(hours=FLIGHT_CANCEL_MIN_HOURS)
+
+    for start in range(0, len(requested), batch_size):
+        batch = requested[start:start + batch_size]
+        cancelled = []
+        with get_db_transaction() as cursor:
+            cursor.execute(
+                f"""
+                SELECT ID, Path_Origin_Airport, Path_Dest_Airport, Departure_DateTime, Status
+                FROM Flight
+                WHERE ID IN ({','.join(['%s'] * len(batch))})
+                ORDER BY ID
+                FOR UPDATE
+                """,
+                tuple(batch),
+            )
+            found = {row[0]: row for row in cursor.fetchall()}
+            for flight_id in batch:
+                row = found.get(flight_id)
+                if row is None:
+                    result["errors"].append(f"Flight #{flight_id} does not exist.")
+                elif row[4] != 'Active':
+                    result["errors"].append(f"Flight #{flight_id} is already cancelled.")
+                elif row[3] < cutoff:
+                    result["errors"].append(
+                        f"Flight #{flight_id} departs within {FLIGHT_CANCEL_MIN_HOURS} hours and cannot be cancelled.")
+                else:
+                    cancelled.append(row)
+            if not cancelled:
+                continue
+
+            ids = tuple(row[0] for row in cancelled)
+            id_params = ",".join(["%s"] * len(ids))
+            affected_orders, released_seats = _system_cancel_orders(cursor, ids)
+            result["cancelled_orders"] += len(affected_orders)
+            result["released_seats"] += released_seats
+            cursor.execute(f"DELETE FROM Pilot_Flight WHERE Flight_ID IN ({id_params})", ids)
+            cursor.execute(f"DELETE FROM Attendant_Flight WHERE Flight_ID IN ({id_params})", ids)
+            cursor.execute(f"UPDATE Flight SET Status = 'Cancelled' WHERE ID IN ({id_params})", ids)
+
+        _after_system_cancel(cancelled, affected_orders)
+        for flight_id, origin, destination, departure, _ in cancelled:
+            invalidate_flight_search(origin, destination, departure)
+            pricing_cache.invalidate_flight(flight_id)
+            route_graph.remove_flight(flight_id)
+            availability_index.remove_flight(flight_id)
+        result["cancelled_flights"].extend(row[0] for row in cancelled)
+
+    if result["cancelled_flights"]:
+        refresh_crew_stats()
+    return result
+
+
+# Order lifecycle: 'Active' orders of departed flights become 'completed'
+ORDER_LIFECYCLE_BATCH = int(os.getenv("ORDER_LIFECYCLE_BATCH", "200"))
+# Departed flights this far behind the checkpoint are checked again for active orders
+# (bookings whose transaction started before departure and committed after the job passed)
+ORDER_LIFECYCLE_OVERLAP_SECONDS = int(os.getenv("ORDER_LIFECYCLE_OVERLAP_SECONDS", "600"))
+ORDER_TRANSITIONS = register(CounterMetric(
+    "flytau_order_lifecycle_orders_total", "Orders moved by the lifecycle scheduler.", ("transition",)))
+ORDER_LIFECYCLE_BATCH_TIME = register(Histogram(
+    "flytau_order_lifecycle_batch_seconds", "Duration of one lifecycle batch transaction.", ("job",), LATENCY_BUCKETS))
+ORDER_LIFECYCLE_LAG = register(GaugeMetric(
+    "flytau_order_lifecycle_lag_seconds",
+    "Age of the oldest departed flight still holding active orders, at the start of the last pass."))
+ORDER_LIFECYCLE_LAST_RUN = register(GaugeMetric(
+    "flytau_order_lifecycle_last_run_timestamp_seconds", "When the last lifecycle pass finished."))
+
+_EPOCH = datetime(1000, 1, 1)  # MySQL's smallest DATETIME: the start of an empty checkpoint
+
+
+def _complete_flight_orders(cursor, flight_ids: Tuple[int, ...]) -> int:
+    """
+    Complete the active orders of these flights set-wise, with one Report_Event
+    per order (same price, no seat change). Returns the number of orders.
+    """
+    id_params = ",".join(["%s"] * len(flight_ids))
+    cursor.execute(
+        f"""
+        INSERT INTO Report_Event (Order_ID, Flight_ID, Old_Status, New_Status, Old_Price, New_Price, Seats_Delta)
+        SELECT Order_ID, Flight_ID, 'Active', 'completed', Total_Price, Total_Price, 0
+        FROM `Order`
+        WHERE Flight_ID IN ({id_params}) AND Status = 'Active'
+        """,
+        flight_ids,
+    )
+    cursor.execute(
+        f"UPDATE `Order` SET Status = 'completed' WHERE Flight_ID IN ({id_params}) AND Status = 'Active'",
+        flight_ids,
+    )
+    return cursor.rowcount
+
+
+def complete_departed_orders(flight_batch: int = ORDER_LIFECYCLE_BATCH) -> int:
+    """
+    Mark the active orders of departed flights 'completed'.
+
+    Walks active flights with Departure_DateTime <= NOW() in (departure, ID)
+    order on idx_flight_status_departure, `flight_batch` flights per
+    transaction, starting after the checkpoint in Job_Checkpoint. Per batch,
+    set-wise: one Report_Event per order (same price, no seat change), one
+    UPDATE of the orders, and the checkpoint moved to the batch's last flight,
+    all in the same transaction, so an interrupted run resumes where it
+    stopped and never completes an order twice. The checkpoint row is locked
+    FOR UPDATE, so concurrent runs take turns.
+
+    Before moving forward, flights up to ORDER_LIFECYCLE_OVERLAP_SECONDS
+    behind the checkpoint that still have active orders are completed too,
+    so a booking that committed just after the job passed its flight is not
+    left active.
+
+    Assumes the tables from sql/migrations/006_order_lifecycle.sql.
+    Returns the number of orders completed.
+    """
+    completed = 0
+    first_batch = True
+    while True:
+        started = time.perf_counter()
+        with get_db_transaction() as cursor:
+            cursor.execute(
+                "SELECT Last_Departure, Last_Flight_ID FROM Job_Checkpoint WHERE Job_Name = %s FOR UPDATE",
+                ("complete_departed_orders",),
+            )
+            checkpoint = cursor.fetchone() or (None, None)
+            last_departure, last_id = checkpoint[0] or _EPOCH, checkpoint[1] or 0
+            if first_batch and checkpoint[0] is not None:
+                cursor.execute(
+                    """
+                    SELECT f.ID
+                    FROM Flight f
+                    WHERE f.Status = 'Active'
+                      AND f.Departure_DateTime >= %s - INTERVAL %s SECOND AND f.Departure_DateTime <= %s
+                      AND EXISTS (SELECT 1 FROM `Order` o WHERE o.Flight_ID = f.ID AND o.Status = 'Active')
+                    """,
+                    (last_departure, ORDER_LIFECYCLE_OVERLAP_SECONDS, last_departure),
+                )
+                stragglers = tuple(row[0] for row in cursor.fetchall())
+                if stragglers:
+                    orders = _complete_flight_orders(cursor, stragglers)
+                    ORDER_TRANSITIONS.inc(("Active->completed",), orders)
+                    completed += orders
+            cursor.execute(
+                """
+                SELECT ID, Departure_DateTime
+                FROM Flight
+                WHERE Status = 'Active' AND Departure_DateTime <= NOW()
+                  AND Departure_DateTime >= %s AND (Departure_DateTime > %s OR ID > %s)
+                ORDER BY Departure_DateTime, ID
+                LIMIT %s
+                """,
+                (last_departure, last_departure, last_id, flight_batch),
+            )
+            flights = cursor.fetchall()
+            if first_batch:
+                ORDER_LIFECYCLE_LAG.set((), (datetime.now() - flights[0][1]).total_seconds() if flights else 0)
+                first_batch = False
+            if not flights:
+                return completed
+
+            orders = _complete_flight_orders(cursor, tuple(row[0] for row in flights))
+            cursor.execute(
+                """
+                INSERT INTO Job_Checkpoint (Job_Name, Last_Departure, Last_Flight_ID, Rows_Processed)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE Last_Departure = VALUES(Last_Departure),
+                    Last_Flight_ID = VALUES(Last_Flight_ID), Rows_Processed = Rows_Processed + VALUES(Rows_Processed)
+                """,
+                ("complete_departed_orders", flights[-1][1], flights[-1][0], orders),
+            )
+        ORDER_LIFECYCLE_BATCH_TIME.observe(("complete_departed_orders",), time.perf_counter() - started)
+        ORDER_TRANSITIONS.inc(("Active->completed",), orders)
+        completed += orders
+        if len(flights) < flight_batch:
+            return completed
+
+
+def cancel_orders_of_cancelled_flights(flight_batch: int = ORDER_LIFECYCLE_BATCH) -> int:
+    """
+    Repair pass: system-cancel the active orders left on cancelled flights.
+
+    cancel_flights cancels a flight's orders in the flight's own transaction;
+    this catches flights cancelled any other way (e.g. by hand in the
+    database), with the same set-wise cancellation, `flight_batch` flights
+    per transaction, and notifies the customers.
+    Returns the number of orders cancelled.
+    """
+    cancelled_orders = 0
+    while True:
+        started = time.perf_counter()
+        with get_db_transaction() as cursor:
+            cursor.execute(
+                """
+                SELECT f.ID, f.Path_Origin_Airport, f.Path_Dest_Airport, f.Departure_DateTime
+                FROM Flight f
+                WHERE f.Status = 'Cancelled'
+                  AND EXISTS (SELECT 1 FROM `Order` o WHERE o.Flight_ID = f.ID AND o.Status = 'Active')
+                ORDER BY f.ID
+                LIMIT %s
+                FOR UPDATE
+                """,
+                (flight_batch,),
+            )
+            flights = cursor.fetchall()
+            if not flights:
+                return cancelled_orders
+            affected_orders, _ = _system_cancel_orders(cursor, tuple(row[0] for row in flights))
+
+        ORDER_LIFECYCLE_BATCH_TIME.observe(("cancel_orders_of_cancelled_flights",), time.perf_counter() - started)
+        ORDER_TRANSITIONS.inc(("Active->system cancel",), len(affected_orders))
+        _after_system_cancel(flights, affected_orders)
+        for flight_id, origin, destination, departure in flights:
+            invalidate_flight_search(origin, destination, departure)
+            pricing_cache.invalidate_flight(flight_id)
+        cancelled_orders += len(affected_orders)
+        if len(flights) < flight_batch:
+            return cancelled_orders
+
+
+def run_order_lifecycle() -> Dict:
+    """
+    One scheduler pass: complete the orders of departed flights, then cancel
+    the orders left on cancelled flights. Holds a named lock so only one
+    worker process runs a pass at a time; the others skip it.
+    Returns {"completed_orders", "cancelled_orders"}, or {} when skipped.
+    """
+    try:
+        with _named_lock("flytau_order_lifecycle", timeout=0):
+            result = {"completed_orders": complete_departed_orders(),
+                      "cancelled_orders": cancel_orders_of_cancelled_flights()}
+    except TimeoutError:
+        return {}
+    ORDER_LIFECYCLE_LAST_RUN.set((), time.time())
+    if result["completed_orders"] or result["cancelled_orders"]:
+        logger.info("Order lifecycle: %s", result)
+    return result
+
+
+def start_order_lifecycle(interval: float) -> None:
+    """
+    Run the order lifecycle pass every `interval` seconds in a daemon thread.
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                run_order_lifecycle()
+            except Exception as e:
+                logger.exception("Order Lifecycle Error: %s", e)
+
+    threading.Thread(target=run, name="order-lifecycle", daemon=True).start()
+
+
+def get_upcoming_flights(limit: int = 100) -> List[Dict]:
+    """
+    The next flights by departure (active and cancelled) for the manager's flight list.
+    """
+    with get_db_read_connection() as cursor:
+        cursor.execute(
+            """
+            SELECT f.ID, f.Path_Origin_Airport, f.Path_Dest_Airport, f.Departure_DateTime, f.Arrival_DateTime,
+                   f.Plane_ID, f.Status, COALESCE(sc.Seats_Remaining, p.Total_Capacity)
+            FROM Flight f
+            JOIN Plane p ON f.Plane_ID = p.ID
+            LEFT JOIN Flight_Seat_Counts sc ON sc.Flight_ID = f.ID
+            WHERE f.Departure_DateTime >= NOW()
+            ORDER BY f.Departure_DateTime, f.ID
+            LIMIT %s
+            """,
+            (limit,),
+        )
+        return [{
+            "flight_id": row[0],
+            "origin_airport": row[1],
+            "destination_airport": row[2],
+            "departure_datetime": row[3].strftime("%Y-%m-%d %H:%M"),
+            "arrival_datetime": row[4].strftime("%Y-%m-%d %H:%M"),
+            "plane_id": row[5],
+            "status": row[6],
+            "seats_remaining": int(row[7]),
+        } for row in cursor.fetchall()]